@@ -0,0 +1,53 @@
+"""
+Compares the size of, and the time to load, a graph stored as Turtle, N-Triples and rdfx-bin.
+
+Run from the repository root:
+
+    python benchmarks/bench_binary_format.py [number of triples]
+"""
+import sys
+import time
+
+from rdflib import BNode, Graph, Literal, Namespace
+
+from rdfx import binary
+
+EX = Namespace("http://example.com/")
+
+
+def make_graph(n_triples: int) -> Graph:
+    g = Graph()
+    g.bind("ex", EX)
+    for i in range(n_triples // 4):
+        thing = EX[f"thing{i}"]
+        node = BNode()
+        g.add((thing, EX.name, Literal(f"Thing number {i}", lang="en")))
+        g.add((thing, EX["count"], Literal(i)))
+        g.add((thing, EX.part, node))
+        g.add((node, EX.related, EX[f"thing{(i * 7) % (n_triples // 4)}"]))
+    return g
+
+
+def timed(function, *args):
+    start = time.perf_counter()
+    result = function(*args)
+    return time.perf_counter() - start, result
+
+
+if __name__ == "__main__":
+    n_triples = int(sys.argv[1]) if len(sys.argv) > 1 else 200_000
+    g = make_graph(n_triples)
+    print(f"{len(g)} triples")
+    turtle = g.serialize(format="turtle").encode("utf-8")
+    ntriples = g.serialize(format="nt").encode("utf-8")
+    dump_time, rdfx_bin = timed(binary.dumps, g)
+    print(f"{'format':<10} {'size (bytes)':>14} {'load (s)':>10}")
+    for name, data, load in (
+        ("turtle", turtle, lambda d: Graph().parse(data=d, format="turtle")),
+        ("nt", ntriples, lambda d: Graph().parse(data=d, format="nt")),
+        ("rdfx-bin", rdfx_bin, binary.loads),
+    ):
+        load_time, loaded = timed(load, data)
+        assert len(loaded) == len(g)
+        print(f"{name:<10} {len(data):>14} {load_time:>10.3f}")
+    print(f"rdfx-bin serialization took {dump_time:.3f} s")
@@ -0,0 +1,67 @@
+"""
+Measures the per-operation latency of S3 persistence system calls against moto,
+creating a new boto3 client for every call (the previous behaviour)
+versus the client the S3 persistence system now keeps for its lifetime.
+
+Run from the repository root:
+
+    python benchmarks/bench_s3_client.py [number of operations]
+"""
+import sys
+import time
+
+import boto3
+from moto import mock_s3
+from rdflib import Graph
+
+from rdfx.persistence_systems import S3
+
+REGION = "ap-southeast-2"
+CREDENTIALS = {"aws_key": "aws_key", "aws_secret": "aws_secret"}
+
+g = Graph().parse("tests/data/file_01.ttl")
+
+
+class FreshClientS3(S3):
+    """
+    Creates a new client for every call, as every S3 persistence system call used to do.
+    """
+
+    @property
+    def client(self):
+        return boto3.client(
+            "s3",
+            aws_access_key_id=self.aws_key,
+            aws_secret_access_key=self.aws_secret,
+            region_name=self.region,
+        )
+
+
+def per_operation_ms(s3_ps: S3, n_operations: int):
+    results = {}
+    for name, operation in (
+        ("write", lambda i: s3_ps.write(g, f"graph_{i}", "nt")),
+        ("asset_exists", lambda i: s3_ps.asset_exists(f"graph_{i}.nt")),
+        ("read", lambda i: s3_ps.read(f"graph_{i}.nt", "nt")),
+    ):
+        start = time.perf_counter()
+        for i in range(n_operations):
+            operation(i)
+        results[name] = (time.perf_counter() - start) / n_operations * 1000
+    return results
+
+
+if __name__ == "__main__":
+    n_operations = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    with mock_s3():
+        boto3.client("s3", region_name=REGION).create_bucket(
+            Bucket="bench_bucket",
+            CreateBucketConfiguration={"LocationConstraint": REGION},
+        )
+        before = per_operation_ms(
+            FreshClientS3(bucket="bench_bucket", **CREDENTIALS), n_operations
+        )
+        after = per_operation_ms(S3(bucket="bench_bucket", **CREDENTIALS), n_operations)
+    print(f"{'operation':<14} {'new client (ms)':>16} {'reused client (ms)':>19}")
+    for name in before:
+        print(f"{name:<14} {before[name]:>16.2f} {after[name]:>19.2f}")
@@ -0,0 +1,87 @@
+"""
+Measures the time and peak Python memory of SOP.read for a large export,
+served by an httpx.MockTransport fake of SOP:
+the previous behaviour (whole response, copied to a StringIO, parsed as Turtle),
+the streamed Turtle read, and read_graph, which streams an N-Triples export.
+
+Run from the repository root:
+
+    python benchmarks/bench_sop_read.py [number of triples]
+"""
+import sys
+import time
+import tracemalloc
+from io import StringIO
+
+import httpx
+from rdflib import Graph, Literal, Namespace
+
+from rdfx.persistence_systems import SOP
+
+EX = Namespace("https://example.com/")
+GRAPH_IRI = "urn:x-evn-master:big"
+
+
+def make_exports(n_triples: int):
+    g = Graph()
+    g.bind("ex", EX)
+    for i in range(n_triples):
+        g.add((EX[f"s{i // 10}"], EX[f"p{i % 10}"], Literal(f"value {i}")))
+    return {
+        "turtle": ("# a leading comment\n\n" + g.serialize(format="turtle")).encode(
+            "utf-8"
+        ),
+        "ntriples": g.serialize(format="nt").encode("utf-8"),
+    }
+
+
+class PreviousSOP(SOP):
+    """
+    Reads the whole response and copies its text to a StringIO, as SOP.read used to.
+    """
+
+    def read(self, graph_iri, rdf_format="turtle", legacy=False):
+        url, kwargs = self._read_request(graph_iri, rdf_format, legacy)
+        response = self.client.get(url, **kwargs)
+        text = StringIO(response.text)
+        leading_comments = []
+        for line in text:
+            if line.startswith("#"):
+                leading_comments.append(line.lstrip("# ").rstrip("\n"))
+            else:
+                break
+        return leading_comments, Graph().parse(text, format=rdf_format)
+
+
+def measure(read):
+    # timed without tracemalloc, which slows everything down
+    start = time.perf_counter()
+    read()
+    seconds = time.perf_counter() - start
+    tracemalloc.start()
+    read()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return seconds, peak / 1024**2
+
+
+if __name__ == "__main__":
+    n_triples = int(sys.argv[1]) if len(sys.argv) > 1 else 200_000
+    exports = make_exports(n_triples)
+    transport = httpx.MockTransport(
+        lambda request: httpx.Response(
+            200, content=exports[request.url.params.get("format", "turtle")]
+        )
+    )
+    previous = PreviousSOP(transport=transport)
+    current = SOP(transport=transport)
+    print(
+        f"{n_triples} triples, Turtle export {len(exports['turtle']) / 1024**2:.1f} MiB"
+    )
+    for name, read in (
+        ("previous read (turtle)", lambda: previous.read(GRAPH_IRI)),
+        ("streamed read (turtle)", lambda: current.read(GRAPH_IRI)),
+        ("read_graph (n-triples)", lambda: current.read_graph(GRAPH_IRI)),
+    ):
+        seconds, peak = measure(read)
+        print(f"{name}: {seconds:.2f} s, peak {peak:.0f} MiB")
@@ -0,0 +1,68 @@
+"""
+Compares `get_sorted_namespaces` with the previous implementation,
+which tested every name-space against every distinct term with a substring test.
+
+Run from the repository root:
+
+    python benchmarks/bench_sorted_namespaces.py [number of triples] [number of name-spaces]
+"""
+import sys
+import time
+
+from rdflib import Graph, Literal, URIRef
+
+from rdfx.rdfx_cli import get_sorted_namespaces
+
+
+def substring_namespaces(g: Graph):
+    all_ns = list(g.namespaces())
+    subjects = list(g.subjects())
+    predicates = list(g.predicates())
+    objects = list(g.objects())
+    all_prefixes = set(subjects + predicates + objects)
+    used_namespace = []
+    for full_prefix in all_prefixes:
+        for prefix in all_ns:
+            if prefix[1] in full_prefix:
+                used_namespace.append(prefix)
+
+    used_namespace = list(set(used_namespace))
+    used_namespace.sort(key=lambda tup: tup[0])
+    return used_namespace
+
+
+def make_graph(n_triples: int, n_namespaces: int) -> Graph:
+    g = Graph()
+    for i in range(n_namespaces):
+        g.bind(f"ns{i}", f"http://example.com/ns/{i}/")
+    # only half of the name-spaces are used, so the early exit never triggers
+    used = max(n_namespaces // 2, 1)
+    for i in range(n_triples):
+        ns = f"http://example.com/ns/{i % used}/"
+        g.add(
+            (
+                URIRef(f"{ns}thing{i}"),
+                URIRef(f"{ns}property{i % 10}"),
+                Literal(f"value {i}") if i % 2 else URIRef(f"{ns}other{i}"),
+            )
+        )
+    return g
+
+
+def timed(function, g):
+    start = time.perf_counter()
+    result = function(g)
+    return time.perf_counter() - start, result
+
+
+if __name__ == "__main__":
+    n_triples = int(sys.argv[1]) if len(sys.argv) > 1 else 50_000
+    n_namespaces = int(sys.argv[2]) if len(sys.argv) > 2 else 40
+    g = make_graph(n_triples, n_namespaces)
+    print(f"{len(g)} triples, {len(list(g.namespaces()))} name-spaces")
+    old_time, old_result = timed(substring_namespaces, g)
+    new_time, new_result = timed(get_sorted_namespaces, g)
+    print(f"substring matching:      {old_time:8.3f} s")
+    print(f"prefix trie matching:    {new_time:8.3f} s")
+    print(f"speedup:                 {old_time / new_time:8.1f} x")
+    print(f"same result: {sorted(old_result) == sorted(new_result)}")
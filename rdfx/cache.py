@@ -0,0 +1,149 @@
+"""
+An on-disk cache of parsed graphs, for the read path of the persistence systems.
+"""
+
+import hashlib
+import json
+import os
+import struct
+import time
+from pathlib import Path
+from typing import List, Optional, Tuple, Union
+
+from rdflib import Graph
+
+from rdfx import binary
+
+CACHE_FILE_SUFFIX = ".graph"
+SOURCE_FILE_SUFFIX = ".source"
+_COMMENTS_SIZE = struct.Struct("<I")
+
+
+class GraphCache:
+    """
+    Stores parsed graphs, with their leading comments, in the compact rdfx-bin format on disk,
+    keyed by a hash of the source bytes and the RDF format they were parsed as.
+    Once the entries take up more than max_size bytes, the least recently used ones are evicted.
+
+    For sources with a version tag, such as the ETag of an S3 object,
+    the cache also records which entry the source was last parsed into, at which version,
+    so an unchanged source can be served without fetching it again.
+
+    Args:
+        directory (Path): The directory to keep the cache entries in, created if it does not exist
+        max_size (int): The maximum total size of the cache entries in bytes, defaults to 1 GiB
+    """
+
+    def __init__(self, directory: Union[Path, str], max_size: int = 1024**3):
+        if not isinstance(directory, (Path, str)):
+            raise ValueError("The cache directory must be a string or pathlib Path")
+        self.directory = Path(directory).resolve()
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.max_size = max_size
+
+    @staticmethod
+    def key(data: bytes, rdf_format: str) -> str:
+        """
+        Returns the cache key for source bytes parsed as the given RDF format.
+        """
+        digest = hashlib.sha256(f"{rdf_format}\n".encode("utf-8"))
+        digest.update(data)
+        return digest.hexdigest()
+
+    def _path(self, key: str) -> Path:
+        return self.directory / f"{key}{CACHE_FILE_SUFFIX}"
+
+    @staticmethod
+    def _touch(path: Path):
+        # marks the entry as recently used, the entries are evicted in order of modification time,
+        # which is set explicitly as file system timestamps can be coarser than the time between uses
+        now = time.time_ns()
+        os.utime(path, ns=(now, now))
+
+    def get(self, key: str) -> Optional[Tuple[List[str], Graph]]:
+        """
+        Returns the leading comments and Graph cached under the key, or None if there are none.
+        """
+        path = self._path(key)
+        try:
+            content = path.read_bytes()
+        except FileNotFoundError:
+            return None
+        try:
+            (comments_size,) = _COMMENTS_SIZE.unpack_from(content)
+            comments_end = _COMMENTS_SIZE.size + comments_size
+            leading_comments = json.loads(content[_COMMENTS_SIZE.size : comments_end])
+            graph = binary.loads(content[comments_end:])
+        except Exception:
+            # a damaged entry is a cache miss
+            path.unlink(missing_ok=True)
+            return None
+        self._touch(path)
+        return leading_comments, graph
+
+    def put(self, key: str, leading_comments: List[str], graph: Graph):
+        """
+        Caches the leading comments and Graph under the key, evicting old entries if needed.
+        """
+        comments = json.dumps(list(leading_comments)).encode("utf-8")
+        content = _COMMENTS_SIZE.pack(len(comments)) + comments + binary.dumps(graph)
+        path = self._path(key)
+        temp_path = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+        temp_path.write_bytes(content)
+        os.replace(temp_path, path)
+        self._touch(path)
+        self.evict()
+
+    def _source_path(self, source: str) -> Path:
+        digest = hashlib.sha256(source.encode("utf-8")).hexdigest()
+        return self.directory / f"{digest}{SOURCE_FILE_SUFFIX}"
+
+    def get_source(self, source: str) -> Optional[Tuple[str, str]]:
+        """
+        Returns the version tag and the cache key recorded for a source, e.g. "s3://bucket/key",
+        or None if there are none.
+        """
+        try:
+            record = json.loads(self._source_path(source).read_text(encoding="utf-8"))
+        except (FileNotFoundError, ValueError):
+            return None
+        if record.get("source") != source:
+            return None
+        return record["tag"], record["key"]
+
+    def put_source(self, source: str, tag: str, key: str):
+        """
+        Records that the source, at the version tag, was parsed into the entry under the cache key.
+        """
+        path = self._source_path(source)
+        temp_path = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+        temp_path.write_text(
+            json.dumps({"source": source, "tag": tag, "key": key}), encoding="utf-8"
+        )
+        os.replace(temp_path, path)
+
+    def evict(self):
+        """
+        Removes the least recently used entries until the cache fits in max_size.
+        """
+        entries = []
+        for path in self.directory.glob(f"*{CACHE_FILE_SUFFIX}"):
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime_ns, stat.st_size, path))
+        total_size = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total_size <= self.max_size:
+                break
+            path.unlink(missing_ok=True)
+            total_size -= size
+
+    def clear(self):
+        """
+        Removes all entries, and the versions recorded for sources.
+        """
+        for suffix in (CACHE_FILE_SUFFIX, SOURCE_FILE_SUFFIX):
+            for path in self.directory.glob(f"*{suffix}"):
+                path.unlink(missing_ok=True)
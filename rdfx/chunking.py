@@ -0,0 +1,73 @@
+"""
+Splitting large graphs into bounded-size chunks, for writing them in several requests.
+
+The triples are grouped by subject, and subjects linked through blank nodes are kept together,
+so the description of a blank node is never split from the triples referring to it:
+blank nodes written in separate requests would become separate nodes.
+"""
+
+from collections import Counter
+from typing import Iterable, List
+
+from rdflib import BNode, Graph
+from rdflib.term import Node
+
+
+def chunk_subjects(g: Graph, max_triples: int) -> List[List[Node]]:
+    """
+    Plans the chunks of a graph, as the subjects whose triples make up each chunk.
+
+    The subjects connected through blank nodes form a group, which is never split.
+    Groups are packed into chunks of at most max_triples triples, in order,
+    but a single group with more triples than that makes up a chunk of its own.
+    """
+    if max_triples < 1:
+        raise ValueError("max_triples must be at least 1")
+    # union-find over the subjects and the blank nodes they refer to
+    parent = {}
+
+    def find(node):
+        root = node
+        while parent.get(root, root) != root:
+            root = parent[root]
+        while node != root:
+            parent[node], node = root, parent.get(node, node)
+        return root
+
+    sizes = Counter()
+    for s, p, o in g:
+        sizes[s] += 1
+        if isinstance(o, BNode):
+            s_root, o_root = find(s), find(o)
+            if s_root != o_root:
+                parent[o_root] = s_root
+
+    groups = {}
+    for s, size in sizes.items():
+        group = groups.setdefault(find(s), [[], 0])
+        group[0].append(s)
+        group[1] += size
+
+    chunks = []
+    chunk, chunk_size = [], 0
+    for subjects, size in groups.values():
+        if chunk and chunk_size + size > max_triples:
+            chunks.append(chunk)
+            chunk, chunk_size = [], 0
+        chunk.extend(subjects)
+        chunk_size += size
+    if chunk:
+        chunks.append(chunk)
+    return chunks
+
+
+def subgraph(g: Graph, subjects: Iterable[Node]) -> Graph:
+    """
+    Returns a new graph with the triples of the given subjects, and the name-space bindings of the graph.
+    """
+    chunk = Graph()
+    for prefix, namespace in g.namespaces():
+        chunk.bind(prefix, namespace, override=True, replace=True)
+    for s in subjects:
+        chunk.addN((s, p, o, chunk) for _, p, o in g.triples((s, None, None)))
+    return chunk
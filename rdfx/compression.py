@@ -0,0 +1,145 @@
+"""
+Transparent compression of RDF files and S3 objects:
+gzip, bzip2 and xz from the standard library, and zstd with the optional zstandard package (pip install rdfx[zstd]).
+
+The compression of a file or key is told by a suffix following the RDF format suffix, e.g. .ttl.gz or .nt.zst.
+Compressed content is always streamed through the (de)compressor, never held whole in memory.
+"""
+
+import bz2
+import gzip
+import lzma
+from io import BytesIO
+from pathlib import Path
+from typing import BinaryIO, Optional, Tuple, Union
+
+from rdflib import Graph
+
+from rdfx.constants import COMPRESSION_FILE_ENDINGS, COMPRESSION_OUTPUT_FILE_ENDINGS
+
+COMPRESSIONS = tuple(COMPRESSION_OUTPUT_FILE_ENDINGS)
+# only gzip and zstd are HTTP content codings, objects compressed otherwise are told by their suffix and Content-Type
+CONTENT_ENCODINGS = ("gzip", "zstd")
+CONTENT_TYPES = {"bzip2": "application/x-bzip2", "xz": "application/x-xz"}
+
+
+def _zstandard():
+    try:
+        import zstandard
+    except ImportError:
+        raise ImportError(
+            "zstd compression needs the zstandard package, pip install rdfx[zstd]"
+        ) from None
+    return zstandard
+
+
+def compression_validator(compression: Optional[str]):
+    if compression is not None and compression not in COMPRESSIONS:
+        raise ValueError(f"The compression must be one of {', '.join(COMPRESSIONS)}")
+
+
+def split_compression(name: Union[str, Path]) -> Tuple[str, Optional[str]]:
+    """
+    Splits the compression suffix off a file name or key,
+    e.g. "vocab.ttl.gz" into "vocab.ttl" and "gzip", and "vocab.ttl" into "vocab.ttl" and None.
+    """
+    name = str(name)
+    stem, dot, suffix = name.rpartition(".")
+    if dot and suffix in COMPRESSION_FILE_ENDINGS:
+        return stem, COMPRESSION_FILE_ENDINGS[suffix]
+    return name, None
+
+
+def rdf_stem(file_path: Union[str, Path]) -> str:
+    """
+    Returns the name of a file without its compression and RDF format suffixes, e.g. "vocab" for vocab.ttl.gz.
+    """
+    return Path(split_compression(Path(file_path).name)[0]).stem
+
+
+def compressed_name(name: str, compression: Optional[str]) -> str:
+    """
+    Returns the file name or key with the suffix of the compression added, if any.
+    """
+    compression_validator(compression)
+    if compression is None:
+        return name
+    return f"{name}.{COMPRESSION_OUTPUT_FILE_ENDINGS[compression]}"
+
+
+def decompressing_reader(stream: BinaryIO, compression: Optional[str]) -> BinaryIO:
+    """
+    Returns a binary stream of the decompressed content of a compressed binary stream,
+    or the stream itself if compression is None.
+    """
+    compression_validator(compression)
+    if compression == "gzip":
+        return gzip.GzipFile(fileobj=stream, mode="rb")
+    if compression == "bzip2":
+        return bz2.BZ2File(stream, "rb")
+    if compression == "xz":
+        return lzma.LZMAFile(stream, "rb")
+    if compression == "zstd":
+        return (
+            _zstandard()
+            .ZstdDecompressor()
+            .stream_reader(stream, read_across_frames=True)
+        )
+    return stream
+
+
+def compressing_writer(stream: BinaryIO, compression: str) -> BinaryIO:
+    """
+    Returns a binary stream compressing what is written to it into the given binary stream.
+    Close it once everything is written, to write the end of the compressed content;
+    the given stream is left open.
+    """
+    compression_validator(compression)
+    if compression == "gzip":
+        # without a timestamp, the same content always compresses to the same bytes
+        return gzip.GzipFile(fileobj=stream, mode="wb", mtime=0)
+    if compression == "bzip2":
+        return bz2.BZ2File(stream, "wb")
+    if compression == "xz":
+        return lzma.LZMAFile(stream, "wb")
+    return _zstandard().ZstdCompressor().stream_writer(stream, closefd=False)
+
+
+def decompress(data: bytes, compression: Optional[str]) -> bytes:
+    if compression is None:
+        return data
+    with decompressing_reader(BytesIO(data), compression) as reader:
+        return reader.read()
+
+
+def open_rdf_file(file_path: Union[str, Path]) -> BinaryIO:
+    """
+    Opens a file for reading, decompressing it as it is read if it has a compression suffix.
+    """
+    compression = split_compression(file_path)[1]
+    if compression == "gzip":
+        return gzip.open(file_path, "rb")
+    if compression == "bzip2":
+        return bz2.open(file_path, "rb")
+    if compression == "xz":
+        return lzma.open(file_path, "rb")
+    if compression == "zstd":
+        # the reader closes the file when it is closed
+        return (
+            _zstandard()
+            .ZstdDecompressor()
+            .stream_reader(open(file_path, "rb"), read_across_frames=True)
+        )
+    return open(file_path, "rb")
+
+
+def parse_file(g: Graph, file_path: Union[str, Path], rdf_format: str) -> Graph:
+    """
+    Parses a file into the graph, decompressing it as it is parsed if it has a compression suffix.
+    """
+    if split_compression(file_path)[1] is None:
+        return g.parse(str(file_path), format=rdf_format)
+    with open_rdf_file(file_path) as f:
+        return g.parse(
+            f, format=rdf_format, publicID=Path(file_path).absolute().as_uri()
+        )
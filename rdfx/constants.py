@@ -12,7 +12,9 @@ RDF_FILE_ENDINGS = {
     "xml": "xml",
     "rdf": "xml",
     "nt": "nt",
+    "nq": "nquads",
     "n3": "n3",
+    "rdfx-bin": "rdfx-bin",
 }
 
 OUTPUT_FILE_ENDINGS = {
@@ -20,5 +22,22 @@ OUTPUT_FILE_ENDINGS = {
     "xml": "xml",
     "json-ld": "json-ld",
     "nt": "nt",
+    "nquads": "nq",
     "n3": "n3",
+    "rdfx-bin": "rdfx-bin",
+}
+
+# compression suffixes, following the RDF format suffix, e.g. .ttl.gz
+COMPRESSION_FILE_ENDINGS = {
+    "gz": "gzip",
+    "bz2": "bzip2",
+    "xz": "xz",
+    "zst": "zstd",
+}
+
+COMPRESSION_OUTPUT_FILE_ENDINGS = {
+    "gzip": "gz",
+    "bzip2": "bz2",
+    "xz": "xz",
+    "zstd": "zst",
 }
@@ -0,0 +1,51 @@
+"""
+The difference between two versions of a graph, for writing only the triples that changed.
+
+Triples without blank nodes are compared one by one. Blank nodes have no identity across graphs,
+so the triples with blank nodes are compared as a whole, up to isomorphism:
+if they differ at all, all of them are to be replaced.
+"""
+
+from typing import List, NamedTuple
+
+from rdflib import BNode, Graph
+from rdflib.compare import isomorphic
+
+
+class Delta(NamedTuple):
+    # the triples without blank nodes to add and to remove
+    added: List[tuple]
+    removed: List[tuple]
+    # the triples with blank nodes of the new graph, if they are to replace those of the base graph, else None
+    bnodes: Graph = None
+
+
+def has_bnode(triple: tuple) -> bool:
+    return isinstance(triple[0], BNode) or isinstance(triple[2], BNode)
+
+
+def bnode_triples(g: Graph) -> Graph:
+    """
+    Returns a new graph with the triples of g that have a blank node as subject or object.
+    """
+    bnodes = Graph()
+    for prefix, namespace in g.namespaces():
+        bnodes.bind(prefix, namespace, override=True, replace=True)
+    bnodes.addN(
+        (s, p, o, bnodes)
+        for s, p, o in g
+        if isinstance(s, BNode) or isinstance(o, BNode)
+    )
+    return bnodes
+
+
+def graph_delta(g: Graph, base: Graph) -> Delta:
+    """
+    Computes the changes turning the base graph into g.
+    """
+    added = [t for t in g if not has_bnode(t) and t not in base]
+    removed = [t for t in base if not has_bnode(t) and t not in g]
+    new_bnodes, base_bnodes = bnode_triples(g), bnode_triples(base)
+    if len(new_bnodes) == len(base_bnodes) and isomorphic(new_bnodes, base_bnodes):
+        return Delta(added, removed)
+    return Delta(added, removed, new_bnodes)
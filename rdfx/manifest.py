@@ -0,0 +1,154 @@
+"""
+A manifest of the files written by rdfx,
+used to skip files whose output is already up to date.
+"""
+
+import hashlib
+import json
+import os
+from pathlib import Path
+from typing import Iterable, Optional, Union
+
+from rdfx import __version__
+
+# no RDF file ending, so prepare_files_list does not pick the manifest up
+MANIFEST_FILENAME = ".rdfx-manifest"
+
+
+def comments_hash(comments: Optional[str]) -> Optional[str]:
+    """
+    Returns the SHA-256 hex digest of the comments, or None if there are none.
+    """
+    if not comments:
+        return None
+    return hashlib.sha256(comments.encode("utf-8")).hexdigest()
+
+
+def file_hash(file_path: Union[Path, str]) -> str:
+    """
+    Returns the SHA-256 hex digest of the content of a file, read in chunks.
+    """
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class Manifest:
+    """
+    Records, per output file, the state of the input files it was made from
+    (path, size, mtime, content hash), the rdfx method (convert, clean, merge),
+    the output format, a hash of the comments prepended to the output and the rdfx version.
+
+    Args:
+        directory (Path): The directory the manifest file is kept in, usually the output directory
+    """
+
+    def __init__(self, directory: Union[Path, str]):
+        self.path = Path(directory) / MANIFEST_FILENAME
+        if self.path.exists():
+            self.entries = json.loads(self.path.read_text(encoding="utf-8"))
+        else:
+            self.entries = {}
+
+    @staticmethod
+    def _key(file_path: Union[Path, str]) -> str:
+        return str(Path(file_path).resolve())
+
+    @staticmethod
+    def _file_state(file_path: Union[Path, str]) -> dict:
+        stat = Path(file_path).stat()
+        return {"size": stat.st_size, "mtime": stat.st_mtime_ns}
+
+    def _is_unchanged(
+        self, file_path: Path, recorded: dict, compare_hash: bool
+    ) -> bool:
+        """
+        A file is unchanged if its size and mtime match the recorded ones,
+        or, if only its mtime differs, its content hash does.
+        """
+        if not file_path.exists():
+            return False
+        state = self._file_state(file_path)
+        if state["size"] != recorded["size"]:
+            return False
+        if state["mtime"] == recorded["mtime"]:
+            return True
+        return compare_hash and file_hash(file_path) == recorded["sha256"]
+
+    def is_up_to_date(
+        self,
+        method: str,
+        output_file_path: Union[Path, str],
+        input_file_paths: Iterable[Union[Path, str]],
+        output_format: str,
+        comments: Optional[str] = None,
+    ) -> bool:
+        """
+        Checks whether the output file was made by this method and version of rdfx,
+        in this format with these comments, from exactly these input files in their current state,
+        and has not been changed since.
+        """
+        entry = self.entries.get(self._key(output_file_path))
+        if entry is None:
+            return False
+        if (
+            entry["method"],
+            entry["format"],
+            entry.get("comments"),
+            entry["version"],
+        ) != (
+            method,
+            output_format,
+            comments_hash(comments),
+            __version__,
+        ):
+            return False
+        if not self._is_unchanged(
+            Path(output_file_path), entry["output"], compare_hash=False
+        ):
+            return False
+        inputs = {self._key(f): Path(f) for f in input_file_paths}
+        if set(inputs) != set(entry["inputs"]):
+            return False
+        return all(
+            self._is_unchanged(file_path, entry["inputs"][key], compare_hash=True)
+            for key, file_path in inputs.items()
+        )
+
+    def record(
+        self,
+        method: str,
+        output_file_path: Union[Path, str],
+        input_file_paths: Iterable[Union[Path, str]],
+        output_format: str,
+        comments: Optional[str] = None,
+    ):
+        """
+        Records the current state of the input files for an output file that has just been written.
+        """
+        inputs = {}
+        for file_path in input_file_paths:
+            state = self._file_state(file_path)
+            state["sha256"] = file_hash(file_path)
+            inputs[self._key(file_path)] = state
+        self.entries[self._key(output_file_path)] = {
+            "method": method,
+            "format": output_format,
+            "comments": comments_hash(comments),
+            "version": __version__,
+            "output": self._file_state(output_file_path),
+            "inputs": inputs,
+        }
+
+    def save(self):
+        """
+        Writes the manifest, replacing the previous one in one step.
+        """
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        temp_path = self.path.with_name(self.path.name + ".tmp")
+        temp_path.write_text(
+            json.dumps(self.entries, indent=2, sort_keys=True), encoding="utf-8"
+        )
+        os.replace(temp_path, self.path)
@@ -1,28 +1,99 @@
 from __future__ import annotations
 
+import asyncio
 import getpass
+import hashlib
 import io
+import itertools
 import json
+import os
+import re
+import shutil
+import threading
+import time
+import uuid
 from abc import ABC, abstractmethod
+from collections import deque
+from concurrent.futures import (
+    FIRST_COMPLETED,
+    ProcessPoolExecutor,
+    ThreadPoolExecutor,
+    as_completed,
+    wait,
+)
 from datetime import datetime
-from http import HTTPStatus
 from io import BytesIO, StringIO
 from json.decoder import JSONDecodeError
 from pathlib import Path
-from typing import Literal, Optional, Tuple, Union, get_args
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    AsyncIterator,
+    Iterable,
+    Iterator,
+    List,
+    Literal,
+    NamedTuple,
+    Optional,
+    Tuple,
+    Union,
+    get_args,
+)
 from urllib.parse import parse_qs
 
 import boto3
 import httpx
+from botocore.config import Config
 from botocore.errorfactory import ClientError
 from rdflib import Graph, URIRef
 
-from rdfx.constants import RDF_FILE_ENDINGS
-
-RDF_FORMATS = Literal["ttl", "turtle", "xml", "json-ld", "nt", "n3"]
+from rdfx import binary
+from rdfx.cache import GraphCache
+from rdfx.chunking import chunk_subjects, subgraph
+from rdfx.compression import (
+    CONTENT_ENCODINGS,
+    CONTENT_TYPES,
+    compressed_name,
+    compressing_writer,
+    decompress,
+    decompressing_reader,
+    open_rdf_file,
+    parse_file,
+    rdf_stem,
+    split_compression,
+)
+from rdfx.constants import (
+    COMPRESSION_FILE_ENDINGS,
+    OUTPUT_FILE_ENDINGS,
+    RDF_FILE_ENDINGS,
+)
+from rdfx.delta import Delta, graph_delta
+from rdfx.manifest import file_hash
+from rdfx.sessions import (
+    SessionStore,
+    drop_shared_client,
+    get_shared_client,
+    share_client,
+)
+from rdfx.streaming import _BNodeLabels, gzip_chunks, iter_ntriples
+
+# the size of the chunks response bodies are read in
+STREAM_CHUNK_SIZE = 1024**2
+
+# a LIMIT or OFFSET at the end of a query, and so of its outermost SELECT
+_TRAILING_LIMIT_OFFSET = re.compile(
+    r"\b(LIMIT|OFFSET)\s+\d+(\s+(LIMIT|OFFSET)\s+\d+)?\s*$", re.IGNORECASE
+)
+
+RDF_FORMATS = Literal["ttl", "turtle", "xml", "json-ld", "nt", "n3", "rdfx-bin"]
 VALID_RDF_FORMATS: Tuple[RDF_FORMATS, ...] = get_args(RDF_FORMATS)
 
+
 class PersistenceSystem(ABC):
+    # an optional on-disk cache of parsed graphs for the read path
+    cache: Optional[GraphCache] = None
+
     def __init__(self):
         pass
 
@@ -78,15 +149,121 @@ class PersistenceSystem(ABC):
         so this will always be called
         `PersistenceSystem.rdf_format_validator(rdf_format)`.
         """
+        if rdf_format == binary.BINARY_FORMAT:
+            raise ValueError(
+                f"{binary.BINARY_FORMAT} is a binary format, use `rdfx.binary.dumps` for it"
+            )
         if leading_comments is None:
-            return g.serialize(format=rdf_format)
+            return g.serialize(
+                format=PersistenceSystem.serializer_format(g, rdf_format)
+            )
         PersistenceSystem.leading_comment_validator(leading_comments, rdf_format)
         content = "".join(f"# {comment}\n" for comment in leading_comments)
         # add a new line after the leading comments
         content += "\n"
-        content += g.serialize(format=rdf_format)
+        content += g.serialize(
+            format=PersistenceSystem.serializer_format(g, rdf_format)
+        )
         return content
 
+    @staticmethod
+    def serialize_to_stream(g, stream, rdf_format, leading_comments):
+        """
+        Writes the leading comments and the serialized graph as UTF-8 bytes to a binary stream,
+        without building the whole serialization in memory first.
+        """
+        PersistenceSystem.leading_comment_validator(leading_comments, rdf_format)
+        if rdf_format == binary.BINARY_FORMAT:
+            stream.write(binary.dumps(g))
+            return
+        if leading_comments is not None:
+            content = "".join(f"# {comment}\n" for comment in leading_comments)
+            # add a new line after the leading comments
+            content += "\n"
+            stream.write(content.encode("utf-8"))
+        g.serialize(
+            destination=stream,
+            format=PersistenceSystem.serializer_format(g, rdf_format),
+            encoding="utf-8",
+        )
+
+    @staticmethod
+    def serializer_format(g, rdf_format) -> str:
+        """
+        Returns the name of the rdflib serializer for an RDF format, e.g. "nquads" for "nq".
+        A graph that is not context aware only has default graph triples,
+        which are written as N-Triples lines, valid N-Quads of the default graph.
+        """
+        rdf_format = RDF_FILE_ENDINGS.get(rdf_format, rdf_format)
+        if rdf_format == "nquads" and not g.context_aware:
+            return "nt"
+        return rdf_format
+
+    @staticmethod
+    def file_suffix(rdf_format) -> str:
+        """
+        Returns the file suffix for an RDF format, e.g. "ttl" for both "ttl" and "turtle".
+        """
+        return OUTPUT_FILE_ENDINGS.get(
+            RDF_FILE_ENDINGS.get(rdf_format, rdf_format), rdf_format
+        )
+
+    @staticmethod
+    def split_leading_comments(stream, rdf_format) -> Tuple[List[str], io.RawIOBase]:
+        """
+        Reads the leading comments of turtle from a binary stream.
+
+        :return: the leading comments, and a binary stream of the rest of the content,
+            starting with the first line that is not a comment
+        """
+        leading_comments = []
+        if rdf_format not in ("turtle", "ttl"):
+            return leading_comments, stream
+        reader = io.BufferedReader(stream, STREAM_CHUNK_SIZE)
+        while True:
+            line = reader.readline()
+            if not line.startswith(b"#"):
+                break
+            leading_comments.append(line.decode("utf-8").lstrip("# ").rstrip("\r\n"))
+        rest = iter(lambda: reader.read(STREAM_CHUNK_SIZE), b"")
+        return leading_comments, _ChunkStream(itertools.chain([line], rest))
+
+    @staticmethod
+    def leading_comments_from_bytes(data: bytes, rdf_format) -> List[str]:
+        """
+        Returns the leading comments of turtle source bytes, without the leading "# ".
+        """
+        leading_comments = []
+        if rdf_format in ("turtle", "ttl"):
+            for line in BytesIO(data):
+                if line.startswith(b"#"):
+                    leading_comments.append(
+                        line.decode("utf-8").lstrip("# ").rstrip("\r\n")
+                    )
+                else:
+                    break
+        return leading_comments
+
+    def parse_cached(
+        self, data: bytes, rdf_format, key: Optional[str] = None
+    ) -> Tuple[List[str], Graph]:
+        """
+        Parses RDF source bytes into their leading comments and a Graph,
+        through the graph cache of this persistence system:
+        unchanged source bytes are only parsed once.
+
+        :param key: The cache key of the data, if already known
+        """
+        if key is None:
+            key = self.cache.key(data, rdf_format)
+        cached = self.cache.get(key)
+        if cached is not None:
+            return cached
+        leading_comments = self.leading_comments_from_bytes(data, rdf_format)
+        graph = Graph().parse(data=data, format=rdf_format)
+        self.cache.put(key, leading_comments, graph)
+        return leading_comments, graph
+
 
 class String(PersistenceSystem):
     """
@@ -96,10 +273,12 @@ class String(PersistenceSystem):
         rdf_format (str): The RDFlib RDF format to serialise the RDF to
         leading_comments (List[str]): Strings to add as comments to the start of the output.
                                       # will be automatically inserted at the start of each
+        cache (GraphCache): A cache of parsed graphs to read through. Optional.
     """
 
-    def __init__(self):
+    def __init__(self, cache: Optional[GraphCache] = None):
         self.name = "String"
+        self.cache = cache
         super().__init__()
 
     def read(self, string: str, rdf_format: RDF_FORMATS = "turtle"):
@@ -113,6 +292,8 @@ class String(PersistenceSystem):
         Returns:
             Graph: The parsed Graph
         """
+        if self.cache is not None:
+            return self.parse_cached(string.encode("utf-8"), rdf_format)
         string_obj = StringIO(string)
         leading_comments = []
         if rdf_format == "turtle":
@@ -143,10 +324,12 @@ class File(PersistenceSystem):
         rdf_format (str): The RDFlib RDF format to serialise the RDF to, defaults to turtle
         leading_comments (List[str]): Strings to add as comments to the start of the output.
                                       # will be automatically inserted at the start of each
+        cache (GraphCache): A cache of parsed graphs to read through. Optional.
     """
 
-    def __init__(self, directory: Union[Path, str]):
+    def __init__(self, directory: Union[Path, str], cache: Optional[GraphCache] = None):
         super().__init__()
+        self.cache = cache
 
         if not isinstance(directory, (Path, str)):
             raise ValueError("The file path must be a string or pathlib Path")
@@ -164,8 +347,21 @@ class File(PersistenceSystem):
         return Path(self.directory / graph_name).exists()
 
     def read(self, filename: str, rdf_format: RDF_FORMATS = "turtle"):
-        leading_comments = []
+        """
+        Reads a file, decompressing it as it is parsed if it has a compression suffix, e.g. .ttl.gz
+
+        :return: The leading comments (turtle only) and the parsed Graph
+        """
         file_path = self.directory / filename
+        if split_compression(filename)[1] is not None:
+            with open_rdf_file(file_path) as f:
+                if self.cache is not None:
+                    return self.parse_cached(f.read(), rdf_format)
+                leading_comments, body = self.split_leading_comments(f, rdf_format)
+                return leading_comments, Graph().parse(body, format=rdf_format)
+        if self.cache is not None:
+            return self.parse_cached(file_path.read_bytes(), rdf_format)
+        leading_comments = []
         graph = Graph().parse(str(file_path), format=rdf_format)
         if rdf_format == "turtle":
             with open(file_path, "r") as f:
@@ -184,12 +380,38 @@ class File(PersistenceSystem):
         rdf_format: RDF_FORMATS = "ttl",
         leading_comments: Optional = None,
         output_file_path: Optional = None,
+        compression: Optional[str] = None,
     ):
+        """
+        Writes the graph to {filename}.{rdf_format}, in the directory or output_file_path if given.
 
+        :param compression: gzip, bzip2, xz or zstd to compress the file as it is written,
+            adding the suffix of the compression, e.g. .ttl.gz. Optional.
+        :return: The path of the file written
+        """
+        name = compressed_name(f"{filename}.{rdf_format}", compression)
         if output_file_path:
-            file_path = output_file_path / f"{filename}.{rdf_format}"
+            file_path = output_file_path / name
         else:
-            file_path = self.directory / f"{filename}.{rdf_format}"
+            file_path = self.directory / name
+
+        if compression is not None:
+            with file_path.open("wb") as f, compressing_writer(
+                f, compression
+            ) as writer:
+                if rdf_format == binary.BINARY_FORMAT:
+                    self.serialize_to_stream(g, writer, rdf_format, leading_comments)
+                else:
+                    with _TrimmedWriter(writer) as trimmed:
+                        self.serialize_to_stream(
+                            g, trimmed, rdf_format, leading_comments
+                        )
+            return file_path
+
+        if rdf_format == binary.BINARY_FORMAT:
+            self.leading_comment_validator(leading_comments, rdf_format)
+            file_path.write_bytes(binary.dumps(g))
+            return file_path
 
         s = self.generate_string(g, rdf_format, leading_comments)
         # remove extra line at end of file
@@ -201,6 +423,194 @@ class File(PersistenceSystem):
         return file_path
 
 
+class _TrimmedWriter(io.RawIOBase):
+    """
+    A writable binary stream writing to another one, except for the last newline of content ending in a blank line,
+    as `File.write` removes it. Trailing newlines are held back until more content follows, or the stream is closed.
+    """
+
+    def __init__(self, stream):
+        super().__init__()
+        self.stream = stream
+        self.newlines = 0
+
+    def writable(self):
+        return True
+
+    def write(self, b) -> int:
+        b = bytes(b)
+        content = b.rstrip(b"\n")
+        if content:
+            self.stream.write(b"\n" * self.newlines + content)
+            self.newlines = 0
+        self.newlines += len(b) - len(content)
+        return len(b)
+
+    def close(self):
+        if not self.closed:
+            self.stream.write(
+                b"\n" * (self.newlines - 1 if self.newlines > 1 else self.newlines)
+            )
+        super().close()
+
+
+class _ChunkStream(io.RawIOBase):
+    """
+    A readable binary stream over an iterator of bytes chunks,
+    e.g. those of an HTTP response body as they arrive.
+    """
+
+    def __init__(self, chunks):
+        super().__init__()
+        self.chunks = iter(chunks)
+        self.pending = memoryview(b"")
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer) -> int:
+        while not self.pending:
+            chunk = next(self.chunks, None)
+            if chunk is None:
+                return 0
+            self.pending = memoryview(chunk)
+        size = min(len(buffer), len(self.pending))
+        buffer[:size] = self.pending[:size]
+        self.pending = self.pending[size:]
+        return size
+
+    def readall(self) -> bytes:
+        content = b"".join([bytes(self.pending), *self.chunks])
+        self.pending = memoryview(b"")
+        return content
+
+
+class _S3MultipartUpload(io.RawIOBase):
+    """
+    A writable binary stream that uploads what is written to it to an S3 object,
+    in parts of part_size bytes, so at most about one part is held in memory.
+    Content that fits in a single part is uploaded with a single put_object call.
+    Call complete() once everything is written, or abort() on failure.
+    """
+
+    def __init__(self, client, bucket: str, key: str, part_size: int, **object_args):
+        super().__init__()
+        self.client = client
+        self.bucket = bucket
+        self.key = key
+        self.part_size = part_size
+        self.object_args = object_args
+        self.buffer = bytearray()
+        self.upload_id = None
+        self.parts = []
+
+    def writable(self):
+        return True
+
+    def write(self, b) -> int:
+        self.buffer += b
+        while len(self.buffer) >= self.part_size:
+            self._upload_part(bytes(self.buffer[: self.part_size]))
+            del self.buffer[: self.part_size]
+        return len(b)
+
+    def _upload_part(self, body: bytes):
+        if self.upload_id is None:
+            self.upload_id = self.client.create_multipart_upload(
+                Bucket=self.bucket, Key=self.key, **self.object_args
+            )["UploadId"]
+        part_number = len(self.parts) + 1
+        response = self.client.upload_part(
+            Body=body,
+            Bucket=self.bucket,
+            Key=self.key,
+            PartNumber=part_number,
+            UploadId=self.upload_id,
+        )
+        self.parts.append({"ETag": response["ETag"], "PartNumber": part_number})
+
+    def complete(self):
+        if self.upload_id is None:
+            self.client.put_object(
+                Body=bytes(self.buffer),
+                Bucket=self.bucket,
+                Key=self.key,
+                **self.object_args,
+            )
+        else:
+            if self.buffer:
+                self._upload_part(bytes(self.buffer))
+            self.client.complete_multipart_upload(
+                Bucket=self.bucket,
+                Key=self.key,
+                UploadId=self.upload_id,
+                MultipartUpload={"Parts": self.parts},
+            )
+        self.buffer = bytearray()
+
+    def abort(self):
+        if self.upload_id is not None:
+            self.client.abort_multipart_upload(
+                Bucket=self.bucket, Key=self.key, UploadId=self.upload_id
+            )
+        self.buffer = bytearray()
+
+
+def _parse_to_binary(data: bytes, rdf_format: str) -> bytes:
+    """
+    Parses RDF source bytes and returns the graph in the rdfx-bin format,
+    which is much cheaper to pass between processes and load than the source.
+    """
+    return binary.dumps(Graph().parse(data=data, format=rdf_format))
+
+
+def _parse_lines_to_binary(data: bytes, bnode_prefix: str) -> bytes:
+    """
+    Parses whole lines of N-Triples and returns the graph in the rdfx-bin format.
+    Blank node labels are kept, with the prefix, so those of all the lines of an object match up.
+    """
+    g = Graph().parse(data=data, format="nt", bnode_context=_BNodeLabels(bnode_prefix))
+    return binary.dumps(g)
+
+
+def s3_etag(file_path: Union[Path, str], part_size: int) -> str:
+    """
+    Returns the ETag S3 gives an object uploaded from the file in parts of part_size bytes, as `S3.sync` does:
+    the MD5 of the content if it is smaller than one part, else the MD5 of the MD5s of the parts and their number.
+    """
+    digests = []
+    size = 0
+    with open(file_path, "rb") as f:
+        for chunk in iter(lambda: f.read(part_size), b""):
+            digests.append(hashlib.md5(chunk).digest())
+            size += len(chunk)
+    if size < part_size:
+        return digests[0].hex() if digests else hashlib.md5(b"").hexdigest()
+    return f"{hashlib.md5(b''.join(digests)).hexdigest()}-{len(digests)}"
+
+
+class TransferResult(NamedTuple):
+    """
+    The outcome of one transfer of a batch:
+    the key or filename it was for, and either its result or the exception it raised.
+    """
+
+    item: str
+    result: Any = None
+    error: Optional[Exception] = None
+
+
+class SyncResult(NamedTuple):
+    """
+    What `S3.sync` did, by key.
+    """
+
+    uploaded: List[str]
+    unchanged: List[str]
+    deleted: List[str]
+    errors: Dict[str, Exception]
+
+
 class S3(PersistenceSystem):
     """
     Persist the graph to S3
@@ -213,10 +623,30 @@ class S3(PersistenceSystem):
         rdf_format (str): The RDFlib RDF format to serialise the RDF to
         leading_comments (List[str]): Strings to add as comments to the start of the output.
                                       # will be automatically inserted at the start of each
+        cache (GraphCache): A cache of parsed graphs to read through. Optional.
+                            The ETag of every object read is recorded with it,
+                            and an unchanged object is not downloaded again.
+        session (boto3.session.Session): A session to create the S3 client from. Optional.
+        client: A boto3 S3 client to use, e.g. one shared with other S3 persistence systems. Optional.
+        max_pool_connections (int): The size of the connection pool of the S3 client created, defaults to 10
+        part_size (int): The size in bytes of the parts written graphs are uploaded in, defaults to 8 MiB.
+                         S3 requires at least 5 MiB.
+
+    Objects with a compression suffix (e.g. .ttl.gz), or a Content-Encoding of gzip, bzip2, xz or zstd,
+    are decompressed as they are read.
     """
 
     def __init__(
-        self, bucket: str, aws_key: str, aws_secret: str, region: str = "ap-southeast-2"
+        self,
+        bucket: str,
+        aws_key: str,
+        aws_secret: str,
+        region: str = "ap-southeast-2",
+        cache: Optional[GraphCache] = None,
+        session: Optional[boto3.session.Session] = None,
+        client=None,
+        max_pool_connections: int = 10,
+        part_size: int = 8 * 1024**2,
     ):
 
         for item in [bucket, aws_key, aws_secret, region]:
@@ -229,6 +659,31 @@ class S3(PersistenceSystem):
         self.aws_key = aws_key
         self.aws_secret = aws_secret
         self.region = region
+        self.cache = cache
+        self.session = session
+        self.max_pool_connections = max_pool_connections
+        self.part_size = part_size
+        self._client = client
+        self._client_lock = threading.Lock()
+
+    @property
+    def client(self):
+        """
+        The boto3 S3 client, created on first use and kept for the lifetime of this persistence system.
+        boto3 clients are thread safe, sessions are not, so it is created under a lock.
+        """
+        if self._client is None:
+            with self._client_lock:
+                if self._client is None:
+                    session = self.session or boto3.session.Session()
+                    self._client = session.client(
+                        "s3",
+                        aws_access_key_id=self.aws_key,
+                        aws_secret_access_key=self.aws_secret,
+                        region_name=self.region,
+                        config=Config(max_pool_connections=self.max_pool_connections),
+                    )
+        return self._client
 
     def asset_exists(self, graph_name: str) -> bool:
         """
@@ -236,37 +691,70 @@ class S3(PersistenceSystem):
         :param graph_name: The key of the object in S3
         :return: boolean
         """
-        args = ["s3"]
-        kwargs = {
-            "aws_access_key_id": self.aws_key,
-            "aws_secret_access_key": self.aws_secret,
-            "region_name": self.region,
-        }
-        client = boto3.client(*args, **kwargs)
         try:
-            client.head_object(Bucket=self.bucket, Key=graph_name)
+            self.client.head_object(Bucket=self.bucket, Key=graph_name)
             return True
         except ClientError:
             return False
 
     def read(self, graph_name, rdf_format: RDF_FORMATS = None):
-        args = ["s3"]
-        kwargs = {
-            "aws_access_key_id": self.aws_key,
-            "aws_secret_access_key": self.aws_secret,
-            "region_name": self.region,
-        }
-        client = boto3.client(*args, **kwargs)
-        object_bytes = client.get_object(Bucket=self.bucket, Key=graph_name)
-        text = StringIO(object_bytes["Body"].read().decode())
-        leading_comments = []
-        if rdf_format in ("turtle", "ttl"):
-            for line in text:
-                if line.startswith("#"):
-                    leading_comments.append(line.lstrip("# ").rstrip("\n"))
-                else:
-                    break
-        return leading_comments, Graph().parse(text, format=rdf_format)
+        """
+        Reads an object, feeding the body to the parser in chunks as it is downloaded.
+
+        :return: The leading comments (turtle only) and the parsed Graph
+        """
+        if self.cache is not None:
+            return self._read_cached(graph_name, rdf_format)
+        s3_object = self.client.get_object(Bucket=self.bucket, Key=graph_name)
+        body = _ChunkStream(s3_object["Body"].iter_chunks(STREAM_CHUNK_SIZE))
+        body = decompressing_reader(body, self._compression(graph_name, s3_object))
+        leading_comments, body = self.split_leading_comments(body, rdf_format)
+        return leading_comments, Graph().parse(body, format=rdf_format)
+
+    @staticmethod
+    def _compression(graph_name: str, s3_object: dict) -> Optional[str]:
+        """
+        Returns the compression of an object, from the suffix of its key or its Content-Encoding.
+        """
+        compression = split_compression(graph_name)[1]
+        if (
+            compression is None
+            and s3_object.get("ContentEncoding") in COMPRESSION_FILE_ENDINGS.values()
+        ):
+            compression = s3_object["ContentEncoding"]
+        return compression
+
+    def _read_cached(self, graph_name, rdf_format):
+        """
+        Reads through the graph cache with a conditional GET:
+        if the ETag of the object is the one recorded when it was last read,
+        S3 answers 304 Not Modified without a body, and the cached graph is returned.
+        """
+        source = f"s3://{self.bucket}/{graph_name}#{rdf_format}"
+        recorded = self.cache.get_source(source)
+        if recorded is not None:
+            etag, key = recorded
+            try:
+                s3_object = self.client.get_object(
+                    Bucket=self.bucket, Key=graph_name, IfNoneMatch=etag
+                )
+            except ClientError as e:
+                if e.response["Error"]["Code"] not in ("304", "NotModified"):
+                    raise
+                cached = self.cache.get(key)
+                if cached is not None:
+                    return cached
+                # the entry has been evicted since
+                s3_object = self.client.get_object(Bucket=self.bucket, Key=graph_name)
+        else:
+            s3_object = self.client.get_object(Bucket=self.bucket, Key=graph_name)
+        data = decompress(
+            s3_object["Body"].read(), self._compression(graph_name, s3_object)
+        )
+        key = self.cache.key(data, rdf_format)
+        result = self.parse_cached(data, rdf_format, key)
+        self.cache.put_source(source, s3_object["ETag"], key)
+        return result
 
     def write(
         self,
@@ -274,37 +762,429 @@ class S3(PersistenceSystem):
         filename: str,
         rdf_format: RDF_FORMATS = "ttl",
         leading_comments: Optional = None,
+        metadata: Optional[Dict[str, str]] = None,
+        compression: Optional[str] = None,
     ):
-        filename = f"{filename}.{rdf_format}"
-        s = self.generate_string(g, rdf_format, leading_comments)
-        bytes_obj = BytesIO(s.encode("utf-8"))
+        """
+        Serializes the graph straight into an S3 (multipart) upload, in parts of part_size bytes.
+
+        :param metadata: User metadata to store with the object. Optional.
+        :param compression: gzip, bzip2, xz or zstd to compress the object as it is uploaded,
+            adding the suffix of the compression to the key.
+            The Content-Encoding is set for gzip and zstd, the Content-Type for bzip2 and xz. Optional.
+        :return: The key of the object written, the filename with the suffix for the RDF format
+        """
+        key = compressed_name(f"{filename}.{self.file_suffix(rdf_format)}", compression)
+        object_args = {"Metadata": metadata} if metadata else {}
+        if compression in CONTENT_ENCODINGS:
+            object_args["ContentEncoding"] = compression
+        elif compression is not None:
+            object_args["ContentType"] = CONTENT_TYPES[compression]
+        upload = _S3MultipartUpload(
+            self.client, self.bucket, key, self.part_size, **object_args
+        )
+        try:
+            if compression is None:
+                self.serialize_to_stream(g, upload, rdf_format, leading_comments)
+            else:
+                with compressing_writer(upload, compression) as writer:
+                    self.serialize_to_stream(g, writer, rdf_format, leading_comments)
+            upload.complete()
+        except BaseException:
+            upload.abort()
+            raise
+        return key
+
+    def read_parallel(
+        self,
+        graph_name: str,
+        range_size: int = 32 * 1024**2,
+        max_workers: Optional[int] = None,
+        processes: Optional[int] = None,
+    ) -> Tuple[List[str], Graph]:
+        """
+        Reads a (large) N-Triples object with concurrent HTTP Range requests of range_size bytes,
+        parsing the ranges in worker processes as they arrive.
+        Each range is cut back to its last new line, with the rest carried over to the next range,
+        so every piece handed to a parser holds whole lines only.
+        At most 2 * max_workers ranges are downloaded ahead of the parsing, so the memory used is bounded
+        by the range size rather than the object size.
+
+        :param graph_name: The key of the N-Triples object
+        :param range_size: The size in bytes of the ranges requested
+        :param max_workers: The number of concurrent range requests, defaults to max_pool_connections
+        :param processes: The number of worker processes parsing, defaults to the number of CPUs,
+            1 parses in this process
+        :return: No leading comments (N-Triples has none) and the parsed Graph
+        """
+        if range_size < 1:
+            raise ValueError("range_size must be at least 1")
+        head = self.client.head_object(Bucket=self.bucket, Key=graph_name)
+        size = head["ContentLength"]
+        if max_workers is None:
+            max_workers = self.max_pool_connections
+
+        def get_range(start: int) -> bytes:
+            # IfMatch fails the read if the object is replaced while its ranges are downloaded
+            return self.client.get_object(
+                Bucket=self.bucket,
+                Key=graph_name,
+                Range=f"bytes={start}-{min(start + range_size, size) - 1}",
+                IfMatch=head["ETag"],
+            )["Body"].read()
+
+        def ranges(fetchers):
+            # at most 2 * max_workers ranges are downloaded ahead of the one being parsed
+            starts = iter(range(0, size, range_size))
+            downloads = deque(
+                fetchers.submit(get_range, start)
+                for start in itertools.islice(starts, 2 * max_workers)
+            )
+            while downloads:
+                data = downloads.popleft().result()
+                downloads.extend(
+                    fetchers.submit(get_range, start)
+                    for start in itertools.islice(starts, 1)
+                )
+                yield data
+
+        def pieces(data_ranges):
+            carry = b""
+            for data in data_ranges:
+                data = carry + data
+                end = data.rfind(b"\n") + 1
+                if end:
+                    yield data[:end]
+                carry = data[end:]
+            if carry:
+                yield carry
+
+        g = Graph()
+        bnode_prefix = f"r{uuid.uuid4().hex}"
+        with ThreadPoolExecutor(max_workers=max_workers) as fetchers:
+            if processes == 1:
+                for piece in pieces(ranges(fetchers)):
+                    g.parse(
+                        data=piece,
+                        format="nt",
+                        bnode_context=_BNodeLabels(bnode_prefix),
+                    )
+                return [], g
+            # likewise at most 2 pieces per process wait to be parsed
+            max_parses = 2 * (processes or os.cpu_count() or 1)
+            with ProcessPoolExecutor(max_workers=processes) as parsers:
+                parses = deque()
+                for piece in pieces(ranges(fetchers)):
+                    parses.append(
+                        parsers.submit(_parse_lines_to_binary, piece, bnode_prefix)
+                    )
+                    while len(parses) > max_parses:
+                        binary.loads(parses.popleft().result(), g)
+                while parses:
+                    binary.loads(parses.popleft().result(), g)
+        return [], g
+
+    def list_keys(self, prefix: str = "") -> Iterable[str]:
+        """
+        Lists the keys of the objects under the prefix, a page of up to 1000 keys at a time.
+        """
+        for s3_object in self._list_objects(prefix):
+            yield s3_object["Key"]
+
+    def _list_objects(self, prefix: str) -> Iterable[dict]:
+        paginator = self.client.get_paginator("list_objects_v2")
+        for page in paginator.paginate(Bucket=self.bucket, Prefix=prefix):
+            yield from page.get("Contents", [])
+
+    def _upload_file(self, file_path: Path, key: str):
+        # the same parts as s3_etag expects
+        upload = _S3MultipartUpload(self.client, self.bucket, key, self.part_size)
         try:
-            import boto3
-            import botocore
-        except ImportError:
+            with open(file_path, "rb") as f:
+                shutil.copyfileobj(f, upload, self.part_size)
+            upload.complete()
+        except BaseException:
+            upload.abort()
             raise
-        args = ["s3"]
-        kwargs = {
-            "aws_access_key_id": self.aws_key,
-            "aws_secret_access_key": self.aws_secret,
-            "region_name": self.region,
+
+    def sync(
+        self,
+        files: List[Path],
+        prefix: str = "",
+        rdf_format: RDF_FORMATS = None,
+        delete: bool = False,
+        max_workers: Optional[int] = None,
+    ) -> SyncResult:
+        """
+        Mirrors RDF files to the objects under the prefix, transferring only what differs.
+
+        Files uploaded as they are (rdf_format None) are compared to the ETags from listing the prefix,
+        so an unchanged file costs no request beyond the listing.
+        Files converted to rdf_format are stored with the SHA-256 of their source file in the object metadata,
+        which is compared with concurrent head_object requests.
+
+        :param files: The local files, all at the top level of the prefix, keyed by their names,
+            which must not repeat, e.g. for files of the same name in different directories
+        :param prefix: The key prefix to mirror to, e.g. "vocabs"
+        :param rdf_format: The RDF format to convert the files to, None to upload them as they are
+        :param delete: Also delete the objects under the prefix that have no local file
+        :param max_workers: The number of concurrent transfers, defaults to max_pool_connections
+        :return: The keys uploaded, unchanged and deleted, and the errors by key
+        """
+        prefix = f"{prefix.strip('/')}/" if prefix.strip("/") else ""
+        remote = {
+            s3_object["Key"]: s3_object["ETag"].strip('"')
+            for s3_object in self._list_objects(prefix)
+            # only the top level of the prefix is mirrored
+            if "/" not in s3_object["Key"][len(prefix) :]
         }
-        client = boto3.client(*args, **kwargs)
-        response = client.put_object(Body=bytes_obj, Bucket=self.bucket, Key=filename)
-        if response["ResponseMetadata"]["HTTPStatusCode"] == HTTPStatus.OK:
-            return filename
-        response.raise_for_status()
+        keys = {}
+        for file_path in files:
+            file_path = Path(file_path)
+            if rdf_format is None:
+                key = f"{prefix}{file_path.name}"
+            else:
+                key = f"{prefix}{rdf_stem(file_path)}.{self.file_suffix(rdf_format)}"
+            if key in keys:
+                raise ValueError(
+                    f"{keys[key]} and {file_path} would both be synced to {key}"
+                )
+            keys[key] = file_path
+
+        def sync_file(file_path: Path, key: str) -> bool:
+            if rdf_format is None:
+                # hashing the file is only worth it if there is an object to compare it with
+                if key in remote and remote[key] == s3_etag(file_path, self.part_size):
+                    return False
+                self._upload_file(file_path, key)
+                return True
+            source_hash = file_hash(file_path)
+            if key in remote:
+                metadata = self.client.head_object(Bucket=self.bucket, Key=key)[
+                    "Metadata"
+                ]
+                if (
+                    metadata.get("rdfx-source-sha256"),
+                    metadata.get("rdfx-format"),
+                ) == (
+                    source_hash,
+                    rdf_format,
+                ):
+                    return False
+            name = split_compression(file_path.name)[0]
+            input_format = RDF_FILE_ENDINGS.get(Path(name).suffix.lstrip("."))
+            g = parse_file(Graph(), file_path, input_format)
+            self.write(
+                g,
+                f"{prefix}{rdf_stem(file_path)}",
+                rdf_format,
+                metadata={"rdfx-source-sha256": source_hash, "rdfx-format": rdf_format},
+            )
+            return True
+
+        result = SyncResult([], [], [], {})
+        for transfer in self._transfer_many(
+            sync_file,
+            ((key, (file_path, key)) for key, file_path in keys.items()),
+            max_workers,
+        ):
+            if transfer.error is not None:
+                result.errors[transfer.item] = transfer.error
+            elif transfer.result:
+                result.uploaded.append(transfer.item)
+            else:
+                result.unchanged.append(transfer.item)
+
+        if delete:
+            stale = sorted(set(remote) - set(keys))
+            for i in range(0, len(stale), 1000):
+                response = self.client.delete_objects(
+                    Bucket=self.bucket,
+                    Delete={
+                        "Objects": [{"Key": key} for key in stale[i : i + 1000]],
+                        "Quiet": True,
+                    },
+                )
+                failed = {error["Key"]: error for error in response.get("Errors", [])}
+                for key in stale[i : i + 1000]:
+                    if key in failed:
+                        result.errors[key] = Exception(failed[key].get("Message"))
+                    else:
+                        result.deleted.append(key)
+        return result
+
+    def _get_bytes(self, key: str) -> bytes:
+        s3_object = self.client.get_object(Bucket=self.bucket, Key=key)
+        return decompress(s3_object["Body"].read(), self._compression(key, s3_object))
+
+    def merge_prefix(
+        self,
+        prefix: str = "",
+        rdf_format: RDF_FORMATS = None,
+        max_workers: Optional[int] = None,
+        processes: Optional[int] = None,
+    ) -> Graph:
+        """
+        Merges all objects under the prefix into one graph.
+
+        The objects are downloaded concurrently and parsed in worker processes as they arrive,
+        each parsed graph coming back in the rdfx-bin format to be loaded into the merged graph as soon as it is done.
+        At most 2 downloads per thread and 2 parses per process are in flight,
+        so the memory used does not grow with the number of objects.
+
+        :param prefix: The key prefix of the objects to merge, e.g. "exports/2021/"
+        :param rdf_format: The RDF format of all the objects. If None, it is taken from the suffix of each key,
+            and objects without a known RDF suffix are skipped.
+        :param max_workers: The number of concurrent downloads, defaults to max_pool_connections
+        :param processes: The number of worker processes parsing, defaults to the number of CPUs,
+            1 parses in this process
+        :return: The merged Graph
+        """
+        keys = {}
+        for key in self.list_keys(prefix):
+            key_format = rdf_format or RDF_FILE_ENDINGS.get(
+                split_compression(key)[0].rsplit(".", 1)[-1]
+            )
+            if key_format is not None:
+                keys[key] = key_format
+        if max_workers is None:
+            max_workers = self.max_pool_connections
+
+        merged = Graph()
+        # create the client up front, rather than have the download threads wait on its lock
+        _ = self.client
+        with ThreadPoolExecutor(max_workers=max_workers) as fetchers:
+            pending_keys = iter(keys)
+            downloads = {}
+
+            def download_more():
+                for key in itertools.islice(
+                    pending_keys, 2 * max_workers - len(downloads)
+                ):
+                    downloads[fetchers.submit(self._get_bytes, key)] = key
+
+            def downloaded():
+                # every future is dropped once it is consumed, so its content can be freed
+                download_more()
+                while downloads:
+                    for download in wait(downloads, return_when=FIRST_COMPLETED).done:
+                        key = downloads.pop(download)
+                        yield key, download.result()
+                    download_more()
+
+            if processes == 1:
+                for key, data in downloaded():
+                    merged.parse(data=data, format=keys[key])
+                return merged
+            max_parses = 2 * (processes or os.cpu_count() or 1)
+            with ProcessPoolExecutor(max_workers=processes) as parsers:
+                parses = set()
+
+                def load(finished):
+                    for parse in finished:
+                        parses.remove(parse)
+                        binary.loads(parse.result(), merged)
+
+                for key, data in downloaded():
+                    parses.add(parsers.submit(_parse_to_binary, data, keys[key]))
+                    load([parse for parse in parses if parse.done()])
+                    while len(parses) > max_parses:
+                        load(wait(parses, return_when=FIRST_COMPLETED).done)
+                load(as_completed(parses))
+        return merged
+
+    def _transfer_many(
+        self, transfer, items, max_workers: Optional[int]
+    ) -> List[TransferResult]:
+        """
+        Calls `transfer(*args)` for every (item, args) pair on a pool of threads sharing the client.
+        Only a few items per thread are taken ahead from `items`, so it can be a lazy iterable.
+        """
+        if max_workers is None:
+            max_workers = self.max_pool_connections
+        if max_workers < 1:
+            raise ValueError("max_workers must be at least 1")
+        results = []
+        pending = deque()
+
+        def collect(keep: int):
+            while len(pending) > keep:
+                item, future = pending.popleft()
+                try:
+                    results.append(TransferResult(item, future.result()))
+                except Exception as e:
+                    results.append(TransferResult(item, error=e))
+
+        # create the client before the threads need it
+        self.client
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            for item, args in items:
+                pending.append((item, executor.submit(transfer, *args)))
+                collect(2 * max_workers)
+            collect(0)
+        return results
+
+    def read_many(
+        self,
+        graph_names: Iterable[str],
+        rdf_format: RDF_FORMATS = None,
+        max_workers: Optional[int] = None,
+    ) -> List[TransferResult]:
+        """
+        Reads many objects concurrently, see `read`.
+
+        :param graph_names: The keys of the objects to read
+        :param max_workers: The number of concurrent transfers, defaults to max_pool_connections
+        :return: A TransferResult per key, in order, with the leading comments and Graph as result
+        """
+        return self._transfer_many(
+            self.read,
+            ((graph_name, (graph_name, rdf_format)) for graph_name in graph_names),
+            max_workers,
+        )
+
+    def write_many(
+        self,
+        graphs: Iterable[Tuple[Graph, str]],
+        rdf_format: RDF_FORMATS = "ttl",
+        leading_comments: Optional = None,
+        max_workers: Optional[int] = None,
+        compression: Optional[str] = None,
+    ) -> List[TransferResult]:
+        """
+        Writes many graphs concurrently, see `write`.
+
+        :param graphs: (Graph, filename) pairs, taken lazily, so the graphs can be generated as they are written
+        :param max_workers: The number of concurrent transfers, defaults to max_pool_connections
+        :return: A TransferResult per filename, in order, with the key written as result
+        """
+        return self._transfer_many(
+            self.write,
+            (
+                (
+                    filename,
+                    (g, filename, rdf_format, leading_comments, None, compression),
+                )
+                for g, filename in graphs
+            ),
+            max_workers,
+        )
+
 
 class GraphDB(PersistenceSystem):
     """
-    Persist to an instance of GraphDB
+    Persist to an instance of GraphDB, through the RDF4J repository REST API, on a pooled HTTP client.
+    Graphs are written in chunks inside one transaction, each chunk streamed as N-Triples,
+    so large loads neither run into the timeout nor need the whole payload in memory.
 
     Args:
-        location (str): The IRI of the GraphDB system. Something like http://localhost:7200 (no training slash)
+        location (str): The IRI of the GraphDB system. Something like http://localhost:7200 (no trailing slash)
         repo_id (str): The ID of the repository on this GraphDB system to persist to
-        graph_iri (str): The IRI of the graph to write to. Optional. Default is non (default graph)
         username (str): The username of a user on this GraphDB instance. Optional.
         password (str): The password of the user on this GraphDB instance. Optional.
+        timeout (int): The timeout of the requests in seconds, defaults to 60
+        transport (httpx.BaseTransport): The transport of the HTTP client, e.g. an httpx.MockTransport for testing. Optional.
+        limits (httpx.Limits): The connection pool and keep-alive limits of the HTTP client. Optional.
     """
 
     def __init__(
@@ -313,6 +1193,9 @@ class GraphDB(PersistenceSystem):
         repo_id: str,
         username: Optional[str] = None,
         password: Optional[str] = None,
+        timeout: Optional[int] = 60,
+        transport: Optional[httpx.BaseTransport] = None,
+        limits: Optional[httpx.Limits] = None,
     ):
         self.name = "GraphDB"
 
@@ -328,30 +1211,128 @@ class GraphDB(PersistenceSystem):
         self.repo_id = repo_id
         self.username = username
         self.password = password
+        self.timeout = timeout
+        self.client = httpx.Client(
+            auth=(username, password or "") if username else None,
+            timeout=timeout,
+            transport=transport,
+            **({"limits": limits} if limits is not None else {}),
+        )
 
     def __repr__(self):
         return "GraphDB"
 
-    def write(self, g: Graph, graph_iri):
-        if graph_iri is not None and not (
-            graph_iri.startswith("http") or graph_iri.startswith("urn")
-        ):
+    @property
+    def repository_location(self) -> str:
+        return f"{self.location}/repositories/{self.repo_id}"
+
+    @staticmethod
+    def _context(graph_iri: Optional[str]) -> str:
+        """
+        Returns the RDF4J context parameter of a graph, "null" for the default graph.
+        """
+        if graph_iri is None:
+            return "null"
+        if not (graph_iri.startswith("http") or graph_iri.startswith("urn")):
             raise ValueError(
                 f"The value you supplied for graph_iri ({graph_iri}) is not valid"
             )
-        raise NotImplemented
+        return f"<{graph_iri}>"
+
+    @staticmethod
+    def _check(response: httpx.Response, action: str):
+        if response.status_code not in (200, 201, 204):
+            raise Exception(
+                f"Error {action} GraphDB. Status code: {response.status_code}. Response: {response.text}"
+            )
+
+    def write(
+        self,
+        g: Graph,
+        graph_iri: Optional[str] = None,
+        replace: bool = True,
+        max_triples: int = 100_000,
+        progress: Optional[Callable[[int, int], None]] = None,
+    ):
+        """
+        Writes a graph in one transaction, as chunks of at most max_triples triples,
+        split by subject with blank nodes kept together with the triples referring to them
+        (see `rdfx.chunking.chunk_subjects`), as blank nodes sent in separate requests become separate nodes.
+        The transaction is rolled back if any chunk fails.
+
+        :param graph_iri: The graph to write to, the default graph if None
+        :param replace: Whether to replace the graph, or add the triples to it
+        :param progress: Called with the number of chunks written and the total number of chunks after each chunk
+        """
+        context = self._context(graph_iri)
+        chunks = chunk_subjects(g, max_triples) if len(g) else []
+        response = self.client.post(self.repository_location + "/transactions")
+        self._check(response, "starting a transaction on")
+        transaction = response.headers["Location"]
+        try:
+            if replace:
+                graph = "DEFAULT" if graph_iri is None else f"GRAPH <{graph_iri}>"
+                response = self.client.put(
+                    transaction,
+                    params={"action": "UPDATE"},
+                    data={"update": f"CLEAR SILENT {graph}"},
+                )
+                self._check(response, "clearing the graph in")
+            for index, subjects in enumerate(chunks):
+                triples = itertools.chain.from_iterable(
+                    g.triples((s, None, None)) for s in subjects
+                )
+                response = self.client.put(
+                    transaction,
+                    params={"action": "ADD", "context": context},
+                    content=iter_ntriples(triples),
+                    headers={"Content-Type": "application/n-triples"},
+                )
+                self._check(response, f"writing chunk {index + 1} of {len(chunks)} to")
+                if progress:
+                    progress(index + 1, len(chunks))
+            response = self.client.put(transaction, params={"action": "COMMIT"})
+            self._check(response, "committing to")
+        except Exception:
+            self.client.delete(transaction)
+            raise
+
+    def read(self, graph_iri: Optional[str] = None) -> Graph:
+        """
+        Reads a graph, the default graph if graph_iri is None, parsing the N-Triples as they are downloaded.
+        """
+        with self.client.stream(
+            "GET",
+            self.repository_location + "/statements",
+            params={"context": self._context(graph_iri)},
+            headers={"Accept": "application/n-triples"},
+        ) as response:
+            if response.status_code != 200:
+                response.read()
+                self._check(response, "reading from")
+            return Graph().parse(
+                _ChunkStream(response.iter_bytes(STREAM_CHUNK_SIZE)), format="nt"
+            )
+
+    def close(self):
+        self.client.close()
 
 
 class Fuseki(PersistenceSystem):
     """
-    Persist to an instance of Fuseki
+    Persist to a dataset of an instance of Fuseki, through the SPARQL Graph Store Protocol, on a pooled HTTP client.
+    Graphs are uploaded as N-Triples, optionally gzipped, streamed from the Graph without building the whole
+    serialization, and downloaded graphs are parsed as they arrive.
 
     Args:
-        location (str): The IRI of the GraphDB system. Something like http://localhost:7200 (no training slash)
-        repo_id (str): The ID of the repository on this GraphDB system to persist to
-        graph_iri (str): The IRI of the graph to write to. Optional. Default is non (default graph)
+        location (str): The IRI of the Fuseki system. Something like http://localhost:3030 (no trailing slash)
+        repo_id (str): The name of the dataset on this Fuseki system to persist to
         username (str): The username of a user on this Fuseki instance. Optional.
         password (str): The password of the user on this Fuseki instance. Optional.
+        timeout (int): The timeout of the requests in seconds, defaults to 60
+        gzip (bool): Whether to gzip the uploads, defaults to False
+        transport (httpx.BaseTransport): The transport of the HTTP client, e.g. an httpx.MockTransport for testing. Optional.
+        limits (httpx.Limits): The connection pool and keep-alive limits of the HTTP client. Optional.
     """
 
     def __init__(
@@ -360,6 +1341,10 @@ class Fuseki(PersistenceSystem):
         repo_id: str,
         username: Optional[str] = None,
         password: Optional[str] = None,
+        timeout: Optional[int] = 60,
+        gzip: bool = False,
+        transport: Optional[httpx.BaseTransport] = None,
+        limits: Optional[httpx.Limits] = None,
     ):
 
         if location is None or not location.startswith("http"):
@@ -374,15 +1359,114 @@ class Fuseki(PersistenceSystem):
         self.repo_id = repo_id
         self.username = username
         self.password = password
+        self.timeout = timeout
+        self.gzip = gzip
+        self.client = httpx.Client(
+            auth=(username, password or "") if username else None,
+            timeout=timeout,
+            transport=transport,
+            **({"limits": limits} if limits is not None else {}),
+        )
 
-    def write(self, g: Graph, graph_iri):
-        if graph_iri is not None and not (
-            graph_iri.startswith("http") or graph_iri.startswith("urn")
-        ):
+    def __repr__(self):
+        return "Fuseki"
+
+    def _graph_url(self, graph_iri: Optional[str]) -> httpx.URL:
+        """
+        Returns the Graph Store Protocol URL of a graph, the default graph if graph_iri is None.
+        The query is part of the URL, as httpx replaces the query of a URL with any params passed, even empty ones.
+        """
+        url = f"{self.location}/{self.repo_id}/data"
+        if graph_iri is None:
+            return httpx.URL(url + "?default")
+        if not (graph_iri.startswith("http") or graph_iri.startswith("urn")):
             raise ValueError(
                 f"The value you supplied for graph_iri ({graph_iri}) is not valid"
             )
-        raise NotImplemented
+        return httpx.URL(url, params={"graph": graph_iri})
+
+    def write(self, g: Graph, graph_iri: Optional[str] = None, replace: bool = True):
+        """
+        Writes a graph, streamed as N-Triples (gzipped if gzip)
+
+        :param graph_iri: The graph to write to, the default graph if None
+        :param replace: Whether to replace the graph (PUT), or add the triples to it (POST)
+        """
+        url = self._graph_url(graph_iri)
+        body = iter_ntriples(g)
+        headers = {"Content-Type": "application/n-triples"}
+        if self.gzip:
+            body = gzip_chunks(body)
+            headers["Content-Encoding"] = "gzip"
+        response = self.client.request(
+            "PUT" if replace else "POST", url, content=body, headers=headers
+        )
+        if response.status_code not in (200, 201, 204):
+            raise Exception(
+                f"Error writing to Fuseki. Status code: {response.status_code}. Response: {response.text}"
+            )
+
+    def read(self, graph_iri: Optional[str] = None) -> Graph:
+        """
+        Reads a graph, the default graph if graph_iri is None, parsing the N-Triples as they are downloaded.
+        """
+        url = self._graph_url(graph_iri)
+        with self.client.stream(
+            "GET", url, headers={"Accept": "application/n-triples"}
+        ) as response:
+            if response.status_code != 200:
+                response.read()
+                raise Exception(
+                    f"Error reading from Fuseki. Status code: {response.status_code}. Response: {response.text}"
+                )
+            return Graph().parse(
+                _ChunkStream(response.iter_bytes(STREAM_CHUNK_SIZE)), format="nt"
+            )
+
+    def asset_exists(self, graph_iri: str) -> bool:
+        """
+        Checks whether a graph exists in the dataset, returns True or False
+        """
+        response = self.client.head(self._graph_url(graph_iri))
+        if response.status_code == 404:
+            return False
+        if response.status_code != 200:
+            raise Exception(
+                f"Error checking a graph in Fuseki. Status code: {response.status_code}"
+            )
+        return True
+
+    def close(self):
+        self.client.close()
+
+
+class _TTLCache:
+    """
+    An in-process cache whose entries expire ttl seconds after they were put.
+    With a ttl of None (or 0), nothing is cached.
+    """
+
+    def __init__(self, ttl: Optional[float]):
+        self.ttl = ttl
+        self.entries = {}
+
+    def get(self, key):
+        if not self.ttl:
+            return None
+        entry = self.entries.get(key)
+        if entry is None or entry[1] < time.monotonic():
+            return None
+        return entry[0]
+
+    def put(self, key, value):
+        if self.ttl:
+            self.entries[key] = (value, time.monotonic() + self.ttl)
+
+    def pop(self, key):
+        self.entries.pop(key, None)
+
+    def clear(self):
+        self.entries.clear()
 
 
 class SOPGraph:
@@ -412,8 +1496,23 @@ class SOP(PersistenceSystem):
         username (str): The username of a user on this SOP instance. Optional.
         password (str): The password of the user on this SOP instance. Optional.
         local (bool): Whether the SOP persistence system is for a local or remote SOP system
+        cache (GraphCache): A cache of parsed graphs to read through. Optional.
+        transport (httpx.BaseTransport): The transport of the HTTP client, e.g. an httpx.MockTransport for testing. Optional.
+        exists_ttl (float): The number of seconds to cache the answers of asset_exists and assets_exist for. Optional.
+                            Writes and creating assets invalidate the cached answers.
+        statistics_ttl (float): The number of seconds to cache the answers of asset_statistics for. Optional.
+                                Writes and creating assets invalidate the cached answers.
+        session_store (SessionStore): A store of session cookies on disk, to reuse the login of earlier processes. Optional.
+        session_ttl (float): The number of seconds a stored login is reused for, defaults to 30 minutes
+        shared_session (bool): Whether to share one logged in client, and its connection pool,
+                               with the other SOP instances of this process for the same location and username
+        limits (httpx.Limits): The connection pool and keep-alive limits of the HTTP client. Optional.
+        http2 (bool): Whether to use HTTP/2, which requires the h2 package (`pip install rdfx[http2]`)
     """
 
+    # whether the client is created, and logged in, when the persistence system is
+    _login_on_init = True
+
     def __init__(
         self,
         location: Optional[str] = "http://localhost:8083",
@@ -421,28 +1520,50 @@ class SOP(PersistenceSystem):
         auth_type: Optional[str] = "Basic",
         password: Optional[str] = None,
         timeout: Optional[int] = 60,
+        cache: Optional[GraphCache] = None,
+        transport: Optional[httpx.BaseTransport] = None,
+        exists_ttl: Optional[float] = None,
+        statistics_ttl: Optional[float] = None,
+        session_store: Optional[SessionStore] = None,
+        session_ttl: float = 30 * 60,
+        shared_session: bool = False,
+        limits: Optional[httpx.Limits] = None,
+        http2: bool = False,
     ):
         if not location.startswith("http"):
             raise ValueError(
                 f'The value you supplied for location ({location}) must start with "http" or "https"'
             )
 
-        self.location = location
+        self.location = location + "/tbl"
         self.auth_type = auth_type
         self.username = username
         self.password = password
         self.client = None
         self.timeout = timeout
+        self.cache = cache
+        self.transport = transport
+        self._exists_cache = _TTLCache(exists_ttl)
+        self._statistics_cache = _TTLCache(statistics_ttl)
+        self.session_store = session_store
+        self.session_ttl = session_ttl
+        self.shared_session = shared_session
+        self.limits = limits
+        self.http2 = http2
         self.local = True if location.startswith("http://localhost") else False
-        self._create_client()
+        if self._login_on_init:
+            self._create_client()
 
-    def write(self, g: Graph, graph_iri, leading_comments=None):
-        if not (graph_iri.startswith("http") or graph_iri.startswith("urn")):
+    def _write_request(
+        self, g: Graph, graph_iri, leading_comments
+    ) -> Tuple[dict, bytes, dict]:
+        """
+        Returns the form data, file content and headers of the request writing a graph.
+        """
+        if not (graph_iri.startswith("http") or graph_iri.startswith("urn")):
             raise ValueError(
                 f"The value you supplied for graph_iri ({graph_iri}) is not valid"
             )
-        if not self.client:
-            self._create_client()
         content = self.generate_string(g, "ttl", leading_comments)
         headers = {}
         if self.local:
@@ -459,18 +1580,166 @@ class SOP(PersistenceSystem):
         }
         if graph_iri.startswith("urn:x-evn-tag"):
             form_data["tag"] = SOP.tag_from_workflow(graph_iri)
+        return form_data, content.encode("utf-8"), headers
+
+    @staticmethod
+    def _write_result(response: httpx.Response):
+        if response.status_code != 200:
+            raise Exception(
+                f"Error writing to SOP. Status code: {response.status_code}. Response: {response.text}"
+            )
+        return parse_qs(response.text)["message"][0]
+
+    def write(self, g: Graph, graph_iri, leading_comments=None):
+        form_data, content, headers = self._write_request(
+            g, graph_iri, leading_comments
+        )
+        if not self.client:
+            self._create_client()
         response = self.client.post(
             self.location + "/importFileUpload",
             data=form_data,
-            files={"file": io.BytesIO(bytes(content.encode("utf-8")))},
+            files={"file": io.BytesIO(content)},
             headers=headers,
             timeout=self.timeout,
         )
-        if response.status_code != 200:
+        self._invalidate_cached(graph_iri)
+        return self._write_result(response)
+
+    def write_chunked(
+        self,
+        g: Graph,
+        graph_iri,
+        leading_comments=None,
+        max_triples: int = 100_000,
+        parallel: int = 1,
+        retries: int = 3,
+        backoff: float = 1.0,
+        progress: Optional[Callable[[int, int], None]] = None,
+    ) -> List[str]:
+        """
+        Writes a (very large) graph in chunks of at most max_triples triples, each imported with its own request,
+        so no request runs into the timeout or grows too large.
+        The triples are split by subject, keeping blank nodes with the triples referring to them
+        (see `rdfx.chunking.chunk_subjects`). The leading comments go with the first chunk.
+
+        :param parallel: The number of chunks uploaded at a time, 1 uploads them in order
+        :param retries: The number of times a failed chunk is retried, waiting backoff * 2^attempt seconds in between
+        :param progress: Called with the number of chunks written and the total number of chunks after each chunk
+        :return: The messages SOP returned for the chunks, in order
+        """
+        chunks = chunk_subjects(g, max_triples)
+        total = len(chunks)
+
+        def write_chunk(index: int) -> str:
+            chunk = subgraph(g, chunks[index])
+            comments = leading_comments if index == 0 else None
+            for attempt in range(retries + 1):
+                try:
+                    return self.write(chunk, graph_iri, comments)
+                except Exception as e:
+                    if attempt == retries:
+                        raise Exception(
+                            f"Error writing chunk {index + 1} of {total} to SOP after {retries + 1} attempts"
+                        ) from e
+                    time.sleep(backoff * 2**attempt)
+
+        if parallel <= 1:
+            messages = []
+            for index in range(total):
+                messages.append(write_chunk(index))
+                if progress:
+                    progress(index + 1, total)
+            return messages
+        if not self.client:
+            self._create_client()
+        with ThreadPoolExecutor(max_workers=parallel) as executor:
+            futures = [executor.submit(write_chunk, index) for index in range(total)]
+            for done, future in enumerate(as_completed(futures), 1):
+                future.result()
+                if progress:
+                    progress(done, total)
+            return [future.result() for future in futures]
+
+    @staticmethod
+    def _data_update(operation: str, graph_iri, triples: Iterable[tuple]) -> str:
+        data = "\n".join(f"{s.n3()} {p.n3()} {o.n3()} ." for s, p, o in triples)
+        return f"{operation} DATA {{ GRAPH <{graph_iri}> {{\n{data}\n}} }}"
+
+    def _delta_updates(self, delta: Delta, graph_iri, batch_size: int) -> List[str]:
+        """
+        Returns the SPARQL updates applying a delta, in order: removals first, then additions.
+        Blank nodes are kept together with the triples referring to them, in one INSERT DATA,
+        as blank nodes inserted by separate operations are separate nodes.
+        """
+        if not (graph_iri.startswith("http") or graph_iri.startswith("urn")):
+            raise ValueError(
+                f"The value you supplied for graph_iri ({graph_iri}) is not valid"
+            )
+        updates = [
+            self._data_update("DELETE", graph_iri, delta.removed[i : i + batch_size])
+            for i in range(0, len(delta.removed), batch_size)
+        ]
+        if delta.bnodes is not None:
+            updates.append(
+                f"DELETE {{ GRAPH <{graph_iri}> {{ ?s ?p ?o }} }} "
+                f"WHERE {{ GRAPH <{graph_iri}> {{ ?s ?p ?o FILTER(isBlank(?s) || isBlank(?o)) }} }}"
+            )
+            updates.extend(
+                self._data_update("INSERT", graph_iri, subgraph(delta.bnodes, subjects))
+                for subjects in chunk_subjects(delta.bnodes, batch_size)
+            )
+        updates.extend(
+            self._data_update("INSERT", graph_iri, delta.added[i : i + batch_size])
+            for i in range(0, len(delta.added), batch_size)
+        )
+        return updates
+
+    @staticmethod
+    def _update_result(response: httpx.Response):
+        if response.status_code not in (200, 204):
             raise Exception(
-                f"Error writing to SOP. Status code: {response.status_code}. Response: {response.text}"
+                f"Error updating SOP. Status code: {response.status_code}. Response: {response.text}"
             )
-        return parse_qs(response.text)["message"][0]
+
+    def update(self, update: str):
+        """
+        Runs a SPARQL update.
+        """
+        if not self.client:
+            self._create_client()
+        response = self.client.post(
+            self.location + "/sparql",
+            data={"update": update},
+            timeout=self.timeout,
+        )
+        self._update_result(response)
+
+    def write_delta(
+        self,
+        g: Graph,
+        graph_iri,
+        base: Optional[Graph] = None,
+        batch_size: int = 10_000,
+    ) -> Delta:
+        """
+        Writes only the triples that changed, as batches of SPARQL DELETE DATA / INSERT DATA updates,
+        so the cost of a write is proportional to the change rather than to the graph.
+        The triples with blank nodes are replaced as a whole if they changed at all (see `rdfx.delta`).
+
+        :param base: The graph as it is in SOP, e.g. as last read or written. Read from SOP if not given.
+        :param batch_size: The maximum number of triples in an update
+        :return: The delta written
+        """
+        if base is None:
+            base = self.read_graph(graph_iri)
+        delta = graph_delta(g, base)
+        try:
+            for update in self._delta_updates(delta, graph_iri, batch_size):
+                self.update(update)
+        finally:
+            self._invalidate_cached(graph_iri)
+        return delta
 
     def read_deprecated(
         self, query, graph_iri, return_format: Optional[str] = "application/rdf+xml"
@@ -492,77 +1761,147 @@ class SOP(PersistenceSystem):
         except Exception:
             raise
 
-    def read(self, graph_iri, rdf_format: str = "turtle", legacy: bool = False):
-        if not self.client:
-            self._create_client()
+    def _read_request(
+        self, graph_iri, rdf_format: str, legacy: bool
+    ) -> Tuple[str, dict]:
+        """
+        Returns the URL and the arguments of the GET request exporting a graph.
+        """
         if not legacy:
             if graph_iri.startswith("urn:x-evn-master"):
-                response = self.client.get(
+                url = (
                     self.location
-                    + f"/service/{graph_iri.split(':')[2]}/tbs/exportRDFFile?format={rdf_format}",
-                    headers={"Cookie": "username=Administrator"},
+                    + f"/service/{graph_iri.split(':')[2]}/tbs/exportRDFFile?format={rdf_format}"
                 )
             elif graph_iri.startswith("urn:x-evn-tag"):
-                response = self.client.get(
+                url = (
                     self.location
-                    + f"/service/{graph_iri.split(':')[2]}.{graph_iri.split(':')[3]}/tbs/exportRDFFile?format={rdf_format}",
-                    headers={"Cookie": "username=Administrator"},
+                    + f"/service/{graph_iri.split(':')[2]}.{graph_iri.split(':')[3]}/tbs/exportRDFFile?format={rdf_format}"
                 )
             else:
-                raise NotImplemented(
+                raise NotImplementedError(
                     "Only asset and workflow graphs are currently supported"
                 )
-        else:  # legacy
-            if graph_iri.startswith("urn:x-evn-master"):
-                params = {
-                    "_base": graph_iri,
-                    "id": "ExportToRDF",
-                    "projectGraph": graph_iri,
-                    "serialization": "http://topbraid.org/sparqlmotionlib#Turtle",
-                }
-            elif graph_iri.startswith("urn:x-evn-tag"):
-                params = {
-                    "_base": graph_iri,
-                    "id": "ExportToRDF",
-                    "projectGraph": self.graph_from_workflow(graph_iri),
-                    "serialization": "http://topbraid.org/sparqlmotionlib#Turtle",
-                    "tag": self.tag_from_workflow(graph_iri),
-                }
-            response = self.client.get(self.location + "/sparqlmotion", params=params)
-
-        text = StringIO(response.text)
-        leading_comments = []
-        if rdf_format in ("turtle", "ttl"):
-            for line in text:
-                if line.startswith("#"):
-                    leading_comments.append(line.lstrip("# ").rstrip("\n"))
-                else:
-                    break
-        return leading_comments, Graph().parse(text, format=rdf_format)
+            return url, {"headers": {"Cookie": "username=Administrator"}}
+        # legacy
+        if graph_iri.startswith("urn:x-evn-master"):
+            params = {
+                "_base": graph_iri,
+                "id": "ExportToRDF",
+                "projectGraph": graph_iri,
+                "serialization": "http://topbraid.org/sparqlmotionlib#Turtle",
+            }
+        elif graph_iri.startswith("urn:x-evn-tag"):
+            params = {
+                "_base": graph_iri,
+                "id": "ExportToRDF",
+                "projectGraph": self.graph_from_workflow(graph_iri),
+                "serialization": "http://topbraid.org/sparqlmotionlib#Turtle",
+                "tag": self.tag_from_workflow(graph_iri),
+            }
+        return self.location + "/sparqlmotion", {"params": params}
+
+    def _read_result(self, content: bytes, rdf_format: str) -> Tuple[List[str], Graph]:
+        if self.cache is not None:
+            return self.parse_cached(content, rdf_format)
+        leading_comments, body = self.split_leading_comments(
+            BytesIO(content), rdf_format
+        )
+        return leading_comments, Graph().parse(body, format=rdf_format)
+
+    def read(self, graph_iri, rdf_format: str = "turtle", legacy: bool = False):
+        """
+        Reads a graph, feeding the export to the parser as it is downloaded.
+
+        :return: The leading comments (turtle only) and the parsed Graph
+        """
+        if not self.client:
+            self._create_client()
+        url, kwargs = self._read_request(graph_iri, rdf_format, legacy)
+        with self.client.stream("GET", url, **kwargs) as response:
+            if self.cache is not None:
+                return self.parse_cached(response.read(), rdf_format)
+            body = _ChunkStream(response.iter_bytes(STREAM_CHUNK_SIZE))
+            leading_comments, body = self.split_leading_comments(body, rdf_format)
+            return leading_comments, Graph().parse(body, format=rdf_format)
+
+    def read_graph(self, graph_iri) -> Graph:
+        """
+        Reads a graph without its leading comments,
+        exported as N-Triples, which is the cheapest format to parse.
+        """
+        return self.read(graph_iri, "ntriples")[1]
+
+    @staticmethod
+    def _query_form(query, graph_iri) -> dict:
+        form = {
+            "query": query,
+            "with-imports": "false",
+        }
+        # without a graph, the query is over the whole dataset: an empty default-graph-uri would name a graph
+        if graph_iri is not None:
+            form["default-graph-uri"] = graph_iri
+        return form
+
+    @staticmethod
+    def _query_result(response: httpx.Response) -> List[dict]:
+        text_result = json.loads(response.text)
+        return [
+            {str(k): v for k, v in i.items()}
+            for i in text_result["results"]["bindings"]
+        ]
 
     def query(
         self, query, graph_iri, return_format: Optional[str] = "application/json"
     ):
         if not self.client:
             self._create_client()
-        try:
-            response = self.client.post(
-                self.location + "/sparql",
-                data={
-                    "query": query,
-                    "with-imports": "false",
-                    "default-graph-uri": graph_iri,
-                },
-                headers={"Accept": return_format},
+        response = self.client.post(
+            self.location + "/sparql",
+            data=self._query_form(query, graph_iri),
+            headers={"Accept": return_format},
+        )
+        return self._query_result(response)
+
+    @staticmethod
+    def _page_query(query: str, page_size: int, offset: int) -> str:
+        if page_size < 1:
+            raise ValueError("page_size must be at least 1")
+        if _TRAILING_LIMIT_OFFSET.search(query):
+            raise ValueError(
+                "The query is paged with LIMIT and OFFSET, so it must not end with a LIMIT or OFFSET of its own"
             )
-            text_result = json.loads(response.text)
-            result = [
-                {str(k): v for k, v in i.items()}
-                for i in text_result["results"]["bindings"]
-            ]
-            return result
-        except Exception:
-            raise
+        return f"{query.rstrip()}\nLIMIT {page_size}\nOFFSET {offset}"
+
+    def query_iter(
+        self, query, graph_iri, page_size: int = 10_000
+    ) -> Iterator[List[dict]]:
+        """
+        Pages through the results of a SELECT query with LIMIT and OFFSET,
+        yielding the rows of each page as a batch, in the form `query` returns them,
+        so no more than one page of results is held in memory at a time.
+
+        The query should have an ORDER BY, for the pages to be stable,
+        and must not end with a LIMIT or OFFSET of its own.
+
+        :param page_size: The number of rows per page (request)
+        """
+        offset = 0
+        while True:
+            rows = self.query(
+                self._page_query(query, page_size, offset),
+                graph_iri,
+                "application/sparql-results+json",
+            )
+            if rows:
+                yield rows
+            if len(rows) < page_size:
+                return
+            offset += page_size
+
+    @staticmethod
+    def _collection_size_query(asset_iri) -> str:
+        return f"""SELECT (COUNT(*) as ?count) WHERE {{GRAPH <{asset_iri}> {{?s ?p ?o}} }}"""
 
     def asset_collection_size(self, asset_iri):
         """
@@ -570,19 +1909,83 @@ class SOP(PersistenceSystem):
         :param asset_iri:
         :return:
         """
-        query = f"""SELECT (COUNT(*) as ?count) WHERE {{GRAPH <{asset_iri}> {{?s ?p ?o}} }}"""
+        query = self._collection_size_query(asset_iri)
         query_response = self.query(query, asset_iri, "application/sparql-results+json")
         return int(query_response[0]["count"]["value"])
 
-    def create_datagraph(
+    @staticmethod
+    def _statistics_query(asset_iris: List[str], distinct: bool) -> str:
+        values = " ".join(f"<{asset_iri}>" for asset_iri in asset_iris)
+        counts = "(COUNT(*) AS ?triples)"
+        if distinct:
+            counts += (
+                " (COUNT(DISTINCT ?s) AS ?subjects) (COUNT(DISTINCT ?p) AS ?predicates)"
+            )
+        return f"SELECT ?g {counts} WHERE {{ VALUES ?g {{ {values} }} GRAPH ?g {{ ?s ?p ?o }} }} GROUP BY ?g"
+
+    def _plan_statistics(
+        self, asset_iris: List[str], distinct: bool
+    ) -> Tuple[Dict[str, dict], List[str]]:
+        """
+        Returns the statistics known from the cache, and the assets still to count.
+        """
+        known = {}
+        to_count = []
+        for asset_iri in asset_iris:
+            statistics = self._statistics_cache.get((asset_iri, distinct))
+            if statistics is not None:
+                known[asset_iri] = statistics
+            elif asset_iri not in to_count:
+                to_count.append(asset_iri)
+        return known, to_count
+
+    def _record_statistics(
         self,
-        datagraph_name: Optional[str] = None,
-        description: Optional[str] = None,
-        subject_area: Optional[str] = None,
-        default_namespace: Optional[str] = None,
-        headers: Optional[dict] = None,
+        asset_iris: List[str],
+        rows: List[dict],
+        distinct: bool,
+        known: Dict[str, dict],
     ):
+        names = ("triples", "subjects", "predicates") if distinct else ("triples",)
+        counted = {
+            row["g"]["value"]: {name: int(row[name]["value"]) for name in names}
+            for row in rows
+        }
+        for asset_iri in asset_iris:
+            # graphs without triples have no row
+            statistics = counted.get(asset_iri, dict.fromkeys(names, 0))
+            self._statistics_cache.put((asset_iri, distinct), statistics)
+            known[asset_iri] = statistics
+
+    def asset_statistics(
+        self, asset_iris: Iterable[str], distinct: bool = False, batch_size: int = 1_000
+    ) -> Dict[str, dict]:
+        """
+        Counts the triples of many assets with one grouped SPARQL query per batch_size assets
+        :param asset_iris: The IRIs of the assets
+        :param distinct: Also count the distinct subjects and predicates of each asset
+        :return: dict of the asset IRIs, in order, to dicts of the counts:
+            "triples", and "subjects" and "predicates" if distinct
+        """
+        asset_iris = list(asset_iris)
+        known, to_count = self._plan_statistics(asset_iris, distinct)
+        for i in range(0, len(to_count), batch_size):
+            batch = to_count[i : i + batch_size]
+            rows = self.query(
+                self._statistics_query(batch, distinct),
+                None,
+                "application/sparql-results+json",
+            )
+            self._record_statistics(batch, rows, distinct, known)
+        return {asset_iri: known[asset_iri] for asset_iri in asset_iris}
 
+    @staticmethod
+    def _datagraph_form(
+        datagraph_name: Optional[str],
+        description: Optional[str],
+        subject_area: Optional[str],
+        default_namespace: Optional[str],
+    ) -> dict:
         if datagraph_name and datagraph_name.startswith("urn:x-evn-master"):
             datagraph_name = datagraph_name.strip("urn:x-evn-master:")
         if not datagraph_name:
@@ -597,10 +2000,7 @@ class SOP(PersistenceSystem):
             subject_area = ""
         if not description:
             description = ""
-        # prepare the query
-        if self.local:
-            headers = {"Cookie": "username=Administrator"}
-        form_data = {
+        return {
             "_viewClass": "http://topbraid.org/teamwork#CreateProjectService",
             "projectType": "http://teamwork.topbraidlive.org/datagraph/datagraphprojects#ProjectType",
             "subjectArea": subject_area,
@@ -609,27 +2009,29 @@ class SOP(PersistenceSystem):
             "comment": description,
         }
 
-        response_dict = self._create_sop_asset(form_data, headers)
-        datagraph_iri = f"urn:x-evn-master:{response_dict['id']}"
-        return datagraph_iri
-
-    def create_workflow(
+    def create_datagraph(
         self,
-        graph_iri: str,
-        workflow_name: Optional[str] = None,
+        datagraph_name: Optional[str] = None,
+        description: Optional[str] = None,
+        subject_area: Optional[str] = None,
+        default_namespace: Optional[str] = None,
         headers: Optional[dict] = None,
     ):
-        """
-        :param headers: headers to add to the request
-        :param graph_iri: The graph to add a workflow to
-        :param workflow_name: The name of the workflow. If not provided, the current time is used
-        :return: graph name
-        """
+        form_data = self._datagraph_form(
+            datagraph_name, description, subject_area, default_namespace
+        )
+        # prepare the query
+        if self.local:
+            headers = {"Cookie": "username=Administrator"}
+        response_dict = self._create_sop_asset(form_data, headers)
+        datagraph_iri = f"urn:x-evn-master:{response_dict['id']}"
+        return datagraph_iri
 
+    @staticmethod
+    def _workflow_form(graph_iri: str, workflow_name: Optional[str]) -> dict:
         if not workflow_name:
             workflow_name = f"Python_created_Workflow_by_{getpass.getuser()}_at_{datetime.now().isoformat()}"
-
-        form_data = {
+        return {
             "_viewClass": "http://topbraid.org/teamwork#AddTagService",
             "projectGraph": graph_iri,
             "workflow": "http://topbraid.org/teamwork#DefaultTagWorkflowTemplate",
@@ -637,29 +2039,36 @@ class SOP(PersistenceSystem):
             "comment": "",
         }
 
-        response_dict = self._create_sop_asset(form_data, headers)
-
+    def _workflow_graph_iri(self, graph_iri: str, response_dict: dict) -> str:
         # use the name SOP returns for the workflow
         workflow_name = response_dict["rootResource"].split(":")[2]
-        workflow_graph_iri = f"{graph_iri}:{workflow_name}:{self.username}".replace(
+        return f"{graph_iri}:{workflow_name}:{self.username}".replace(
             "urn:x-evn-master", "urn:x-evn-tag"
         )
-        return workflow_graph_iri
 
-    def create_manifest(
+    def create_workflow(
         self,
-        manifest_name: Optional[str] = None,
-        description: Optional[str] = None,
-        subject_area: Optional[str] = None,
-        default_namespace: Optional[str] = None,
+        graph_iri: str,
+        workflow_name: Optional[str] = None,
         headers: Optional[dict] = None,
     ):
         """
         :param headers: headers to add to the request
         :param graph_iri: The graph to add a workflow to
-        :param manifest_name: The name of the manifest. If not provided, the current time is used
+        :param workflow_name: The name of the workflow. If not provided, the current time is used
         :return: graph name
         """
+        form_data = self._workflow_form(graph_iri, workflow_name)
+        response_dict = self._create_sop_asset(form_data, headers)
+        return self._workflow_graph_iri(graph_iri, response_dict)
+
+    @staticmethod
+    def _manifest_form(
+        manifest_name: Optional[str],
+        description: Optional[str],
+        subject_area: Optional[str],
+        default_namespace: Optional[str],
+    ) -> dict:
         # set defaults
         if manifest_name and manifest_name.startswith("urn:x-evn-master"):
             manifest_name = manifest_name.strip("urn:x-evn-master:")
@@ -675,8 +2084,7 @@ class SOP(PersistenceSystem):
             subject_area = ""
         if not description:
             description = ""
-
-        form_data = {
+        return {
             "_viewClass": "http://topbraid.org/teamwork#CreateProjectService",
             "projectType": "http://surroundaustralia.com/ns/platform/OntologyRegister",
             "owlImports": [
@@ -688,14 +2096,9 @@ class SOP(PersistenceSystem):
             "comment": description,
         }
 
-        response_dict = self._create_sop_asset(form_data, headers)
-        # use the name SOP returns for the workflow
-        manifest_iri = f"urn:x-evn-master:{response_dict['id']}"
-        return manifest_iri
-
-    def create_file(
+    def create_manifest(
         self,
-        file_path: Optional[Path] = None,
+        manifest_name: Optional[str] = None,
         description: Optional[str] = None,
         subject_area: Optional[str] = None,
         default_namespace: Optional[str] = None,
@@ -703,10 +2106,25 @@ class SOP(PersistenceSystem):
     ):
         """
         :param headers: headers to add to the request
-        :param manifest_name: The name of the file. If not provided, the current time is used
+        :param graph_iri: The graph to add a workflow to
+        :param manifest_name: The name of the manifest. If not provided, the current time is used
         :return: graph name
         """
+        form_data = self._manifest_form(
+            manifest_name, description, subject_area, default_namespace
+        )
+        response_dict = self._create_sop_asset(form_data, headers)
+        # use the name SOP returns for the workflow
+        manifest_iri = f"urn:x-evn-master:{response_dict['id']}"
+        return manifest_iri
 
+    @staticmethod
+    def _file_form(
+        file_path: Optional[Path], default_namespace: Optional[str]
+    ) -> Tuple[Path, dict]:
+        """
+        Returns the file path, with the default, and the form data creating the file.
+        """
         # set defaults
         if not file_path:
             file_path = f"Python_created_file_by_{getpass.getuser()}_at_{datetime.now().isoformat()}"
@@ -718,7 +2136,7 @@ class SOP(PersistenceSystem):
             )
         file_name = file_path.name
         baseURI = default_namespace[:-1]
-        form_data = {
+        return file_path, {
             "_viewClass": "http://topbraid.org/teamwork#createRDFFile",
             "_plainErrors": "true",
             "baseURI": baseURI,
@@ -728,6 +2146,21 @@ class SOP(PersistenceSystem):
             "namespace": default_namespace,
         }
 
+    def create_file(
+        self,
+        file_path: Optional[Path] = None,
+        description: Optional[str] = None,
+        subject_area: Optional[str] = None,
+        default_namespace: Optional[str] = None,
+        headers: Optional[dict] = None,
+    ):
+        """
+        :param headers: headers to add to the request
+        :param manifest_name: The name of the file. If not provided, the current time is used
+        :return: graph name
+        """
+        file_path, form_data = self._file_form(file_path, default_namespace)
+        baseURI = form_data["baseURI"]
         exists = self.asset_exists(baseURI)
         if not exists:
             self._create_sop_asset(form_data, headers)
@@ -737,48 +2170,129 @@ class SOP(PersistenceSystem):
             )
 
         # write the local file contents to the "skeleton" file that has been generated in EDG
-        comments, graph = File(file_path.parent).read(file_name)
+        comments, graph = File(file_path.parent).read(file_path.name)
         self.write(g=graph, graph_iri=baseURI, leading_comments=comments)
 
         return baseURI
 
-    def asset_exists(self, graph_name: str) -> bool:
+    def _exists_key(self, graph_name: str) -> str:
+        # a workflow exists if its master graph does
+        if graph_name.startswith("urn:x-evn-tag"):
+            return self.graph_from_workflow(graph_name)
+        return graph_name
+
+    def _cached_exists(self, graph_name: str) -> Optional[bool]:
+        return self._exists_cache.get(self._exists_key(graph_name))
+
+    def _cache_exists(self, graph_name: str, exists: bool):
+        self._exists_cache.put(self._exists_key(graph_name), exists)
+
+    def _invalidate_cached(self, graph_name: Optional[str] = None):
         """
-        Checks whether an asset exists in SOP, returns True or False
-        :param graph_name: The EDG URN of the asset
-        :return: boolean
+        Drops the cached answers about a graph, or all cached answers if no graph is given.
         """
-        if not self.client:
+        if graph_name is None:
+            self._exists_cache.clear()
+            self._statistics_cache.clear()
+        else:
+            self._exists_cache.pop(self._exists_key(graph_name))
+            for distinct in (False, True):
+                self._statistics_cache.pop((graph_name, distinct))
+
+    def _ask_form(self, graph_name: str) -> dict:
+        graph_name = self._exists_key(graph_name)
+        return {"query": f"ASK WHERE {{GRAPH <{graph_name}> {{?s ?p ?o}} }}"}
+
+    def _plan_assets_exist(
+        self, graph_names: Iterable[str]
+    ) -> Tuple[Dict[str, bool], Dict[str, List[str]]]:
+        """
+        Returns the answers known from the cache, and the graphs still to check, with the names asked for each.
+        """
+        known = {}
+        to_check = {}
+        for graph_name in graph_names:
+            exists = self._cached_exists(graph_name)
+            if exists is not None:
+                known[graph_name] = exists
+            else:
+                to_check.setdefault(self._exists_key(graph_name), []).append(graph_name)
+        return known, to_check
+
+    @staticmethod
+    def _assets_exist_form(graphs: List[str]) -> dict:
+        values = " ".join(f"<{graph}>" for graph in graphs)
+        return {
+            "query": f"SELECT ?g WHERE {{ VALUES ?g {{ {values} }} FILTER EXISTS {{ GRAPH ?g {{ ?s ?p ?o }} }} }}"
+        }
+
+    def _record_assets_exist(
+        self,
+        graphs: List[str],
+        response: httpx.Response,
+        to_check: Dict[str, List[str]],
+        known: Dict[str, bool],
+    ):
+        existing = {row["g"]["value"] for row in self._query_result(response)}
+        for graph in graphs:
+            exists = graph in existing
+            self._cache_exists(graph, exists)
+            for graph_name in to_check[graph]:
+                known[graph_name] = exists
+
+    def assets_exist(
+        self, graph_names: Iterable[str], batch_size: int = 5_000
+    ) -> Dict[str, bool]:
+        """
+        Checks whether many assets exist in SOP, with one SPARQL query (VALUES) per batch_size assets
+        :param graph_names: The EDG URNs of the assets
+        :return: dict of the URNs to True or False, in order
+        """
+        graph_names = list(graph_names)
+        known, to_check = self._plan_assets_exist(graph_names)
+        if to_check and not self.client:
             self._create_client()
+        graphs = list(to_check)
+        for i in range(0, len(graphs), batch_size):
+            batch = graphs[i : i + batch_size]
+            response = self.client.post(
+                self.location + "/sparql",
+                data=self._assets_exist_form(batch),
+                headers={"Accept": "application/sparql-results+json"},
+            )
+            self._record_assets_exist(batch, response, to_check, known)
+        return {graph_name: known[graph_name] for graph_name in graph_names}
 
-        if graph_name.startswith("urn:x-evn-tag"):
-            return self.asset_exists(self.graph_from_workflow(graph_name))
-        query = f"ASK WHERE {{GRAPH <{graph_name}> {{?s ?p ?o}} }}"
-        response = self.client.post(
-            self.location + "/sparql",
-            data={"query": query},
-            headers={"Accept": "application/sparql-results+json"},
-        )
+    @staticmethod
+    def _ask_result(response: httpx.Response) -> bool:
         try:
             return json.loads(response.text)["boolean"]
         except JSONDecodeError:
             # SOP exception
             raise Exception(response.text)
 
-    def _create_sop_asset(self, form_data, headers: Optional[dict]):
-        # set defaults
-        if not headers:
-            headers = {}
+    def asset_exists(self, graph_name: str) -> bool:
+        """
+        Checks whether an asset exists in SOP, returns True or False
+        :param graph_name: The EDG URN of the asset
+        :return: boolean
+        """
+        exists = self._cached_exists(graph_name)
+        if exists is not None:
+            return exists
         if not self.client:
             self._create_client()
-
-        # send to SOP
         response = self.client.post(
-            self.location + "/swp",
-            data=form_data,
-            headers=headers,
-            cookies=self.client.cookies,
+            self.location + "/sparql",
+            data=self._ask_form(graph_name),
+            headers={"Accept": "application/sparql-results+json"},
         )
+        exists = self._ask_result(response)
+        self._cache_exists(graph_name, exists)
+        return exists
+
+    @staticmethod
+    def _sop_asset_result(response: httpx.Response, form_data: dict):
         response_dict = json.loads(response.text)
         keys = response_dict.keys()
         if "response" in keys:  # datagraph creation success
@@ -795,28 +2309,127 @@ class SOP(PersistenceSystem):
             f"Failed to create {form_data['name']} graph on SOP.\nError: {response.text}"
         )
 
+    def _create_sop_asset(self, form_data, headers: Optional[dict]):
+        # set defaults
+        if not headers:
+            headers = {}
+        if not self.client:
+            self._create_client()
+
+        # send to SOP
+        response = self.client.post(
+            self.location + "/swp",
+            data=form_data,
+            headers=headers,
+        )
+        self._invalidate_cached()
+        return self._sop_asset_result(response, form_data)
+
+    def _forget_session(self):
+        if self.session_store is not None:
+            self.session_store.delete(self.location, self.username)
+        if self.shared_session:
+            drop_shared_client(self.location, self.username)
+
     def _close(self):
         self.client.get(self.location + "/purgeuser?app=edg")
+        # the session is logged out
+        self._forget_session()
+
+    def _client_kwargs(self, reuse_stored: bool = True) -> Tuple[bool, dict]:
+        """
+        Returns whether a stored session is reused,
+        and the arguments of the HTTP client, with the cookies of the stored session if there is one.
+        """
+        cookies = {"username": self.username}
+        stored = None
+        if self.session_store is not None and reuse_stored:
+            stored = self.session_store.get(self.location, self.username)
+            if stored:
+                cookies.update(stored)
+        kwargs = {"cookies": cookies, "transport": self.transport, "http2": self.http2}
+        if self.limits is not None:
+            kwargs["limits"] = self.limits
+        return stored is not None, kwargs
+
+    def _login_form(self) -> dict:
+        return {
+            "j_username": self.username,
+            "j_password": self.password,
+            "login": "LOGIN",
+        }
+
+    @staticmethod
+    def _logged_out(response: httpx.Response) -> bool:
+        """
+        Whether a response asks to log in: an authentication error, or the login form SOP redirects to.
+        """
+        return (
+            response.status_code in (401, 403)
+            or "j_security_check" in str(response.url)
+            or "j_security_check" in response.text
+        )
+
+    def _store_session(self, client: Union[httpx.Client, httpx.AsyncClient]):
+        if self.session_store is not None:
+            cookies = {cookie.name: cookie.value for cookie in client.cookies.jar}
+            self.session_store.put(
+                self.location, self.username, cookies, self.session_ttl
+            )
+
+    def _set_client(self, client: httpx.Client):
+        """
+        Replaces the HTTP client, closing the previous one unless it may be shared with other instances.
+        """
+        previous = self.client
+        self.client = client
+        if previous is not None and previous is not client and not self.shared_session:
+            previous.close()
 
     def _create_client(self, test_connection=False):
-        self.location += "/tbl"
-        self.client = httpx.Client(cookies={"username": self.username})
-        self.client.get(self.location)
-        if self.location.startswith("http://localhost"):
-            return True # auth is not required
-        auth_response = self.client.post(
-            self.location + "/j_security_check",
-            data={
-                "j_username": self.username,
-                "j_password": self.password,
-                "login": "LOGIN",
-            },
-            headers={"Accept": "text/html"},
-        )
-        if auth_response.text:
-            if test_connection:
-                return auth_response.text
-            raise ValueError(auth_response.text)
+        """
+        Creates the HTTP client, and logs in, unless a stored or shared session can be reused.
+        A reused session is checked with a request first, and if it was logged out, it is forgotten and
+        the client logs in again. A client created before is closed, unless it is a shared one.
+
+        :return: True, or the error message of a failed login if test_connection
+        """
+        if self.shared_session:
+            client = get_shared_client(self.location, self.username)
+            if client is not None:
+                if not self._logged_out(client.get(self.location)):
+                    self._set_client(client)
+                    return True
+                # other instances may still hold the client, so it is only dropped, not closed
+                drop_shared_client(self.location, self.username)
+        stored, kwargs = self._client_kwargs()
+        client = httpx.Client(**kwargs)
+        if stored and self._logged_out(client.get(self.location)):
+            client.close()
+            self.session_store.delete(self.location, self.username)
+            stored, kwargs = self._client_kwargs(reuse_stored=False)
+            client = httpx.Client(**kwargs)
+        if not stored:
+            client.get(self.location)
+            if not self.local:  # auth is not required locally
+                auth_response = client.post(
+                    self.location + "/j_security_check",
+                    data=self._login_form(),
+                    headers={"Accept": "text/html"},
+                )
+                if auth_response.text:
+                    client.close()
+                    if test_connection:
+                        return auth_response.text
+                    raise ValueError(auth_response.text)
+            self._store_session(client)
+        if self.shared_session:
+            shared = share_client(self.location, self.username, client)
+            if shared is not client:
+                client.close()
+            client = shared
+        self._set_client(client)
+        return True
 
     @staticmethod
     def graph_from_workflow(workflow_graph):
@@ -846,6 +2459,444 @@ class SOP(PersistenceSystem):
         return "urn:x-tags:" + workflow_name
 
 
+class AsyncSOP(SOP):
+    """
+    The SOP persistence system on an httpx.AsyncClient:
+    read, write, query, asset_exists and the create_* methods are coroutines,
+    so many graphs can be read or written at once, with at most max_concurrency requests in flight.
+
+    The client is created, and logged in, on first use.
+    Use it as an async context manager, or call aclose(), to close the client.
+
+    Args:
+        location (str): The IRI of the SOP system. Defaults to http://localhost:8083 (no trailing slash)
+        username (str): The username of a user on this SOP instance. Optional.
+        password (str): The password of the user on this SOP instance. Optional.
+        cache (GraphCache): A cache of parsed graphs to read through. Optional.
+        transport (httpx.AsyncBaseTransport): The transport of the HTTP client, e.g. an httpx.MockTransport for testing. Optional.
+        exists_ttl (float): The number of seconds to cache the answers of asset_exists and assets_exist for. Optional.
+        statistics_ttl (float): The number of seconds to cache the answers of asset_statistics for. Optional.
+        session_store (SessionStore): A store of session cookies on disk, to reuse the login of earlier processes. Optional.
+        session_ttl (float): The number of seconds a stored login is reused for, defaults to 30 minutes
+        limits (httpx.Limits): The connection pool and keep-alive limits of the HTTP client.
+                               Defaults to at most max_concurrency connections.
+        http2 (bool): Whether to use HTTP/2, which requires the h2 package (`pip install rdfx[http2]`)
+        max_concurrency (int): The maximum number of requests in flight at a time, defaults to 10
+    """
+
+    _login_on_init = False
+
+    def __init__(
+        self,
+        location: Optional[str] = "http://localhost:8083",
+        username: Optional[str] = "Administrator",
+        auth_type: Optional[str] = "Basic",
+        password: Optional[str] = None,
+        timeout: Optional[int] = 60,
+        cache: Optional[GraphCache] = None,
+        transport: Optional[httpx.AsyncBaseTransport] = None,
+        exists_ttl: Optional[float] = None,
+        statistics_ttl: Optional[float] = None,
+        session_store: Optional[SessionStore] = None,
+        session_ttl: float = 30 * 60,
+        limits: Optional[httpx.Limits] = None,
+        http2: bool = False,
+        max_concurrency: int = 10,
+    ):
+        if max_concurrency < 1:
+            raise ValueError("max_concurrency must be at least 1")
+        # an async client is bound to its event loop, so it is not shared between instances
+        super().__init__(
+            location,
+            username,
+            auth_type,
+            password,
+            timeout,
+            cache,
+            transport,
+            exists_ttl,
+            statistics_ttl,
+            session_store,
+            session_ttl,
+            shared_session=False,
+            limits=limits or httpx.Limits(max_connections=max_concurrency),
+            http2=http2,
+        )
+        self.max_concurrency = max_concurrency
+        # created in the running event loop on first use, as before Python 3.10 they bind to the loop they are created in
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._client_lock: Optional[asyncio.Lock] = None
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.aclose()
+
+    async def aclose(self):
+        if self.client is not None:
+            await self.client.aclose()
+            self.client = None
+
+    async def _create_client(self, test_connection=False):
+        if self._client_lock is None:
+            self._client_lock = asyncio.Lock()
+        async with self._client_lock:
+            if self.client is not None:
+                if not test_connection or not self._logged_out(
+                    await self.client.get(self.location)
+                ):
+                    return True
+                await self.client.aclose()
+                self.client = None
+                self._forget_session()
+            stored, kwargs = self._client_kwargs()
+            client = httpx.AsyncClient(**kwargs)
+            if stored and self._logged_out(await client.get(self.location)):
+                await client.aclose()
+                self.session_store.delete(self.location, self.username)
+                stored, kwargs = self._client_kwargs(reuse_stored=False)
+                client = httpx.AsyncClient(**kwargs)
+            if not stored:
+                await client.get(self.location)
+                if not self.local:
+                    auth_response = await client.post(
+                        self.location + "/j_security_check",
+                        data=self._login_form(),
+                        headers={"Accept": "text/html"},
+                    )
+                    if auth_response.text:
+                        await client.aclose()
+                        if test_connection:
+                            return auth_response.text
+                        raise ValueError(auth_response.text)
+                self._store_session(client)
+            self.client = client
+            return True
+
+    async def _request(self, method: str, url: str, **kwargs) -> httpx.Response:
+        if self.client is None:
+            await self._create_client()
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        async with self._semaphore:
+            return await self.client.request(method, url, **kwargs)
+
+    async def write(self, g: Graph, graph_iri, leading_comments=None):
+        form_data, content, headers = self._write_request(
+            g, graph_iri, leading_comments
+        )
+        response = await self._request(
+            "POST",
+            self.location + "/importFileUpload",
+            data=form_data,
+            files={"file": io.BytesIO(content)},
+            headers=headers,
+            timeout=self.timeout,
+        )
+        self._invalidate_cached(graph_iri)
+        return self._write_result(response)
+
+    async def write_chunked(
+        self,
+        g: Graph,
+        graph_iri,
+        leading_comments=None,
+        max_triples: int = 100_000,
+        parallel: int = 1,
+        retries: int = 3,
+        backoff: float = 1.0,
+        progress: Optional[Callable[[int, int], None]] = None,
+    ) -> List[str]:
+        """
+        Writes a graph in chunks, see `SOP.write_chunked`.
+        At most parallel chunks are uploaded at a time, and no more than max_concurrency.
+        """
+        chunks = chunk_subjects(g, max_triples)
+        total = len(chunks)
+        done = 0
+        slots = asyncio.Semaphore(max(parallel, 1))
+
+        async def write_chunk(index: int) -> str:
+            nonlocal done
+            async with slots:
+                chunk = subgraph(g, chunks[index])
+                comments = leading_comments if index == 0 else None
+                for attempt in range(retries + 1):
+                    try:
+                        message = await self.write(chunk, graph_iri, comments)
+                        break
+                    except Exception as e:
+                        if attempt == retries:
+                            raise Exception(
+                                f"Error writing chunk {index + 1} of {total} to SOP after {retries + 1} attempts"
+                            ) from e
+                        await asyncio.sleep(backoff * 2**attempt)
+            done += 1
+            if progress:
+                progress(done, total)
+            return message
+
+        if parallel <= 1:
+            return [await write_chunk(index) for index in range(total)]
+        return list(
+            await asyncio.gather(*(write_chunk(index) for index in range(total)))
+        )
+
+    async def update(self, update: str):
+        response = await self._request(
+            "POST",
+            self.location + "/sparql",
+            data={"update": update},
+            timeout=self.timeout,
+        )
+        self._update_result(response)
+
+    async def write_delta(
+        self,
+        g: Graph,
+        graph_iri,
+        base: Optional[Graph] = None,
+        batch_size: int = 10_000,
+    ) -> Delta:
+        """
+        Writes only the triples that changed, see `SOP.write_delta`.
+        """
+        if base is None:
+            base = await self.read_graph(graph_iri)
+        delta = await asyncio.get_running_loop().run_in_executor(
+            None, graph_delta, g, base
+        )
+        try:
+            for update in self._delta_updates(delta, graph_iri, batch_size):
+                await self.update(update)
+        finally:
+            self._invalidate_cached(graph_iri)
+        return delta
+
+    async def read_deprecated(
+        self, query, graph_iri, return_format: Optional[str] = "application/rdf+xml"
+    ):
+        response = await self._request(
+            "POST",
+            self.location + "/sparql",
+            data=self._query_form(query, graph_iri),
+            headers={"Accept": return_format},
+        )
+        return Graph().parse(data=response.content, format="xml")
+
+    async def read(self, graph_iri, rdf_format: str = "turtle", legacy: bool = False):
+        url, kwargs = self._read_request(graph_iri, rdf_format, legacy)
+        response = await self._request("GET", url, **kwargs)
+        # parse in a thread, so the event loop carries on with the other requests meanwhile
+        return await asyncio.get_running_loop().run_in_executor(
+            None, self._read_result, response.content, rdf_format
+        )
+
+    async def read_graph(self, graph_iri) -> Graph:
+        """
+        Reads a graph without its leading comments, exported as N-Triples, see `SOP.read_graph`.
+        """
+        return (await self.read(graph_iri, "ntriples"))[1]
+
+    async def read_many(
+        self,
+        graph_iris: Iterable[str],
+        rdf_format: str = "turtle",
+        legacy: bool = False,
+    ) -> List[TransferResult]:
+        """
+        Reads many graphs concurrently, see `read`.
+
+        :return: A TransferResult per graph IRI, in order, with the leading comments and Graph as result
+        """
+        graph_iris = list(graph_iris)
+        results = await asyncio.gather(
+            *(self.read(graph_iri, rdf_format, legacy) for graph_iri in graph_iris),
+            return_exceptions=True,
+        )
+        return [
+            TransferResult(graph_iri, error=result)
+            if isinstance(result, Exception)
+            else TransferResult(graph_iri, result)
+            for graph_iri, result in zip(graph_iris, results)
+        ]
+
+    async def query(
+        self, query, graph_iri, return_format: Optional[str] = "application/json"
+    ):
+        response = await self._request(
+            "POST",
+            self.location + "/sparql",
+            data=self._query_form(query, graph_iri),
+            headers={"Accept": return_format},
+        )
+        return self._query_result(response)
+
+    async def query_iter(
+        self, query, graph_iri, page_size: int = 10_000
+    ) -> AsyncIterator[List[dict]]:
+        """
+        Pages through the results of a SELECT query, see `SOP.query_iter`.
+        """
+        offset = 0
+        while True:
+            rows = await self.query(
+                self._page_query(query, page_size, offset),
+                graph_iri,
+                "application/sparql-results+json",
+            )
+            if rows:
+                yield rows
+            if len(rows) < page_size:
+                return
+            offset += page_size
+
+    async def asset_collection_size(self, asset_iri):
+        query = self._collection_size_query(asset_iri)
+        query_response = await self.query(
+            query, asset_iri, "application/sparql-results+json"
+        )
+        return int(query_response[0]["count"]["value"])
+
+    async def asset_statistics(
+        self, asset_iris: Iterable[str], distinct: bool = False, batch_size: int = 1_000
+    ) -> Dict[str, dict]:
+        """
+        Counts the triples of many assets, see `SOP.asset_statistics`. The batches are sent concurrently.
+        """
+        asset_iris = list(asset_iris)
+        known, to_count = self._plan_statistics(asset_iris, distinct)
+
+        async def count(batch: List[str]):
+            rows = await self.query(
+                self._statistics_query(batch, distinct),
+                None,
+                "application/sparql-results+json",
+            )
+            self._record_statistics(batch, rows, distinct, known)
+
+        await asyncio.gather(
+            *(
+                count(to_count[i : i + batch_size])
+                for i in range(0, len(to_count), batch_size)
+            )
+        )
+        return {asset_iri: known[asset_iri] for asset_iri in asset_iris}
+
+    async def create_datagraph(
+        self,
+        datagraph_name: Optional[str] = None,
+        description: Optional[str] = None,
+        subject_area: Optional[str] = None,
+        default_namespace: Optional[str] = None,
+        headers: Optional[dict] = None,
+    ):
+        form_data = self._datagraph_form(
+            datagraph_name, description, subject_area, default_namespace
+        )
+        if self.local:
+            headers = {"Cookie": "username=Administrator"}
+        response_dict = await self._create_sop_asset(form_data, headers)
+        return f"urn:x-evn-master:{response_dict['id']}"
+
+    async def create_workflow(
+        self,
+        graph_iri: str,
+        workflow_name: Optional[str] = None,
+        headers: Optional[dict] = None,
+    ):
+        form_data = self._workflow_form(graph_iri, workflow_name)
+        response_dict = await self._create_sop_asset(form_data, headers)
+        return self._workflow_graph_iri(graph_iri, response_dict)
+
+    async def create_manifest(
+        self,
+        manifest_name: Optional[str] = None,
+        description: Optional[str] = None,
+        subject_area: Optional[str] = None,
+        default_namespace: Optional[str] = None,
+        headers: Optional[dict] = None,
+    ):
+        form_data = self._manifest_form(
+            manifest_name, description, subject_area, default_namespace
+        )
+        response_dict = await self._create_sop_asset(form_data, headers)
+        return f"urn:x-evn-master:{response_dict['id']}"
+
+    async def create_file(
+        self,
+        file_path: Optional[Path] = None,
+        description: Optional[str] = None,
+        subject_area: Optional[str] = None,
+        default_namespace: Optional[str] = None,
+        headers: Optional[dict] = None,
+    ):
+        file_path, form_data = self._file_form(file_path, default_namespace)
+        baseURI = form_data["baseURI"]
+        if await self.asset_exists(baseURI):
+            raise ValueError(
+                f"Asset (probably a file) already exists with baseURI: {baseURI}"
+            )
+        await self._create_sop_asset(form_data, headers)
+        comments, graph = File(file_path.parent).read(file_path.name)
+        await self.write(g=graph, graph_iri=baseURI, leading_comments=comments)
+        return baseURI
+
+    async def asset_exists(self, graph_name: str) -> bool:
+        exists = self._cached_exists(graph_name)
+        if exists is not None:
+            return exists
+        response = await self._request(
+            "POST",
+            self.location + "/sparql",
+            data=self._ask_form(graph_name),
+            headers={"Accept": "application/sparql-results+json"},
+        )
+        exists = self._ask_result(response)
+        self._cache_exists(graph_name, exists)
+        return exists
+
+    async def assets_exist(
+        self, graph_names: Iterable[str], batch_size: int = 5_000
+    ) -> Dict[str, bool]:
+        """
+        Checks whether many assets exist in SOP, see `SOP.assets_exist`. The batches are sent concurrently.
+        """
+        graph_names = list(graph_names)
+        known, to_check = self._plan_assets_exist(graph_names)
+        graphs = list(to_check)
+
+        async def check(batch: List[str]):
+            response = await self._request(
+                "POST",
+                self.location + "/sparql",
+                data=self._assets_exist_form(batch),
+                headers={"Accept": "application/sparql-results+json"},
+            )
+            self._record_assets_exist(batch, response, to_check, known)
+
+        await asyncio.gather(
+            *(
+                check(graphs[i : i + batch_size])
+                for i in range(0, len(graphs), batch_size)
+            )
+        )
+        return {graph_name: known[graph_name] for graph_name in graph_names}
+
+    async def _create_sop_asset(self, form_data, headers: Optional[dict]):
+        response = await self._request(
+            "POST", self.location + "/swp", data=form_data, headers=headers or {}
+        )
+        self._invalidate_cached()
+        return self._sop_asset_result(response, form_data)
+
+    async def _close(self):
+        await self._request("GET", self.location + "/purgeuser?app=edg")
+        self._forget_session()
+        await self.aclose()
+
+
 def prepare_files_list(files: Union[str, list, Path]) -> list:
     if isinstance(files, (str, Path)):
         files = [files]
@@ -861,9 +2912,13 @@ def prepare_files_list(files: Union[str, list, Path]) -> list:
         if fp.is_dir():
             for file_type in RDF_FILE_ENDINGS.keys():
                 files_list.extend(list(fp.glob("*" + file_type)))
+                for compression_type in COMPRESSION_FILE_ENDINGS.keys():
+                    files_list.extend(list(fp.glob(f"*{file_type}.{compression_type}")))
         elif fp.is_file():
             files_list.append(fp)
     return files_list
 
 
-PERSISTENCE_SYSTEMS = {k.__name__: k for k in [String, File, SOP, GraphDB, Fuseki, S3]}
+PERSISTENCE_SYSTEMS = {
+    k.__name__: k for k in [String, File, SOP, AsyncSOP, GraphDB, Fuseki, S3]
+}
@@ -1,22 +1,36 @@
 import argparse
+import io
 import os
 import sys
+from concurrent.futures import ProcessPoolExecutor, as_completed
 from pathlib import Path
-from typing import List
+from typing import List, Tuple
 
 import rdflib
-from rdflib import Graph, util
-
+from rdflib import Graph, Literal, URIRef, util
+
+from rdfx.compression import (
+    COMPRESSIONS,
+    compressed_name,
+    open_rdf_file,
+    parse_file,
+    rdf_stem,
+    split_compression,
+)
 from rdfx.constants import RDF_FILE_ENDINGS, OUTPUT_FILE_ENDINGS
-from rdfx.persistence_systems import File, PersistenceSystem, prepare_files_list
+from rdfx.manifest import Manifest
+from rdfx.persistence_systems import File, PersistenceSystem, S3, prepare_files_list
+from rdfx.streaming import line_based_format, stream_convert, stream_merge
+
 
 def get_input_format(file_path):
-    input_format = util.guess_format(str(file_path))
+    # the format of vocab.ttl.gz is that of vocab.ttl
+    name = split_compression(file_path)[0]
+    input_format = util.guess_format(name)
     if input_format is None:
-        str_path = str(file_path)
-        if str_path.endswith("json-ld") or str_path.endswith("jsonld"):
-            input_format = "json-ld"
-        else:
+        # json-ld, jsonld, rdfx-bin
+        input_format = RDF_FILE_ENDINGS.get(Path(name).suffix.lstrip("."))
+        if input_format is None:
             raise Exception(
                 f"ERROR: Cannot guess the RDF format of input file {file_path}"
             )
@@ -43,11 +57,245 @@ def convert(
     output_filename: str,
     output_format: str,
     comments: str = None,
+    compression: str = None,
 ):
     input_format = get_input_format(input_file_path)
     output_file_path = input_file_path.parent
-    g = Graph().parse(str(input_file_path), format=input_format)
-    persistence_system.write(g, output_filename, output_format, comments,output_file_path)
+    if (
+        isinstance(persistence_system, File)
+        and line_based_format(input_format)
+        and line_based_format(output_format)
+        and not comments
+        and split_compression(input_file_path)[1] is None
+        and compression is None
+    ):
+        # N-Triples / N-Quads are converted line by line, without building a Graph
+        stream_convert(
+            input_file_path,
+            output_file_path / f"{output_filename}.{output_format}",
+            output_format,
+        )
+        return
+    g = parse_file(Graph(), input_file_path, input_format)
+    persistence_system.write(
+        g, output_filename, output_format, comments, output_file_path, compression
+    )
+
+
+def convert_output_path(
+    input_file_path: Path, output_format: str, compression: str = None
+) -> Path:
+    """
+    Returns the path `convert_file` writes the converted input file to.
+    """
+    input_file_path = Path(input_file_path)
+    return input_file_path.parent / compressed_name(
+        f"{rdf_stem(input_file_path)}.{output_format}", compression
+    )
+
+
+def clean_output_path(input_file_path: Path) -> Path:
+    """
+    Returns the path `clean_ttl` writes the cleaned input file to, compressed like the input file.
+    """
+    input_file_path = Path(input_file_path)
+    compression = split_compression(input_file_path)[1]
+    return input_file_path.parent / compressed_name(
+        f"{rdf_stem(input_file_path)}.ttl", compression
+    )
+
+
+def convert_file(
+    input_file_path: Path,
+    persistence_system,
+    output_format: str,
+    comments: str = None,
+    compression: str = None,
+):
+    """
+    Converts a single file, keeping its name (stem) for the output file.
+    Used as the per-file job of the `convert` command.
+    """
+    output_filename = rdf_stem(input_file_path)
+    convert(
+        input_file_path,
+        persistence_system,
+        output_filename,
+        output_format,
+        comments,
+        compression,
+    )
+
+
+def process_files(function, files_list: List[Path], jobs: int = None, **kwargs):
+    """
+    Calls `function(file, **kwargs)` for every file in the list,
+    in a pool of `jobs` worker processes (defaults to the CPU count).
+
+    The largest files are started first,
+    so a single huge file does not end up running on its own at the end.
+    A failing file does not stop the batch.
+
+    :param function: A module level function taking the file path as first argument
+    :param files_list: The files to process
+    :param jobs: The number of worker processes, 1 processes the files in this process
+    :return: dict of the files that failed, mapped to the raised exception
+    """
+    files_list = sorted(files_list, key=lambda f: Path(f).stat().st_size, reverse=True)
+    if jobs is None:
+        jobs = os.cpu_count() or 1
+    if jobs < 1:
+        raise ValueError("The number of jobs must be at least 1")
+    jobs = min(jobs, len(files_list))
+
+    failures = {}
+    if jobs <= 1:
+        for file in files_list:
+            try:
+                function(file, **kwargs)
+            except Exception as e:
+                failures[file] = e
+        return failures
+
+    with ProcessPoolExecutor(max_workers=jobs) as executor:
+        futures = {
+            executor.submit(function, file, **kwargs): file for file in files_list
+        }
+        for future in as_completed(futures):
+            try:
+                future.result()
+            except Exception as e:
+                failures[futures[future]] = e
+    return failures
+
+
+def s3_from_url(url: str) -> Tuple[S3, str]:
+    """
+    Returns an S3 persistence system for the bucket of an s3://bucket/prefix URL, and the prefix.
+    The credentials are taken from the AWS_ACCESS_KEY_ID and AWS_SECRET_ACCESS_KEY environment variables,
+    the region from AWS_DEFAULT_REGION (defaults to ap-southeast-2).
+    """
+    bucket, _, prefix = url[len("s3://") :].partition("/")
+    if not bucket:
+        raise ValueError(
+            f"{url} is not a valid S3 URL, it must be of the form s3://bucket/prefix"
+        )
+    aws_key = os.environ.get("AWS_ACCESS_KEY_ID")
+    aws_secret = os.environ.get("AWS_SECRET_ACCESS_KEY")
+    if aws_key is None or aws_secret is None:
+        raise ValueError(
+            "AWS_ACCESS_KEY_ID and AWS_SECRET_ACCESS_KEY must be set to use S3"
+        )
+    region = os.environ.get("AWS_DEFAULT_REGION", "ap-southeast-2")
+    return S3(bucket, aws_key, aws_secret, region), prefix
+
+
+def convert_to_s3(
+    files_list: List[Path],
+    persistence_system: S3,
+    prefix: str,
+    output_format: str,
+    comments: str = None,
+    jobs: int = None,
+    compression: str = None,
+) -> dict:
+    """
+    Converts files and uploads them under the prefix, keeping their names (stem) for the keys.
+    The files are parsed one after another while the uploads run concurrently.
+
+    :param jobs: The number of concurrent uploads, defaults to the connection pool size of the S3 client
+    :return: dict of the files that failed, mapped to the raised exception
+    """
+    failures = {}
+    files = {}
+    prefix = prefix.strip("/")
+
+    def graphs():
+        for file in files_list:
+            filename = f"{prefix}/{rdf_stem(file)}" if prefix else rdf_stem(file)
+            try:
+                g = parse_file(Graph(), file, get_input_format(file))
+            except Exception as e:
+                failures[file] = e
+                continue
+            files[filename] = file
+            yield g, filename
+
+    results = persistence_system.write_many(
+        graphs(),
+        output_format,
+        [comments] if comments else None,
+        max_workers=jobs,
+        compression=compression,
+    )
+    for result in results:
+        if result.error is not None:
+            failures[files[result.item]] = result.error
+        else:
+            print(f"output file: s3://{persistence_system.bucket}/{result.result}")
+    return failures
+
+
+def skip_up_to_date(
+    manifest: Manifest,
+    method: str,
+    files_list: List[Path],
+    output_path,
+    output_format: str,
+    comments: str = None,
+) -> List[Path]:
+    """
+    Returns the files whose output, according to the manifest, is not up to date.
+
+    :param output_path: function returning the output path for an input file
+    """
+    if manifest is None:
+        return files_list
+    to_do = [
+        file
+        for file in files_list
+        if not manifest.is_up_to_date(
+            method, output_path(file), [file], output_format, comments
+        )
+    ]
+    if len(to_do) < len(files_list):
+        print(f"Skipping {len(files_list) - len(to_do)} up to date file(s)")
+    return to_do
+
+
+def record_done(
+    manifest: Manifest,
+    method: str,
+    files_list: List[Path],
+    failures: dict,
+    output_path,
+    input_paths,
+    output_format: str,
+    comments: str = None,
+):
+    """
+    Records the files processed without failure in the manifest, and saves it.
+
+    :param output_path: function returning the output path for an input file
+    :param input_paths: function returning the paths to record as inputs for an input file
+    """
+    if manifest is None:
+        return
+    for file in files_list:
+        if file not in failures:
+            manifest.record(
+                method, output_path(file), input_paths(file), output_format, comments
+            )
+    manifest.save()
+
+
+def report_failures(method: str, failures: dict) -> int:
+    """
+    Prints one error line per failed file and returns the exit code for the batch.
+    """
+    for file, error in failures.items():
+        print(f"ERROR: Could not {method} {file}: {error}", file=sys.stderr)
+    return 1 if failures else 0
 
 
 def merge(
@@ -56,21 +304,49 @@ def merge(
     output_format,
     output_filename,
     leading_comments=None,
+    deduplicate=False,
+    compression=None,
 ):
     """
     Merges a given set of RDF files into one graph
 
+    N-Triples / N-Quads files merged to N-Triples / N-Quads are streamed line by line,
+    without building a Graph, in which case `deduplicate` drops duplicate statements.
+    Merging into a Graph always drops duplicates.
+    Compressed files (e.g. .nt.gz) are decompressed as they are parsed,
+    and with a compression the merged file is compressed as it is written.
     """
     for f in rdf_files:
-        if not f.name.endswith(tuple(RDF_FILE_ENDINGS.keys())):
+        if not split_compression(f.name)[0].endswith(tuple(RDF_FILE_ENDINGS.keys())):
             raise ValueError(
                 f"Files to be merged must have a known RDF suffix (one of {', '.join(RDF_FILE_ENDINGS)})"
             )
 
+    if (
+        isinstance(persistence_system, File)
+        and all(line_based_format(f.suffix.lstrip(".")) for f in rdf_files)
+        and line_based_format(output_format)
+        and not leading_comments
+        and compression is None
+    ):
+        stream_merge(
+            rdf_files,
+            persistence_system.directory / f"{output_filename}.{output_format}",
+            output_format,
+            deduplicate,
+        )
+        return
+
     g = Graph()
     for f in rdf_files:
-        g.parse(f, format=RDF_FILE_ENDINGS[f.suffix.lstrip(".")])
-    persistence_system.write(g, output_filename, output_format, leading_comments)
+        parse_file(
+            g,
+            f,
+            RDF_FILE_ENDINGS[Path(split_compression(f.name)[0]).suffix.lstrip(".")],
+        )
+    persistence_system.write(
+        g, output_filename, output_format, leading_comments, compression=compression
+    )
 
 
 def persist_to(persistence_system: PersistenceSystem, g: Graph):
@@ -80,23 +356,26 @@ def persist_to(persistence_system: PersistenceSystem, g: Graph):
         )
     persistence_system.write(g)
 
-def get_leading_comments(input_file_path:Path):
+
+def get_leading_comments(input_file_path: Path):
     """
-    Returns a list of all leading comments in the file.
+    Returns a list of all leading comments in the file, decompressing it if it has a compression suffix.
     """
 
     comments_list = []
     comment_flag = False
-    with open(input_file_path, "r", encoding='utf-8', errors='ignore') as f:
+    with io.TextIOWrapper(
+        open_rdf_file(input_file_path), encoding="utf-8", errors="ignore"
+    ) as f:
         for index, line in enumerate(f):
-            if len(line.strip()) > 0 and line.strip()[0] == '#' and index == 0:
+            if len(line.strip()) > 0 and line.strip()[0] == "#" and index == 0:
                 comments_list.append(line.strip()[2:])
                 comment_flag = True
 
-            elif len(line.strip()) > 0 and line.strip()[0] == '#' and comment_flag:
+            elif len(line.strip()) > 0 and line.strip()[0] == "#" and comment_flag:
                 comments_list.append(line.strip()[2:])
 
-            elif len(line.strip()) > 0 and line.strip()[0] != '#':
+            elif len(line.strip()) > 0 and line.strip()[0] != "#":
                 comment_flag = False
 
             elif not comment_flag:
@@ -104,39 +383,88 @@ def get_leading_comments(input_file_path:Path):
 
     return comments_list
 
-def get_sorted_namespaces(g:Graph):
+
+def _prefix_trie(strings) -> dict:
+    """
+    Builds a prefix trie of the given strings: nested dicts by character,
+    with the string itself under the "" key of the node it ends at.
+    """
+    trie = {}
+    for string in strings:
+        node = trie
+        for char in string:
+            node = node.setdefault(char, {})
+        node[""] = string
+    return trie
+
+
+def _matching_prefixes(trie: dict, string: str):
+    """
+    Yields the strings of the prefix trie that the given string starts with, shortest first.
+    """
+    node = trie
+    for char in string:
+        node = node.get(char)
+        if node is None:
+            return
+        if "" in node:
+            yield node[""]
+
+
+def get_sorted_namespaces(g: Graph):
     """
     Extracts the list of used name-spaces from the grah,
     in sorted order.
-    """
 
-    all_ns = list(g.namespaces())
-    subjects = list(g.subjects())
-    predicates = list(g.predicates())
-    objects = list(g.objects())
-    all_prefixes = set(subjects + predicates + objects)
-    used_namespace = []
-    for full_prefix in all_prefixes:
-        for prefix in all_ns:
-            if prefix[1] in full_prefix:
-                used_namespace.append(prefix)
+    A name-space is used if it is a prefix of a subject, predicate or object IRI,
+    or of the datatype of a literal.
+    The terms are matched in a single pass over the triples,
+    against a prefix trie of the name-spaces built once,
+    so each term costs at most the length of the longest name-space.
+    """
 
-    used_namespace = list(set(used_namespace))
+    # name-space -> [(prefix, name-space)]
+    namespaces = {}
+    for prefix, namespace in g.namespaces():
+        if namespace:
+            namespaces.setdefault(str(namespace), []).append((prefix, namespace))
+    trie = _prefix_trie(namespaces)
+
+    found = set()
+    for triple in g.triples((None, None, None)):
+        if len(found) == len(namespaces):
+            break  # all name-spaces are used
+        for term in triple:
+            if isinstance(term, Literal):
+                term = term.datatype
+                if term is None:
+                    continue
+            elif not isinstance(term, URIRef):
+                continue
+            found.update(_matching_prefixes(trie, term))
+
+    used_namespace = [entry for namespace in found for entry in namespaces[namespace]]
     used_namespace.sort(key=lambda tup: tup[0])
 
     return used_namespace
 
-def clean_ttl(input_file_path:Path):
+
+def clean_ttl(input_file_path: Path):
     """
     Removes unused namespace entries
     and re-serializes a graph
     with the prefixes in sorted order.
+    A compressed file is written back compressed the same way.
     """
 
     comments_list = get_leading_comments(input_file_path)
+    compression = split_compression(input_file_path)[1]
 
     g = Graph()
-    g.parse(input_file_path)
+    if compression is None:
+        g.parse(input_file_path)
+    else:
+        parse_file(g, input_file_path, get_input_format(input_file_path))
     used_namespace = get_sorted_namespaces(g)
     f = rdflib.Graph()
     for name in used_namespace:
@@ -148,26 +476,33 @@ def clean_ttl(input_file_path:Path):
     input_file_path = Path(input_file_path)
     ps = File(directory=input_file_path.parent)
     if len(comments_list) > 0:
-        ps.write(g=g, filename=input_file_path.stem, leading_comments=comments_list)
+        ps.write(
+            g=g,
+            filename=rdf_stem(input_file_path),
+            leading_comments=comments_list,
+            compression=compression,
+        )
     else:
-        ps.write(g=g, filename=input_file_path.stem)
+        ps.write(g=g, filename=rdf_stem(input_file_path), compression=compression)
+
 
 def main():
     if "-h" not in sys.argv and "--help" not in sys.argv and len(sys.argv) < 3:
         print(
-            "ERROR: You must supply at a minimum the method (convert, merge or clean), a file or files, and a target format"
+            "ERROR: You must supply at a minimum the method (convert, merge, clean or sync), a file or files, and a target format"
         )
         return 1
 
     parser = argparse.ArgumentParser()
 
-    parser.add_argument("method", choices=("convert", "merge", "clean"))
+    parser.add_argument("method", choices=("convert", "merge", "clean", "sync"))
 
     parser.add_argument(
         "data",
         nargs="+",
         type=str,
-        help="Path to the RDF file or directory of files for merging or conversion.",
+        help="Path to the RDF file or directory of files for merging or conversion. "
+        "To merge all objects under an S3 prefix, s3://bucket/prefix/.",
     )
 
     parser.add_argument(
@@ -181,7 +516,9 @@ def main():
     parser.add_argument(
         "-o",
         "--output",
-        help="if set, the output location for merged or converted files, defaults to the current working directory",
+        help="if set, the output location for merged or converted files, defaults to the current working directory. "
+        "Converted files can be uploaded to S3 with s3://bucket/prefix, "
+        "taking the credentials from the AWS_ACCESS_KEY_ID and AWS_SECRET_ACCESS_KEY environment variables.",
         type=str,
     )
 
@@ -189,33 +526,200 @@ def main():
         "--comments", type=str, help="Comments to prepend to the RDF, turtle only."
     )
 
+    parser.add_argument(
+        "--compress",
+        choices=COMPRESSIONS,
+        help="Compress the converted or merged files, or the objects written to S3, adding the suffix of the "
+        "compression, e.g. .ttl.gz. zstd needs the zstandard package. Compressed input files are always read. "
+        "Not available for sync.",
+    )
+
+    parser.add_argument(
+        "--deduplicate",
+        action="store_true",
+        help="When merging N-Triples or N-Quads files to N-Triples or N-Quads, drop duplicate statements.",
+    )
+
+    parser.add_argument(
+        "--incremental",
+        action="store_true",
+        help="Skip the files whose output is already up to date, "
+        "according to the manifest kept in the output directory. "
+        "Not available for S3 input or output: sync always skips the objects that are unchanged.",
+    )
+
+    parser.add_argument(
+        "--delete",
+        action="store_true",
+        help="When syncing to S3, delete the objects under the prefix that have no local file.",
+    )
+
+    parser.add_argument(
+        "-j",
+        "--jobs",
+        type=int,
+        help="The number of files to convert or clean in parallel, defaults to the number of CPUs. "
+        "For uploads and syncs to S3, the number of concurrent transfers, "
+        "for merges from S3, the number of processes parsing the downloads.",
+    )
+
     args = parser.parse_args()
 
+    if args.incremental and (
+        args.method == "sync"
+        or (args.output and args.output.startswith("s3://"))
+        or args.data[0].startswith("s3://")
+    ):
+        # there is no manifest for S3 locations
+        print(
+            "ERROR: --incremental only works with local files, sync to S3 always skips unchanged objects",
+            file=sys.stderr,
+        )
+        return 1
+
+    if args.method == "sync":
+        if not (args.output and args.output.startswith("s3://")):
+            print(
+                "ERROR: sync needs an S3 output location, -o s3://bucket/prefix",
+                file=sys.stderr,
+            )
+            return 1
+        if args.compress:
+            # unchanged files are found by comparing their content, or their source, as they are
+            print("ERROR: --compress is not available for sync", file=sys.stderr)
+            return 1
+        ps, prefix = s3_from_url(args.output)
+        try:
+            result = ps.sync(
+                prepare_files_list(args.data),
+                prefix,
+                args.format,
+                args.delete,
+                args.jobs,
+            )
+        except ValueError as e:
+            print(f"ERROR: {e}", file=sys.stderr)
+            return 1
+        print(
+            f"Uploaded {len(result.uploaded)}, unchanged {len(result.unchanged)}, "
+            f"deleted {len(result.deleted)} object(s)"
+        )
+        return report_failures(args.method, result.errors)
+
+    if args.output and args.output.startswith("s3://"):
+        if args.method != "convert":
+            print(
+                "ERROR: Only converted or synced files can be written to S3",
+                file=sys.stderr,
+            )
+            return 1
+        ps, prefix = s3_from_url(args.output)
+        failures = convert_to_s3(
+            prepare_files_list(args.data),
+            ps,
+            prefix,
+            args.format,
+            args.comments,
+            args.jobs,
+            args.compress,
+        )
+        return report_failures(args.method, failures)
+
     if args.output:
         output_loc = Path(args.output)
     else:
         output_loc = Path(os.getcwd())
 
+    manifest = Manifest(output_loc) if args.incremental else None
+
+    if args.method == "merge" and args.data[0].startswith("s3://"):
+        # everything under the prefix, merged into merged.{format} in the output directory
+        s3_ps, prefix = s3_from_url(args.data[0])
+        g = s3_ps.merge_prefix(prefix, processes=args.jobs)
+        ps = File(directory=output_loc)
+        ps.write(g, "merged", args.format, args.comments, compression=args.compress)
+        return 0
+
     if args.method == "merge":
         files_list = prepare_files_list(args.data)
         ps = File(directory=output_loc)
-        merge(files_list, ps, args.format, "merged", args.comments)
+        output_path = ps.directory / compressed_name(
+            f"merged.{args.format}", args.compress
+        )
+        if manifest and manifest.is_up_to_date(
+            args.method, output_path, files_list, args.format, args.comments
+        ):
+            print(f"{output_path} is up to date")
+            return 0
+        merge(
+            files_list,
+            ps,
+            args.format,
+            "merged",
+            args.comments,
+            args.deduplicate,
+            args.compress,
+        )
+        if manifest:
+            manifest.record(
+                args.method, output_path, files_list, args.format, args.comments
+            )
+            manifest.save()
 
     if args.method == "convert":
         ps = File(directory=output_loc)
-        rdf_format = args.format
-        leading_comments = args.comments
-        files_list = prepare_files_list(args.data)
-        for file in files_list:
-            output_filename = Path(file).stem
-            convert(file, ps, output_filename, rdf_format, leading_comments)
+        files_list = skip_up_to_date(
+            manifest,
+            args.method,
+            prepare_files_list(args.data),
+            lambda file: convert_output_path(file, args.format, args.compress),
+            args.format,
+            args.comments,
+        )
+        failures = process_files(
+            convert_file,
+            files_list,
+            args.jobs,
+            persistence_system=ps,
+            output_format=args.format,
+            comments=args.comments,
+            compression=args.compress,
+        )
+        record_done(
+            manifest,
+            args.method,
+            files_list,
+            failures,
+            lambda file: convert_output_path(file, args.format, args.compress),
+            lambda file: [file],
+            args.format,
+            args.comments,
+        )
+        return report_failures(args.method, failures)
 
     if args.method == "clean":
-        files_list = prepare_files_list(args.data)
-        for file in files_list:
-            clean_ttl(file)
+        files_list = skip_up_to_date(
+            manifest,
+            args.method,
+            prepare_files_list(args.data),
+            clean_output_path,
+            "ttl",
+        )
+        failures = process_files(clean_ttl, files_list, args.jobs)
+        # the cleaned file replaces the input file
+        record_done(
+            manifest,
+            args.method,
+            files_list,
+            failures,
+            clean_output_path,
+            lambda file: [clean_output_path(file)],
+            "ttl",
+        )
+        return report_failures(args.method, failures)
 
     return 0
 
+
 if __name__ == "__main__":
     sys.exit(main())
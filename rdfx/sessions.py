@@ -0,0 +1,98 @@
+"""
+Reusing the login sessions of the SOP persistence systems, so short-lived processes don't log in each time:
+an on-disk store of session cookies, and a process-wide registry of logged in clients.
+"""
+
+import hashlib
+import json
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Dict, Optional, Tuple, Union
+
+import httpx
+
+SESSION_FILE_SUFFIX = ".session"
+
+
+class SessionStore:
+    """
+    Stores the session cookies of a location and user on disk, until they expire.
+    The files are only readable by their owner, as the cookies give access to the logged in session.
+
+    Args:
+        directory (Path): The directory to keep the sessions in, created if it does not exist
+    """
+
+    def __init__(self, directory: Union[Path, str]):
+        if not isinstance(directory, (Path, str)):
+            raise ValueError("The session directory must be a string or pathlib Path")
+        self.directory = Path(directory).resolve()
+        self.directory.mkdir(parents=True, exist_ok=True)
+
+    def _path(self, location: str, username: str) -> Path:
+        key = hashlib.sha256(f"{location}\n{username}".encode("utf-8")).hexdigest()
+        return self.directory / f"{key}{SESSION_FILE_SUFFIX}"
+
+    def get(self, location: str, username: str) -> Optional[Dict[str, str]]:
+        """
+        Returns the cookies of the session, or None if there is none or it expired.
+        """
+        path = self._path(location, username)
+        try:
+            session = json.loads(path.read_text())
+        except (OSError, ValueError):
+            return None
+        if session["expires"] < time.time():
+            self.delete(location, username)
+            return None
+        return session["cookies"]
+
+    def put(self, location: str, username: str, cookies: Dict[str, str], ttl: float):
+        """
+        Stores the cookies of a session, to be reused for ttl seconds.
+        """
+        path = self._path(location, username)
+        tmp_path = path.with_suffix(".tmp")
+        fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with os.fdopen(fd, "w") as f:
+            json.dump({"cookies": cookies, "expires": time.time() + ttl}, f)
+        os.replace(tmp_path, path)
+
+    def delete(self, location: str, username: str):
+        self._path(location, username).unlink(missing_ok=True)
+
+
+# the logged in clients shared by the SOP instances of this process, by location and username
+_shared_clients: Dict[Tuple[str, str], httpx.Client] = {}
+_shared_clients_lock = threading.Lock()
+
+
+def get_shared_client(location: str, username: str) -> Optional[httpx.Client]:
+    with _shared_clients_lock:
+        return _shared_clients.get((location, username))
+
+
+def share_client(location: str, username: str, client: httpx.Client) -> httpx.Client:
+    """
+    Registers a logged in client, and returns the client to use:
+    the one registered by another thread in the meantime, if any.
+    """
+    with _shared_clients_lock:
+        return _shared_clients.setdefault((location, username), client)
+
+
+def drop_shared_client(location: str, username: str):
+    with _shared_clients_lock:
+        _shared_clients.pop((location, username), None)
+
+
+def close_shared_clients():
+    """
+    Closes and forgets all shared clients.
+    """
+    with _shared_clients_lock:
+        for client in _shared_clients.values():
+            client.close()
+        _shared_clients.clear()
@@ -0,0 +1,254 @@
+"""
+Streaming conversion and merging of line based RDF formats (N-Triples and N-Quads).
+
+These never build an in-memory Graph:
+each statement is parsed from its line and written out straight away,
+so memory use stays flat whatever the size of the input.
+"""
+
+import hashlib
+import os
+import zlib
+from pathlib import Path
+from typing import Iterable, Iterator, List, Optional, Union
+
+from rdflib import BNode, Literal, URIRef
+from rdflib.plugins.parsers.nquads import NQuadsParser
+from rdflib.plugins.parsers.ntriples import W3CNTriplesParser
+
+LINE_BASED_FORMATS = {
+    "nt": "nt",
+    "ntriples": "nt",
+    "nt11": "nt",
+    "nq": "nquads",
+    "nquads": "nquads",
+}
+
+
+def line_based_format(rdf_format: Optional[str]) -> Optional[str]:
+    """
+    Returns the normalised name ("nt" or "nquads") of a line based RDF format,
+    or None if the format is not line based.
+    """
+    return LINE_BASED_FORMATS.get(rdf_format)
+
+
+def _term_n3(term) -> str:
+    """
+    Returns the N-Triples form of a term.
+    Literal.n3() may give long (triple quoted) strings, which N-Triples does not have, so literals are escaped here.
+    """
+    if not isinstance(term, Literal):
+        return term.n3()
+    quoted = '"%s"' % (
+        term.replace("\\", "\\\\")
+        .replace("\n", "\\n")
+        .replace('"', '\\"')
+        .replace("\r", "\\r")
+    )
+    if term.language:
+        return f"{quoted}@{term.language}"
+    if term.datatype:
+        return f"{quoted}^^<{term.datatype}>"
+    return quoted
+
+
+def _statement_row(triple, context=None) -> str:
+    """
+    Returns the line of a statement: N-Quads if a context (graph name) is given, N-Triples otherwise.
+    """
+    terms = [_term_n3(term) for term in triple]
+    if context is not None:
+        terms.append(context.n3())
+    return " ".join(terms) + " .\n"
+
+
+class _BNodeLabels(dict):
+    """
+    A bnode_context for the rdflib line parsers that keeps the blank node labels
+    of the input, prefixed per input file, instead of remembering every label seen.
+    The prefix is followed by "_", so it must not contain one itself:
+    file 1's _:0x and file 10's _:x become f1_0x and f10_x.
+    """
+
+    def __init__(self, prefix: str):
+        super().__init__()
+        self.prefix = prefix
+
+    def get(self, key, default=None):
+        return BNode(f"{self.prefix}_{key}")
+
+    def __setitem__(self, key, value):
+        pass
+
+
+class _StatementSink:
+    """
+    Receives the statements from the rdflib line parsers
+    and writes each of them out as a line.
+    Statements without a graph go to the graph_iri, or the default graph if it is None:
+    rdflib 7 hands them to default_context, rdflib 6 to the context named by identifier.
+    """
+
+    def __init__(
+        self,
+        out,
+        output_format: str,
+        graph_iri: Optional[URIRef],
+        seen: Optional[set],
+    ):
+        self.out = out
+        self.output_format = output_format
+        self.graph_iri = graph_iri
+        self.seen = seen
+        self.identifier = graph_iri
+        self.default_context = self.get_context(graph_iri)
+
+    # N-Triples parser interface
+    def triple(self, s, p, o):
+        self.write((s, p, o), self.graph_iri)
+
+    # N-Quads parser interface
+    def get_context(self, context):
+        return _ContextSink(self, context)
+
+    def write(self, triple, context):
+        if self.output_format == "nquads":
+            row = _statement_row(triple, context)
+        else:
+            row = _statement_row(triple)
+        if self.seen is not None:
+            digest = hashlib.blake2b(row.encode("utf-8"), digest_size=16).digest()
+            if digest in self.seen:
+                return
+            self.seen.add(digest)
+        self.out.write(row)
+
+
+class _ContextSink:
+    def __init__(self, sink: _StatementSink, context):
+        self.sink = sink
+        self.context = context
+
+    def add(self, triple):
+        self.sink.write(triple, self.context)
+
+
+def _stream_file(
+    input_file_path: Path, input_format: str, sink: _StatementSink, prefix: str
+):
+    bnode_context = _BNodeLabels(prefix)
+    if input_format == "nquads":
+        parser = NQuadsParser(sink=sink)
+    else:
+        parser = W3CNTriplesParser(sink=sink)
+    with open(input_file_path, "r", encoding="utf-8") as f:
+        # W3CNTriplesParser.parse reads line by line and hands every statement to the sink,
+        # for N-Quads this calls the NQuadsParser.parseline override
+        W3CNTriplesParser.parse(parser, f, bnode_context=bnode_context)
+
+
+def stream_merge(
+    input_file_paths: Iterable[Union[Path, str]],
+    output_file_path: Union[Path, str],
+    output_format: str,
+    deduplicate: bool = False,
+    graph_iri: Optional[str] = None,
+) -> Path:
+    """
+    Merges N-Triples / N-Quads files into one N-Triples / N-Quads file, line by line.
+
+    Blank nodes are kept apart per input file.
+    When merging to N-Triples, the graph names of N-Quads input are dropped.
+
+    :param input_file_paths: The N-Triples (.nt) or N-Quads (.nq) files to merge
+    :param output_file_path: The file to write
+    :param output_format: "nt" or "nq" / "nquads"
+    :param deduplicate: Drop duplicate statements. This keeps a 16 byte digest per distinct statement in memory.
+    :param graph_iri: The graph to put N-Triples input statements in when writing N-Quads. Default graph if None.
+    :return: The output file path
+    """
+    output_format_normalised = line_based_format(output_format)
+    if output_format_normalised is None:
+        raise ValueError(
+            f"Streaming output format must be one of {', '.join(LINE_BASED_FORMATS)}"
+        )
+    input_formats: List[str] = []
+    input_file_paths = [Path(f) for f in input_file_paths]
+    for f in input_file_paths:
+        input_format = line_based_format(f.suffix.lstrip("."))
+        if input_format is None:
+            raise ValueError(
+                f"Files to be streamed must have a line based RDF suffix (one of {', '.join(LINE_BASED_FORMATS)})"
+            )
+        input_formats.append(input_format)
+
+    output_file_path = Path(output_file_path)
+    # write next to the output and move into place at the end, the output may also be an input
+    temp_file_path = output_file_path.with_name(output_file_path.name + ".tmp")
+    seen = set() if deduplicate else None
+    try:
+        with open(temp_file_path, "w", encoding="utf-8") as out:
+            sink = _StatementSink(
+                out,
+                output_format_normalised,
+                URIRef(graph_iri) if graph_iri else None,
+                seen,
+            )
+            for index, (f, input_format) in enumerate(
+                zip(input_file_paths, input_formats)
+            ):
+                _stream_file(f, input_format, sink, f"f{index}")
+        os.replace(temp_file_path, output_file_path)
+    finally:
+        temp_file_path.unlink(missing_ok=True)
+    return output_file_path
+
+
+def stream_convert(
+    input_file_path: Union[Path, str],
+    output_file_path: Union[Path, str],
+    output_format: str,
+    graph_iri: Optional[str] = None,
+) -> Path:
+    """
+    Converts between N-Triples and N-Quads, line by line.
+
+    :param input_file_path: The N-Triples (.nt) or N-Quads (.nq) file to convert
+    :param output_file_path: The file to write
+    :param output_format: "nt" or "nq" / "nquads"
+    :param graph_iri: The graph to put N-Triples input statements in when writing N-Quads. Default graph if None.
+    :return: The output file path
+    """
+    return stream_merge(
+        [input_file_path], output_file_path, output_format, graph_iri=graph_iri
+    )
+
+
+def iter_ntriples(
+    triples: Iterable[tuple], batch_size: int = 10_000
+) -> Iterator[bytes]:
+    """
+    Yields the triples as UTF-8 encoded N-Triples, batch_size lines at a time,
+    e.g. as the body of an upload that never holds the whole serialization.
+    """
+    batch = []
+    for triple in triples:
+        batch.append(_statement_row(triple))
+        if len(batch) == batch_size:
+            yield "".join(batch).encode("utf-8")
+            batch = []
+    if batch:
+        yield "".join(batch).encode("utf-8")
+
+
+def gzip_chunks(chunks: Iterable[bytes], level: int = 6) -> Iterator[bytes]:
+    """
+    Yields the chunks compressed as one gzip stream.
+    """
+    compressor = zlib.compressobj(level, wbits=31)
+    for chunk in chunks:
+        compressed = compressor.compress(chunk)
+        if compressed:
+            yield compressed
+    yield compressor.flush()
@@ -0,0 +1,63 @@
+from pathlib import Path
+
+import pytest
+from rdflib import BNode, Graph, Literal, Namespace, URIRef
+from rdflib.namespace import XSD
+
+from rdfx import binary
+from rdfx.persistence_systems import File
+from rdfx.rdfx_cli import convert
+
+EX = Namespace("http://example.com/")
+
+
+def make_graph():
+    g = Graph().parse("tests/data/file_01.ttl")
+    g.bind("ex", EX)
+    node = BNode()
+    g.add((EX.a, EX.b, node))
+    g.add((node, EX.c, Literal("chat", lang="fr")))
+    g.add((node, EX.d, Literal("ünïcødé ✓ \n and a new line")))
+    g.add((node, EX.e, Literal("2021-09-09", datatype=XSD.date)))
+    g.add((node, EX.f, Literal(42)))
+    return g
+
+
+def test_round_trip():
+    g = make_graph()
+    loaded = binary.loads(binary.dumps(g))
+    assert len(loaded) == len(g)
+    assert loaded.isomorphic(g)
+    assert dict(loaded.namespaces())["ex"] == URIRef(EX)
+
+
+def test_rdflib_plugin(tmp_path):
+    g = make_graph()
+    path = tmp_path / "graph.rdfx-bin"
+    g.serialize(destination=path, format="rdfx-bin")
+    assert Graph().parse(path, format="rdfx-bin").isomorphic(g)
+
+
+def test_invalid_data():
+    with pytest.raises(ValueError):
+        binary.loads(b"@prefix ex: <http://example.com/> .")
+
+
+def test_file_write_read(tmp_path):
+    g = make_graph()
+    file_ps = File(tmp_path)
+    file_path = file_ps.write(g, "graph", rdf_format="rdfx-bin")
+    assert file_path == tmp_path / "graph.rdfx-bin"
+    assert file_path.stat().st_size < len(g.serialize(format="turtle").encode("utf-8"))
+    comments, loaded = file_ps.read("graph.rdfx-bin", rdf_format="rdfx-bin")
+    assert comments == []
+    assert loaded.isomorphic(g)
+
+
+def test_convert_to_and_from_binary(tmp_path):
+    input_file = tmp_path / "file_01.ttl"
+    input_file.write_bytes(Path("tests/data/file_01.ttl").read_bytes())
+    ps = File(tmp_path)
+    convert(input_file, ps, "binary", "rdfx-bin")
+    convert(tmp_path / "binary.rdfx-bin", ps, "back", "nt")
+    assert Graph().parse(tmp_path / "back.nt").isomorphic(Graph().parse(input_file))
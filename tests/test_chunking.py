@@ -0,0 +1,44 @@
+from rdflib import BNode, Graph
+from rdflib.compare import isomorphic
+
+from rdfx.chunking import chunk_subjects, subgraph
+
+g = Graph().parse(
+    data="""
+    @prefix ex: <https://example.com/> .
+    ex:a ex:p [ ex:q [ ex:r 1 ] ] ; ex:s 2 .
+    ex:b ex:p 3 .
+    ex:c ex:p _:x .
+    ex:d ex:p _:x .
+    _:x ex:q 4 .
+    ex:e ex:p 5 .
+    """,
+    format="turtle",
+)
+
+
+def test_chunk_subjects_keep_blank_nodes_together():
+    chunks = chunk_subjects(g, 3)
+    sizes = [
+        sum(len(list(g.triples((s, None, None)))) for s in chunk) for chunk in chunks
+    ]
+    # ex:a with its two nested blank nodes is a group of 4 triples, larger than a chunk
+    assert sorted(size for size in sizes if size > 3) == [4]
+    assert sum(sizes) == len(g)
+    for chunk in chunks:
+        subjects = set(chunk)
+        for s in chunk:
+            for o in g.objects(s):
+                if isinstance(o, BNode):
+                    assert o in subjects
+
+
+def test_subgraph():
+    chunks = [subgraph(g, subjects) for subjects in chunk_subjects(g, 5)]
+    assert all(len(chunk) <= 5 for chunk in chunks)
+    merged = Graph()
+    for chunk in chunks:
+        assert dict(chunk.namespaces())["ex"] == dict(g.namespaces())["ex"]
+        merged += chunk
+    assert isomorphic(merged, g)
+    assert len(chunk_subjects(g, 1_000)) == 1
@@ -0,0 +1,35 @@
+from rdflib import Graph, Literal, Namespace, URIRef
+
+from rdfx.rdfx_cli import get_sorted_namespaces
+
+EX = Namespace("http://example.com/")
+SUB = Namespace("http://example.com/sub/")
+XSD = Namespace("http://www.w3.org/2001/XMLSchema#")
+
+
+def make_graph():
+    g = Graph()
+    g.bind("ex", EX)
+    g.bind("sub", SUB)
+    g.bind("unused", "http://unused.example.org/")
+    g.bind("xsd", XSD)
+    return g
+
+
+def test_namespaces_match_as_prefix_only():
+    g = make_graph()
+    # the unused name-space only appears inside the IRI, not at its start
+    g.add((URIRef("http://other.org/a?see=http://unused.example.org/"), EX.p, EX.o))
+    assert get_sorted_namespaces(g) == [("ex", URIRef(EX))]
+
+
+def test_nested_namespaces_are_all_used():
+    g = make_graph()
+    g.add((SUB.a, SUB.p, Literal("x")))
+    assert get_sorted_namespaces(g) == [("ex", URIRef(EX)), ("sub", URIRef(SUB))]
+
+
+def test_literal_datatype_namespace_is_used():
+    g = make_graph()
+    g.add((EX.a, EX.p, Literal(1)))
+    assert get_sorted_namespaces(g) == [("ex", URIRef(EX)), ("xsd", URIRef(XSD))]
@@ -0,0 +1,159 @@
+import gzip
+import shutil
+import sys
+from pathlib import Path
+
+import boto3
+import pytest
+from moto import mock_s3
+from rdflib import Graph
+from rdflib.compare import isomorphic
+
+from rdfx.compression import (
+    COMPRESSIONS,
+    compressing_writer,
+    decompress,
+    split_compression,
+)
+from rdfx.constants import COMPRESSION_OUTPUT_FILE_ENDINGS
+from rdfx.persistence_systems import S3, File, prepare_files_list
+from rdfx.rdfx_cli import get_input_format, main
+
+region = "ap-southeast-2"
+data_dir = Path(__file__).parent / "data"
+g = Graph().parse(data_dir / "file_01.ttl")
+
+
+def gzip_file(source: Path, target: Path):
+    with source.open("rb") as f, gzip.open(target, "wb") as out:
+        shutil.copyfileobj(f, out)
+
+
+@pytest.mark.parametrize("compression", COMPRESSIONS)
+def test_file_write_read(tmp_path, compression):
+    if compression == "zstd":
+        pytest.importorskip("zstandard")
+    file_ps = File(tmp_path)
+    file_path = file_ps.write(
+        g, "vocab", "ttl", ["a leading comment"], compression=compression
+    )
+    assert file_path.name == f"vocab.ttl.{COMPRESSION_OUTPUT_FILE_ENDINGS[compression]}"
+    assert split_compression(file_path) == (str(tmp_path / "vocab.ttl"), compression)
+    comments, graph = file_ps.read(file_path.name, "turtle")
+    assert comments == ["a leading comment"]
+    assert isomorphic(graph, g)
+    # the same content as the uncompressed file
+    plain_path = file_ps.write(g, "plain", "ttl", ["a leading comment"])
+    assert decompress(file_path.read_bytes(), compression) == plain_path.read_bytes()
+
+
+def test_input_files(tmp_path):
+    gzip_file(data_dir / "file_01.ttl", tmp_path / "file_01.ttl.gz")
+    shutil.copy(data_dir / "file_02.rdf", tmp_path)
+    assert sorted(f.name for f in prepare_files_list(tmp_path)) == [
+        "file_01.ttl.gz",
+        "file_02.rdf",
+    ]
+    assert get_input_format(tmp_path / "file_01.ttl.gz") == "turtle"
+    assert get_input_format(tmp_path / "file_03.json-ld.zst") == "json-ld"
+
+
+def test_convert_compressed(tmp_path, monkeypatch):
+    gzip_file(data_dir / "file_01.ttl", tmp_path / "file_01.ttl.gz")
+    argv = [
+        "rdfx",
+        "convert",
+        str(tmp_path / "file_01.ttl.gz"),
+        "-f",
+        "nt",
+        "--compress",
+        "xz",
+        "-j",
+        "1",
+    ]
+    monkeypatch.setattr(sys, "argv", argv)
+    assert main() == 0
+    _, graph = File(tmp_path).read("file_01.nt.xz", "nt")
+    assert isomorphic(graph, g)
+
+    argv = [
+        "rdfx",
+        "merge",
+        str(tmp_path / "file_01.nt.xz"),
+        "-f",
+        "ttl",
+        "-o",
+        str(tmp_path),
+        "--compress",
+        "gzip",
+    ]
+    monkeypatch.setattr(sys, "argv", argv)
+    assert main() == 0
+    assert isomorphic(File(tmp_path).read("merged.ttl.gz", "turtle")[1], g)
+
+
+@mock_s3
+def test_s3_compressed():
+    client = boto3.client(
+        "s3",
+        aws_access_key_id="aws_key",
+        aws_secret_access_key="aws_secret",
+        region_name=region,
+    )
+    client.create_bucket(
+        Bucket="test_bucket", CreateBucketConfiguration={"LocationConstraint": region}
+    )
+    s3_ps = S3(bucket="test_bucket", aws_key="aws_key", aws_secret="aws_secret")
+
+    key = s3_ps.write(g, "vocab", "ttl", ["a leading comment"], compression="gzip")
+    assert key == "vocab.ttl.gz"
+    s3_object = client.get_object(Bucket="test_bucket", Key=key)
+    assert s3_object["ContentEncoding"] == "gzip"
+    body = s3_object["Body"].read()
+    assert isomorphic(Graph().parse(data=decompress(body, "gzip"), format="turtle"), g)
+    comments, graph = s3_ps.read(key, "turtle")
+    assert comments == ["a leading comment"]
+    assert isomorphic(graph, g)
+
+    # an object without a compression suffix is decompressed according to its Content-Encoding
+    body = gzip.compress(g.serialize(format="nt").encode("utf-8"))
+    client.put_object(
+        Bucket="test_bucket", Key="encoded.nt", Body=body, ContentEncoding="gzip"
+    )
+    assert isomorphic(s3_ps.read("encoded.nt", "nt")[1], g)
+    assert isomorphic(s3_ps.merge_prefix("", processes=1), g)
+
+    # xz is no HTTP content coding, so the object is told by its suffix and Content-Type instead
+    key = s3_ps.write(g, "vocab", "nt", compression="xz")
+    s3_object = client.get_object(Bucket="test_bucket", Key=key)
+    assert "ContentEncoding" not in s3_object
+    assert s3_object["ContentType"] == "application/x-xz"
+    assert isomorphic(s3_ps.read(key, "nt")[1], g)
+
+
+def test_compressing_writer_leaves_stream_open(tmp_path):
+    with (tmp_path / "out.gz").open("wb") as f:
+        with compressing_writer(f, "gzip") as writer:
+            writer.write(b"content")
+        assert not f.closed
+    assert gzip.decompress((tmp_path / "out.gz").read_bytes()) == b"content"
+    with pytest.raises(ValueError):
+        compressing_writer(f, "lz4")
+
+
+def test_clean_compressed(tmp_path, monkeypatch):
+    source = tmp_path / "source.ttl"
+    source.write_text(
+        "# a leading comment\n\n"
+        "@prefix ex: <https://example.com/> .\n"
+        "@prefix unused: <https://unused.example.com/> .\n\n"
+        "ex:a ex:p ex:b .\n"
+    )
+    gzip_file(source, tmp_path / "vocab.ttl.gz")
+    source.unlink()
+    monkeypatch.setattr(sys, "argv", ["rdfx", "clean", str(tmp_path), "-j", "1"])
+    assert main() == 0
+    assert [f.name for f in tmp_path.iterdir()] == ["vocab.ttl.gz"]
+    content = gzip.decompress((tmp_path / "vocab.ttl.gz").read_bytes()).decode("utf-8")
+    assert content.startswith("# a leading comment\n")
+    assert "unused" not in content
@@ -1,4 +1,5 @@
 import os
+import shutil
 import sys
 
 sys.path.append(os.getcwd() + "/rdfx")
@@ -6,8 +7,13 @@ import warnings
 from io import StringIO
 from pathlib import Path
 
+import boto3
+from moto import mock_s3
+from rdflib import Graph
+from rdflib.compare import isomorphic
+
 from rdfx.persistence_systems import File
-from rdfx.rdfx_cli import convert
+from rdfx.rdfx_cli import convert, convert_file, main, process_files
 
 
 def test_ttl_nt():
@@ -73,3 +79,103 @@ def test_ttl_comments():
 #         assert expected_output == output_file.read_text()
 #     # delete the file
 #     output_file.unlink()
+
+
+def test_process_files_parallel_matches_serial(tmp_path):
+    input_files = [Path("tests/data/file_01.ttl"), Path("tests/data/file_02.rdf")]
+    outputs = {}
+    for jobs in (1, 2):
+        output_dir = tmp_path / f"jobs_{jobs}"
+        output_dir.mkdir()
+        copies = []
+        for input_file in input_files:
+            copy = output_dir / input_file.name
+            copy.write_bytes(input_file.read_bytes())
+            copies.append(copy)
+        failures = process_files(
+            convert_file,
+            copies,
+            jobs,
+            persistence_system=File(output_dir),
+            output_format="xml",
+        )
+        assert failures == {}
+        outputs[jobs] = {
+            copy.stem: copy.with_suffix(".xml").read_bytes() for copy in copies
+        }
+    assert outputs[1] == outputs[2]
+
+
+def test_process_files_reports_failures(tmp_path):
+    broken_file = tmp_path / "broken.ttl"
+    broken_file.write_text("this is not turtle")
+    good_file = tmp_path / "good.ttl"
+    good_file.write_bytes(Path("tests/data/file_01.ttl").read_bytes())
+    failures = process_files(
+        convert_file,
+        [broken_file, good_file],
+        2,
+        persistence_system=File(tmp_path),
+        output_format="nt",
+    )
+    assert list(failures) == [broken_file]
+    assert (tmp_path / "good.nt").exists()
+
+
+@mock_s3
+def test_convert_to_s3(tmp_path, monkeypatch):
+    region = "ap-southeast-2"
+    monkeypatch.setenv("AWS_ACCESS_KEY_ID", "aws_key")
+    monkeypatch.setenv("AWS_SECRET_ACCESS_KEY", "aws_secret")
+    monkeypatch.setenv("AWS_DEFAULT_REGION", region)
+    client = boto3.client("s3", region_name=region)
+    client.create_bucket(
+        Bucket="test_bucket", CreateBucketConfiguration={"LocationConstraint": region}
+    )
+    for name in ("file_01.ttl", "file_02.rdf"):
+        shutil.copy(Path(__file__).parent / "data" / name, tmp_path)
+    (tmp_path / "broken.ttl").write_text("not turtle")
+
+    monkeypatch.setattr(
+        sys,
+        "argv",
+        ["rdfx", "convert", str(tmp_path), "-f", "nt", "-o", "s3://test_bucket/out/"],
+    )
+    assert main() == 1
+    keys = client.list_objects_v2(Bucket="test_bucket")["Contents"]
+    assert sorted(k["Key"] for k in keys) == ["out/file_01.nt", "out/file_02.nt"]
+    body = client.get_object(Bucket="test_bucket", Key="out/file_01.nt")["Body"].read()
+    expected = Graph().parse(tmp_path / "file_01.ttl")
+    assert isomorphic(Graph().parse(data=body, format="nt"), expected)
+
+
+def test_convert_and_merge_to_nq(tmp_path, monkeypatch):
+    data_dir = Path(__file__).parent / "data"
+    shutil.copy(data_dir / "file_01.ttl", tmp_path)
+    shutil.copy(data_dir / "file_02.rdf", tmp_path)
+    expected = Graph().parse(data_dir / "file_01.ttl")
+
+    monkeypatch.setattr(
+        sys,
+        "argv",
+        ["rdfx", "convert", str(tmp_path / "file_01.ttl"), "-f", "nq", "-j", "1"],
+    )
+    assert main() == 0
+    # default graph quads, which are N-Triples lines
+    assert isomorphic(Graph().parse(tmp_path / "file_01.nq", format="nt"), expected)
+
+    expected.parse(data_dir / "file_02.rdf")
+    argv = [
+        "rdfx",
+        "merge",
+        str(tmp_path / "file_01.ttl"),
+        str(tmp_path / "file_02.rdf"),
+        "-f",
+        "nq",
+        "-o",
+        str(tmp_path),
+    ]
+    monkeypatch.setattr(sys, "argv", argv)
+    assert main() == 0
+    # default graph quads, which are N-Triples lines
+    assert isomorphic(Graph().parse(tmp_path / "merged.nq", format="nt"), expected)
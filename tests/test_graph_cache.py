@@ -0,0 +1,64 @@
+from pathlib import Path
+
+import pytest
+from rdflib import Graph
+
+from rdfx.cache import GraphCache
+from rdfx.persistence_systems import File, String
+
+data = Path("tests/data/file_01.ttl").read_bytes()
+
+
+def test_put_get(tmp_path):
+    cache = GraphCache(tmp_path)
+    key = cache.key(data, "turtle")
+    assert cache.get(key) is None
+    g = Graph().parse(data=data, format="turtle")
+    cache.put(key, ["a comment"], g)
+    comments, cached_graph = cache.get(key)
+    assert comments == ["a comment"]
+    assert cached_graph.isomorphic(g)
+    assert dict(cached_graph.namespaces())["sdo"] == dict(g.namespaces())["sdo"]
+
+
+def test_key_depends_on_format(tmp_path):
+    assert GraphCache.key(data, "turtle") != GraphCache.key(data, "n3")
+
+
+def test_least_recently_used_are_evicted(tmp_path):
+    g = Graph().parse(data=data, format="turtle")
+    cache = GraphCache(tmp_path)
+    cache.put("first", [], g)
+    entry_size = (tmp_path / "first.graph").stat().st_size
+    cache.max_size = entry_size * 2
+    cache.put("second", [], g)
+    assert cache.get("first") is not None  # now more recently used than "second"
+    cache.put("third", [], g)
+    assert cache.get("second") is None
+    assert cache.get("first") is not None
+    assert cache.get("third") is not None
+
+
+def test_file_read_through_cache(tmp_path, monkeypatch):
+    file_ps = File("tests/data", cache=GraphCache(tmp_path))
+    comments, g = file_ps.read("file_01.ttl")
+    assert len(g) == 6
+
+    def fail(*args, **kwargs):
+        raise AssertionError("cached graphs are not parsed again")
+
+    monkeypatch.setattr(Graph, "parse", fail)
+    cached_comments, cached_graph = file_ps.read("file_01.ttl")
+    assert cached_comments == comments
+    assert cached_graph.isomorphic(g)
+    with pytest.raises(AssertionError):
+        File("tests/data").read("file_01.ttl")
+
+
+def test_string_read_through_cache(tmp_path):
+    string_ps = String(cache=GraphCache(tmp_path))
+    content = "# a comment\n" + data.decode("utf-8")
+    assert string_ps.read(content)[0] == ["a comment"]
+    comments, g = string_ps.read(content)
+    assert comments == ["a comment"]
+    assert len(g) == 6
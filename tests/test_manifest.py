@@ -0,0 +1,102 @@
+import os
+import sys
+from pathlib import Path
+
+import pytest
+
+from rdfx.manifest import Manifest
+from rdfx.rdfx_cli import main
+
+
+def make_files(tmp_path):
+    input_file = tmp_path / "input.ttl"
+    input_file.write_bytes(Path("tests/data/file_01.ttl").read_bytes())
+    output_file = tmp_path / "input.nt"
+    output_file.write_text("")
+    return input_file, output_file
+
+
+def test_up_to_date(tmp_path):
+    input_file, output_file = make_files(tmp_path)
+    manifest = Manifest(tmp_path)
+    assert not manifest.is_up_to_date("convert", output_file, [input_file], "nt")
+    manifest.record("convert", output_file, [input_file], "nt")
+    manifest.save()
+
+    manifest = Manifest(tmp_path)
+    assert manifest.is_up_to_date("convert", output_file, [input_file], "nt")
+    assert not manifest.is_up_to_date("convert", output_file, [input_file], "xml")
+    assert not manifest.is_up_to_date("clean", output_file, [input_file], "nt")
+
+
+def test_changed_comments_are_not_up_to_date(tmp_path):
+    input_file, output_file = make_files(tmp_path)
+    manifest = Manifest(tmp_path)
+    manifest.record("convert", output_file, [input_file], "ttl", "version 1")
+    assert manifest.is_up_to_date(
+        "convert", output_file, [input_file], "ttl", "version 1"
+    )
+    assert not manifest.is_up_to_date(
+        "convert", output_file, [input_file], "ttl", "version 2"
+    )
+    assert not manifest.is_up_to_date("convert", output_file, [input_file], "ttl")
+
+
+def test_touched_input_is_up_to_date(tmp_path):
+    input_file, output_file = make_files(tmp_path)
+    manifest = Manifest(tmp_path)
+    manifest.record("convert", output_file, [input_file], "nt")
+    stat = input_file.stat()
+    os.utime(input_file, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+    assert manifest.is_up_to_date("convert", output_file, [input_file], "nt")
+
+
+def test_changed_input_or_output_is_not_up_to_date(tmp_path):
+    input_file, output_file = make_files(tmp_path)
+    manifest = Manifest(tmp_path)
+    manifest.record("convert", output_file, [input_file], "nt")
+    input_file.write_text(input_file.read_text().replace("Car", "Bus"))
+    assert not manifest.is_up_to_date("convert", output_file, [input_file], "nt")
+
+    manifest.record("convert", output_file, [input_file], "nt")
+    output_file.unlink()
+    assert not manifest.is_up_to_date("convert", output_file, [input_file], "nt")
+
+
+def test_incremental_convert(tmp_path, monkeypatch, capsys):
+    input_file, output_file = make_files(tmp_path)
+    output_file.unlink()
+    argv = [
+        "rdfx",
+        "convert",
+        str(input_file),
+        "-f",
+        "nt",
+        "-o",
+        str(tmp_path),
+        "--incremental",
+        "-j",
+        "1",
+    ]
+    monkeypatch.setattr(sys, "argv", argv)
+    assert main() == 0
+    assert output_file.exists()
+    output_mtime = output_file.stat().st_mtime_ns
+
+    assert main() == 0
+    assert "Skipping 1 up to date file(s)" in capsys.readouterr().out
+    assert output_file.stat().st_mtime_ns == output_mtime
+
+
+@pytest.mark.parametrize(
+    "argv",
+    [
+        ["convert", "file.ttl", "-f", "nt", "-o", "s3://bucket/prefix"],
+        ["merge", "s3://bucket/prefix/", "-f", "nt"],
+        ["sync", "file.ttl", "-o", "s3://bucket/prefix"],
+    ],
+)
+def test_incremental_refused_for_s3(monkeypatch, capsys, argv):
+    monkeypatch.setattr(sys, "argv", ["rdfx", *argv, "--incremental"])
+    assert main() == 1
+    assert "--incremental only works with local files" in capsys.readouterr().err
@@ -1,7 +1,12 @@
+import sys
 from pathlib import Path
 
+import boto3
+from moto import mock_s3
+from rdflib import Graph
+
 from rdfx.persistence_systems import File
-from rdfx.rdfx_cli import merge
+from rdfx.rdfx_cli import main, merge
 
 
 def test_merge_directory():
@@ -15,3 +20,42 @@ def test_merge_directory():
     assert output_file.exists()
     # delete the file
     output_file.unlink()
+
+
+@mock_s3
+def test_merge_s3_prefix(tmp_path, monkeypatch):
+    region = "ap-southeast-2"
+    monkeypatch.setenv("AWS_ACCESS_KEY_ID", "aws_key")
+    monkeypatch.setenv("AWS_SECRET_ACCESS_KEY", "aws_secret")
+    monkeypatch.setenv("AWS_DEFAULT_REGION", region)
+    client = boto3.client("s3", region_name=region)
+    client.create_bucket(
+        Bucket="test_bucket", CreateBucketConfiguration={"LocationConstraint": region}
+    )
+    input_dir = Path(__file__).parent / "data"
+    expected = Graph()
+    for file in ("file_01.ttl", "file_02.rdf"):
+        client.put_object(
+            Bucket="test_bucket",
+            Key=f"dumps/{file}",
+            Body=(input_dir / file).read_bytes(),
+        )
+        expected.parse(input_dir / file)
+
+    monkeypatch.setattr(
+        sys,
+        "argv",
+        [
+            "rdfx",
+            "merge",
+            "s3://test_bucket/dumps/",
+            "-f",
+            "nt",
+            "-o",
+            str(tmp_path),
+            "-j",
+            "1",
+        ],
+    )
+    assert main() == 0
+    assert len(Graph().parse(tmp_path / "merged.nt")) == len(expected)
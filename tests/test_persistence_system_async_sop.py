@@ -0,0 +1,220 @@
+import asyncio
+
+import httpx
+import pytest
+from rdflib import Graph
+from rdflib.compare import isomorphic
+
+from rdfx.persistence_systems import AsyncSOP
+from rdfx.sessions import SessionStore
+from tests.test_persistence_system_sop_mock import (
+    REMOTE,
+    MockSOP,
+    big_graph,
+    chunk_count,
+    g,
+    rows_query,
+)
+
+
+def test_async_sop():
+    async def run():
+        server = MockSOP()
+        async with AsyncSOP(
+            location="https://sop.example.com",
+            password="password",
+            transport=httpx.MockTransport(server.respond_async),
+        ) as sop_ps:
+            comments, graph = await sop_ps.read("urn:x-evn-master:datagraph")
+            assert comments == ["a leading comment"]
+            assert isomorphic(graph, g)
+            assert isomorphic(await sop_ps.read_graph("urn:x-evn-master:datagraph"), g)
+            assert await sop_ps.asset_exists(
+                "urn:x-evn-tag:datagraph:workflow:Administrator"
+            )
+            assert not await sop_ps.asset_exists("urn:x-evn-master:other")
+            assert await sop_ps.asset_collection_size(
+                "urn:x-evn-master:datagraph"
+            ) == len(g)
+            assert (
+                await sop_ps.write(g, "urn:x-evn-master:datagraph")
+                == "Imported the graph"
+            )
+            datagraph_iri = await sop_ps.create_manifest("new_manifest")
+            assert datagraph_iri == "urn:x-evn-master:new_manifest"
+        # logged in once, before the first request
+        assert server.paths[:2] == ["/tbl", "/tbl/j_security_check"]
+        assert server.paths.count("/tbl/j_security_check") == 1
+        assert sop_ps.client is None
+
+    asyncio.run(run())
+
+
+def test_async_sop_created_outside_event_loop():
+    server = MockSOP()
+    sop_ps = AsyncSOP(transport=httpx.MockTransport(server.respond_async))
+    # no request is made before the client is first used
+    assert server.paths == []
+
+    async def run():
+        async with sop_ps:
+            return await sop_ps.read_graph("urn:x-evn-master:datagraph")
+
+    assert isomorphic(asyncio.run(run()), g)
+
+
+@pytest.mark.parametrize("max_concurrency", [1, 4])
+def test_async_sop_read_many(max_concurrency):
+    async def run():
+        server = MockSOP(delay=0.01)
+        async with AsyncSOP(
+            transport=httpx.MockTransport(server.respond_async),
+            max_concurrency=max_concurrency,
+        ) as sop_ps:
+            graph_iris = ["urn:x-evn-master:datagraph"] * 12 + [
+                "urn:x-evn-master:missing"
+            ]
+            results = await sop_ps.read_many(graph_iris)
+        assert [r.item for r in results] == graph_iris
+        for result in results[:-1]:
+            comments, graph = result.result
+            assert isomorphic(graph, g)
+        assert results[-1].error is not None
+        assert server.max_in_flight == max_concurrency
+
+    asyncio.run(run())
+
+
+@pytest.mark.parametrize("parallel", [1, 3])
+def test_async_sop_write_chunked(parallel):
+    async def run():
+        server = MockSOP(delay=0.01)
+        async with AsyncSOP(
+            transport=httpx.MockTransport(server.respond_async)
+        ) as sop_ps:
+            messages = await sop_ps.write_chunked(
+                big_graph,
+                "urn:x-evn-master:datagraph",
+                max_triples=3,
+                parallel=parallel,
+            )
+        assert len(messages) == chunk_count
+        assert server.max_in_flight == min(parallel, chunk_count)
+        written = Graph()
+        for upload in server.uploads:
+            written.parse(data=upload, format="turtle")
+        assert isomorphic(written, big_graph)
+
+    asyncio.run(run())
+
+
+def test_async_sop_query_iter():
+    async def run():
+        server = MockSOP(rows=25)
+        async with AsyncSOP(
+            transport=httpx.MockTransport(server.respond_async)
+        ) as sop_ps:
+            return [
+                batch
+                async for batch in sop_ps.query_iter(
+                    rows_query, "urn:x-evn-master:datagraph", page_size=10
+                )
+            ]
+
+    batches = asyncio.run(run())
+    assert [len(batch) for batch in batches] == [10, 10, 5]
+
+
+def test_async_sop_assets_exist():
+    async def run():
+        server = MockSOP()
+        async with AsyncSOP(
+            transport=httpx.MockTransport(server.respond_async), exists_ttl=60
+        ) as sop_ps:
+            graph_names = [f"urn:x-evn-master:other_{i}" for i in range(10)] + [
+                "urn:x-evn-master:datagraph"
+            ]
+            exists = await sop_ps.assets_exist(graph_names, batch_size=4)
+            assert [name for name, e in exists.items() if e] == [
+                "urn:x-evn-master:datagraph"
+            ]
+            assert await sop_ps.asset_exists("urn:x-evn-master:other_3") is False
+        assert server.paths.count("/tbl/sparql") == 3
+
+    asyncio.run(run())
+
+
+def test_async_sop_asset_statistics():
+    async def run():
+        server = MockSOP()
+        async with AsyncSOP(
+            transport=httpx.MockTransport(server.respond_async)
+        ) as sop_ps:
+            asset_iris = [f"urn:x-evn-master:other_{i}" for i in range(10)] + [
+                "urn:x-evn-master:datagraph"
+            ]
+            statistics = await sop_ps.asset_statistics(
+                asset_iris, distinct=True, batch_size=4
+            )
+            assert statistics["urn:x-evn-master:other_3"]["subjects"] == 0
+            assert statistics["urn:x-evn-master:datagraph"]["triples"] == len(g)
+        assert server.paths.count("/tbl/sparql") == 3
+        assert all("default-graph-uri" not in form for form in server.queries)
+
+    asyncio.run(run())
+
+
+def test_async_sop_write_delta():
+    async def run():
+        server = MockSOP()
+        async with AsyncSOP(
+            transport=httpx.MockTransport(server.respond_async)
+        ) as sop_ps:
+            changed = Graph()
+            changed += g
+            changed.remove(next(iter(g)))
+            delta = await sop_ps.write_delta(changed, "urn:x-evn-master:datagraph")
+            assert (len(delta.added), len(delta.removed)) == (0, 1)
+        return server.updates
+
+    assert len(asyncio.run(run())) == 1
+
+
+def test_async_sop_session_store(tmp_path):
+    async def run():
+        server = MockSOP()
+        transport = httpx.MockTransport(server.respond_async)
+        store = SessionStore(tmp_path)
+        for _ in range(2):
+            async with AsyncSOP(
+                REMOTE, password="password", transport=transport, session_store=store
+            ) as sop_ps:
+                assert await sop_ps.asset_exists("urn:x-evn-master:datagraph")
+                assert sop_ps.location == REMOTE + "/tbl"
+        return server.paths
+
+    assert asyncio.run(run()).count("/tbl/j_security_check") == 1
+
+
+def test_async_sop_logged_out_session(tmp_path):
+    async def run():
+        server = MockSOP()
+        transport = httpx.MockTransport(server.respond_async)
+        store = SessionStore(tmp_path)
+        async with AsyncSOP(
+            REMOTE, password="password", transport=transport, session_store=store
+        ) as sop_ps:
+            assert await sop_ps._create_client(test_connection=True) is True
+            server.sessions.clear()
+        async with AsyncSOP(
+            REMOTE, password="password", transport=transport, session_store=store
+        ) as sop_ps:
+            assert await sop_ps.asset_exists("urn:x-evn-master:datagraph")
+            assert sop_ps.client.cookies["JSESSIONID"] == "session-2"
+            # an open client which was logged out is replaced when testing the connection
+            server.sessions.clear()
+            assert await sop_ps._create_client(test_connection=True) is True
+            assert sop_ps.client.cookies["JSESSIONID"] == "session-3"
+        return server.paths
+
+    assert asyncio.run(run()).count("/tbl/j_security_check") == 3
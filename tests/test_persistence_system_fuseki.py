@@ -0,0 +1,114 @@
+import gzip
+
+import httpx
+import pytest
+from rdflib import BNode, Dataset, Graph, Literal, URIRef
+from rdflib.compare import isomorphic
+from rdflib.graph import DATASET_DEFAULT_GRAPH_ID
+
+from rdfx.persistence_systems import Fuseki
+
+g = Graph().parse("tests/data/file_01.ttl")
+g.add((BNode(), URIRef("https://example.com/p"), Literal("a blank node")))
+
+
+class MockFuseki:
+    """
+    Answers Graph Store Protocol requests like a Fuseki dataset "ds".
+    """
+
+    def __init__(self):
+        self.dataset = Dataset()
+        self.requests = []
+
+    def graph(self, request: httpx.Request) -> Graph:
+        graph_iri = request.url.params.get("graph")
+        if graph_iri is None:
+            return self.dataset.graph(DATASET_DEFAULT_GRAPH_ID)
+        return self.dataset.graph(URIRef(graph_iri))
+
+    def exists(self, request: httpx.Request) -> bool:
+        graph_iri = request.url.params.get("graph")
+        return graph_iri is None or URIRef(graph_iri) in {
+            graph.identifier for graph in self.dataset.graphs()
+        }
+
+    def respond(self, request: httpx.Request) -> httpx.Response:
+        if request.url.path != "/ds/data":
+            return httpx.Response(404)
+        self.requests.append(request)
+        if ("default" in request.url.params) == ("graph" in request.url.params):
+            return httpx.Response(
+                400, text="Exactly one of default or graph is required"
+            )
+        if request.method in ("PUT", "POST"):
+            body = request.read()
+            if request.headers.get("Content-Encoding") == "gzip":
+                body = gzip.decompress(body)
+            graph = self.graph(request)
+            if request.method == "PUT":
+                graph.remove((None, None, None))
+            graph.parse(data=body, format="nt")
+            return httpx.Response(201 if request.method == "PUT" else 200)
+        if not self.exists(request):
+            return httpx.Response(404, text="No such graph")
+        if request.method == "HEAD":
+            return httpx.Response(200)
+        content = self.graph(request).serialize(format="nt", encoding="utf-8")
+        return httpx.Response(
+            200,
+            content=gzip.compress(content),
+            headers={
+                "Content-Type": "application/n-triples",
+                "Content-Encoding": "gzip",
+            },
+        )
+
+
+def fuseki(server: MockFuseki, **kwargs) -> Fuseki:
+    return Fuseki(
+        "http://localhost:3030",
+        "ds",
+        transport=httpx.MockTransport(server.respond),
+        **kwargs
+    )
+
+
+@pytest.mark.parametrize("compress", [False, True])
+def test_fuseki_write_read(compress):
+    server = MockFuseki()
+    fuseki_ps = fuseki(server, gzip=compress)
+    graph_iri = "https://example.com/graph"
+    assert not fuseki_ps.asset_exists(graph_iri)
+
+    fuseki_ps.write(g, graph_iri)
+    request = server.requests[-1]
+    assert request.method == "PUT"
+    # streamed, without building the whole body first
+    assert request.headers["Transfer-Encoding"] == "chunked"
+    assert (request.headers.get("Content-Encoding") == "gzip") == compress
+    assert fuseki_ps.asset_exists(graph_iri)
+    assert isomorphic(fuseki_ps.read(graph_iri), g)
+
+    # POST adds to the graph, PUT replaces it
+    extra = Graph()
+    extra.add(
+        (URIRef("https://example.com/s"), URIRef("https://example.com/p"), Literal(1))
+    )
+    fuseki_ps.write(extra, graph_iri, replace=False)
+    assert len(fuseki_ps.read(graph_iri)) == len(g) + 1
+    fuseki_ps.write(extra, graph_iri)
+    assert isomorphic(fuseki_ps.read(graph_iri), extra)
+
+    fuseki_ps.write(g)
+    assert str(server.requests[-1].url).endswith("/ds/data?default")
+    assert isomorphic(fuseki_ps.read(), g)
+
+
+def test_fuseki_errors():
+    server = MockFuseki()
+    fuseki_ps = fuseki(server)
+    with pytest.raises(ValueError):
+        fuseki_ps.write(g, "not an IRI")
+    with pytest.raises(Exception, match="Status code: 404"):
+        fuseki_ps.read("https://example.com/missing")
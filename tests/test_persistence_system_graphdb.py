@@ -0,0 +1,138 @@
+import uuid
+from urllib.parse import parse_qs
+
+import httpx
+import pytest
+from rdflib import Dataset, Graph, URIRef
+from rdflib.compare import isomorphic
+from rdflib.graph import DATASET_DEFAULT_GRAPH_ID
+
+from rdfx.chunking import chunk_subjects
+from rdfx.persistence_systems import GraphDB
+
+LOCATION = "http://localhost:7200"
+REPOSITORY = "/repositories/repo"
+
+big_graph = Graph().parse(
+    data="""
+    @prefix ex: <https://example.com/> .
+    ex:a ex:p [ ex:q [ ex:r 1 ] ] ; ex:s 2 .
+    ex:b ex:p 3 .
+    ex:c ex:p _:x .
+    ex:d ex:p _:x .
+    _:x ex:q 4 .
+    ex:e ex:p 5 .
+    """,
+    format="turtle",
+)
+chunk_count = len(chunk_subjects(big_graph, 3))
+
+
+class MockRDF4J:
+    """
+    Answers the RDF4J REST API requests for a repository "repo",
+    applying the changes of a transaction only when it is committed.
+    Each ADD is parsed on its own, so blank nodes are not shared between requests, as in RDF4J.
+    """
+
+    def __init__(self, failing_add: int = None):
+        self.dataset = Dataset()
+        self.transactions = {}
+        self.adds = 0
+        self.failing_add = failing_add
+
+    def graph(self, context: str) -> Graph:
+        if context == "null":
+            return self.dataset.graph(DATASET_DEFAULT_GRAPH_ID)
+        return self.dataset.graph(URIRef(context.strip("<>")))
+
+    def respond(self, request: httpx.Request) -> httpx.Response:
+        path = request.url.path
+        if request.method == "POST" and path == REPOSITORY + "/transactions":
+            transaction = str(uuid.uuid4())
+            self.transactions[transaction] = []
+            return httpx.Response(
+                201,
+                headers={
+                    "Location": f"{LOCATION}{REPOSITORY}/transactions/{transaction}"
+                },
+            )
+        if path.startswith(REPOSITORY + "/transactions/"):
+            changes = self.transactions.get(path.rsplit("/", 1)[1])
+            if changes is None:
+                return httpx.Response(404, text="Unknown transaction")
+            if request.method == "DELETE":
+                del self.transactions[path.rsplit("/", 1)[1]]
+                return httpx.Response(204)
+            action = request.url.params["action"]
+            if action == "UPDATE":
+                changes.append(
+                    ("update", parse_qs(request.read().decode("utf-8"))["update"][0])
+                )
+            elif action == "ADD":
+                self.adds += 1
+                if self.adds == self.failing_add:
+                    return httpx.Response(500, text="Out of memory")
+                chunk = Graph().parse(data=request.read(), format="nt")
+                changes.append(("add", request.url.params["context"], chunk))
+            elif action == "COMMIT":
+                for change in changes:
+                    if change[0] == "update":
+                        self.dataset.update(change[1])
+                    else:
+                        graph = self.graph(change[1])
+                        graph += change[2]
+                del self.transactions[path.rsplit("/", 1)[1]]
+            return httpx.Response(200)
+        if request.method == "GET" and path == REPOSITORY + "/statements":
+            content = self.graph(request.url.params["context"]).serialize(
+                format="nt", encoding="utf-8"
+            )
+            return httpx.Response(
+                200, content=content, headers={"Content-Type": "application/n-triples"}
+            )
+        return httpx.Response(404)
+
+
+def graphdb(server: MockRDF4J) -> GraphDB:
+    return GraphDB(LOCATION, "repo", transport=httpx.MockTransport(server.respond))
+
+
+def test_graphdb_write_read():
+    server = MockRDF4J()
+    graphdb_ps = graphdb(server)
+    graph_iri = "https://example.com/graph"
+    progress = []
+    graphdb_ps.write(
+        big_graph,
+        graph_iri,
+        max_triples=3,
+        progress=lambda done, total: progress.append((done, total)),
+    )
+    assert server.adds == chunk_count > 1
+    assert progress == [(done, chunk_count) for done in range(1, chunk_count + 1)]
+    assert server.transactions == {}
+    assert isomorphic(graphdb_ps.read(graph_iri), big_graph)
+
+    # replace=False adds to the graph, and by default the graph is replaced
+    extra = Graph().parse(
+        data="<https://example.com/f> <https://example.com/p> 6 .", format="turtle"
+    )
+    graphdb_ps.write(extra, graph_iri, replace=False)
+    assert len(graphdb_ps.read(graph_iri)) == len(big_graph) + 1
+    graphdb_ps.write(extra, graph_iri)
+    assert isomorphic(graphdb_ps.read(graph_iri), extra)
+
+    graphdb_ps.write(big_graph)
+    assert isomorphic(graphdb_ps.read(), big_graph)
+
+
+def test_graphdb_write_rolls_back():
+    server = MockRDF4J(failing_add=2)
+    graphdb_ps = graphdb(server)
+    with pytest.raises(Exception, match=f"chunk 2 of {chunk_count}"):
+        graphdb_ps.write(big_graph, "https://example.com/graph", max_triples=3)
+    assert server.transactions == {}
+    assert len(graphdb_ps.read("https://example.com/graph")) == 0
+    with pytest.raises(ValueError):
+        graphdb_ps.write(big_graph, "not an IRI")
@@ -1,12 +1,18 @@
+from concurrent.futures import ThreadPoolExecutor
+
 import boto3
 import botocore
+import moto.s3.models
 import pytest
 import rdflib
 from botocore.exceptions import BotoCoreError
 from moto import mock_s3
 from rdflib import Graph
+from rdflib.compare import isomorphic
 
-from rdfx.persistence_systems import S3
+import rdfx.persistence_systems
+from rdfx.cache import GraphCache
+from rdfx.persistence_systems import S3, PersistenceSystem
 
 g = Graph().parse(
     data="""
@@ -91,6 +97,30 @@ def test_read():
     assert len(graph) == 6
 
 
+@mock_s3
+def test_read_leading_comments(monkeypatch):
+    region = "ap-southeast-2"
+    client = boto3.client(
+        "s3",
+        aws_access_key_id="aws_key",
+        aws_secret_access_key="aws_secret",
+        region_name=region,
+    )
+    client.create_bucket(
+        Bucket="test_bucket", CreateBucketConfiguration={"LocationConstraint": region}
+    )
+    with open("tests/data/file_01.ttl", "rb") as f:
+        body = b"# baseURI: http://example.com\n# a second comment\n" + f.read()
+    client.put_object(Bucket="test_bucket", Key="test_file.ttl", Body=body)
+
+    # small chunks, so the comments and the first line of turtle span several of them
+    monkeypatch.setattr(rdfx.persistence_systems, "STREAM_CHUNK_SIZE", 7)
+    s3_ps = S3(bucket="test_bucket", aws_key="aws_key", aws_secret="aws_secret")
+    comments, graph = s3_ps.read(graph_name="test_file.ttl", rdf_format="ttl")
+    assert comments == ["baseURI: http://example.com", "a second comment"]
+    assert len(graph) == 6
+
+
 @mock_s3
 def test_asset_exists_positive():
     region = "ap-southeast-2"
@@ -126,3 +156,309 @@ def test_asset_exists_negative():
 
     s3_ps = S3(bucket="test_bucket", aws_key="aws_key", aws_secret="aws_secret")
     assert not s3_ps.asset_exists("test_file.ttl")
+
+
+@mock_s3
+def test_client_is_reused():
+    s3_ps = S3(bucket="test_bucket", aws_key="aws_key", aws_secret="aws_secret")
+    client = s3_ps.client
+    assert s3_ps.client is client
+    # created once, also when first used from many threads at the same time
+    s3_ps = S3(bucket="test_bucket", aws_key="aws_key", aws_secret="aws_secret")
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        clients = list(executor.map(lambda _: s3_ps.client, range(32)))
+    assert all(c is clients[0] for c in clients)
+
+
+@mock_s3
+def test_shared_client():
+    region = "ap-southeast-2"
+    session = boto3.session.Session()
+    client = session.client(
+        "s3",
+        aws_access_key_id="aws_key",
+        aws_secret_access_key="aws_secret",
+        region_name=region,
+    )
+    client.create_bucket(
+        Bucket="test_bucket", CreateBucketConfiguration={"LocationConstraint": region}
+    )
+    s3_ps_1 = S3(
+        bucket="test_bucket", aws_key="aws_key", aws_secret="aws_secret", client=client
+    )
+    s3_ps_2 = S3(
+        bucket="test_bucket", aws_key="aws_key", aws_secret="aws_secret", client=client
+    )
+    s3_ps_1.write(g, filename="test_file", rdf_format="nt")
+    assert s3_ps_2.asset_exists("test_file.nt")
+    assert s3_ps_1.client is s3_ps_2.client is client
+
+    s3_ps_3 = S3(
+        bucket="test_bucket",
+        aws_key="aws_key",
+        aws_secret="aws_secret",
+        session=session,
+        max_pool_connections=32,
+    )
+    assert s3_ps_3.asset_exists("test_file.nt")
+    assert s3_ps_3.client.meta.config.max_pool_connections == 32
+
+
+@mock_s3
+def test_write_multipart(monkeypatch):
+    # allow parts smaller than the 5 MiB S3 minimum
+    monkeypatch.setattr(moto.s3.models, "S3_UPLOAD_PART_MIN_SIZE", 1)
+    region = "ap-southeast-2"
+    client = boto3.client(
+        "s3",
+        aws_access_key_id="aws_key",
+        aws_secret_access_key="aws_secret",
+        region_name=region,
+    )
+    client.create_bucket(
+        Bucket="test_bucket", CreateBucketConfiguration={"LocationConstraint": region}
+    )
+    graph = Graph().parse("tests/data/file_01.ttl")
+    comments = ["baseURI: https://example.com/big"]
+    s3_ps = S3(
+        bucket="test_bucket", aws_key="aws_key", aws_secret="aws_secret", part_size=256
+    )
+    key = s3_ps.write(graph, "big", rdf_format="turtle", leading_comments=comments)
+    assert key == "big.ttl"
+    s3_object = client.get_object(Bucket="test_bucket", Key=key)
+    # a multipart upload ETag ends with the number of parts
+    assert int(s3_object["ETag"].strip('"').split("-")[1]) > 1
+    assert s3_object["Body"].read().decode(
+        "utf-8"
+    ) == PersistenceSystem.generate_string(graph, "turtle", comments)
+
+    # small graphs are uploaded with put_object
+    s3_ps.part_size = 8 * 1024**2
+    key = s3_ps.write(graph, "small", rdf_format="turtle")
+    assert "-" not in client.head_object(Bucket="test_bucket", Key=key)["ETag"]
+
+
+@mock_s3
+def test_read_write_many():
+    region = "ap-southeast-2"
+    client = boto3.client(
+        "s3",
+        aws_access_key_id="aws_key",
+        aws_secret_access_key="aws_secret",
+        region_name=region,
+    )
+    client.create_bucket(
+        Bucket="test_bucket", CreateBucketConfiguration={"LocationConstraint": region}
+    )
+    s3_ps = S3(bucket="test_bucket", aws_key="aws_key", aws_secret="aws_secret")
+    graphs = (
+        (
+            Graph().add(
+                (rdflib.URIRef(f"a:{i}"), rdflib.URIRef("b:"), rdflib.Literal(i))
+            ),
+            f"graph_{i}",
+        )
+        for i in range(20)
+    )
+    results = s3_ps.write_many(graphs, rdf_format="nt", max_workers=4)
+    assert [r.item for r in results] == [f"graph_{i}" for i in range(20)]
+    assert [r.result for r in results] == [f"graph_{i}.nt" for i in range(20)]
+    assert all(r.error is None for r in results)
+
+    keys = [f"graph_{i}.nt" for i in range(20)] + ["missing.nt"]
+    results = s3_ps.read_many(keys, rdf_format="nt", max_workers=4)
+    assert [r.item for r in results] == keys
+    for i, result in enumerate(results[:-1]):
+        comments, graph = result.result
+        assert graph.value(
+            rdflib.URIRef(f"a:{i}"), rdflib.URIRef("b:")
+        ) == rdflib.Literal(i)
+    # a failing transfer does not stop the batch
+    assert results[-1].result is None
+    assert isinstance(results[-1].error, botocore.exceptions.ClientError)
+
+
+@mock_s3
+@pytest.mark.parametrize("processes", [1, 2])
+def test_merge_prefix(processes):
+    region = "ap-southeast-2"
+    client = boto3.client(
+        "s3",
+        aws_access_key_id="aws_key",
+        aws_secret_access_key="aws_secret",
+        region_name=region,
+    )
+    client.create_bucket(
+        Bucket="test_bucket", CreateBucketConfiguration={"LocationConstraint": region}
+    )
+    expected = Graph()
+    for i in range(12):
+        graph = Graph().add(
+            (
+                rdflib.URIRef(f"https://example.com/{i}"),
+                rdflib.URIRef("https://example.com/p"),
+                rdflib.BNode(),
+            )
+        )
+        expected += graph
+        rdf_format = ("nt", "turtle", "xml")[i % 3]
+        key = f"exports/graph_{i}.{PersistenceSystem.file_suffix(rdf_format)}"
+        client.put_object(
+            Bucket="test_bucket", Key=key, Body=graph.serialize(format=rdf_format)
+        )
+    client.put_object(Bucket="test_bucket", Key="exports/README.md", Body=b"not RDF")
+    client.put_object(
+        Bucket="test_bucket", Key="other/graph.nt", Body=g.serialize(format="nt")
+    )
+
+    s3_ps = S3(bucket="test_bucket", aws_key="aws_key", aws_secret="aws_secret")
+    assert len(list(s3_ps.list_keys("exports/"))) == 13
+    merged = s3_ps.merge_prefix("exports/", processes=processes)
+    assert len(merged) == 12
+    # the blank nodes of the objects are kept apart
+    assert len(set(merged.objects())) == 12
+    assert isomorphic(merged, expected)
+    # one thread keeps only 2 downloads in flight, the rest are fetched as those are consumed
+    assert isomorphic(
+        s3_ps.merge_prefix("exports/", max_workers=1, processes=processes), expected
+    )
+
+
+@mock_s3
+@pytest.mark.parametrize("processes", [1, 2])
+def test_read_parallel(processes):
+    region = "ap-southeast-2"
+    client = boto3.client(
+        "s3",
+        aws_access_key_id="aws_key",
+        aws_secret_access_key="aws_secret",
+        region_name=region,
+    )
+    client.create_bucket(
+        Bucket="test_bucket", CreateBucketConfiguration={"LocationConstraint": region}
+    )
+    expected = Graph()
+    for i in range(50):
+        node = rdflib.BNode()
+        expected.add(
+            (
+                rdflib.URIRef(f"https://example.com/{i}"),
+                rdflib.URIRef("https://example.com/p"),
+                node,
+            )
+        )
+        expected.add(
+            (
+                node,
+                rdflib.URIRef("https://example.com/label"),
+                rdflib.Literal(f"ünïcödé {i}"),
+            )
+        )
+    client.put_object(
+        Bucket="test_bucket",
+        Key="big.nt",
+        Body=expected.serialize(format="nt").encode("utf-8"),
+    )
+
+    s3_ps = S3(bucket="test_bucket", aws_key="aws_key", aws_secret="aws_secret")
+    # ranges much smaller than a line, which also split the multi-byte characters
+    comments, graph = s3_ps.read_parallel("big.nt", range_size=37, processes=processes)
+    assert comments == []
+    assert isomorphic(graph, expected)
+
+
+@mock_s3
+def test_read_parallel_bounds_read_ahead(monkeypatch):
+    region = "ap-southeast-2"
+    client = boto3.client(
+        "s3",
+        aws_access_key_id="aws_key",
+        aws_secret_access_key="aws_secret",
+        region_name=region,
+    )
+    client.create_bucket(
+        Bucket="test_bucket", CreateBucketConfiguration={"LocationConstraint": region}
+    )
+    expected = Graph()
+    for i in range(50):
+        expected.add(
+            (
+                rdflib.URIRef(f"https://example.com/{i}"),
+                rdflib.URIRef("https://example.com/p"),
+                rdflib.Literal(i),
+            )
+        )
+    body = expected.serialize(format="nt").encode("utf-8")
+    client.put_object(Bucket="test_bucket", Key="big.nt", Body=body)
+
+    s3_ps = S3(bucket="test_bucket", aws_key="aws_key", aws_secret="aws_secret")
+    requested = []
+    get_object = s3_ps.client.get_object
+    monkeypatch.setattr(
+        s3_ps.client,
+        "get_object",
+        lambda **kwargs: requested.append(kwargs) or get_object(**kwargs),
+    )
+    parsed_after = []
+
+    class RecordingGraph(Graph):
+        def parse(self, *args, **kwargs):
+            parsed_after.append(len(requested))
+            return super().parse(*args, **kwargs)
+
+    monkeypatch.setattr(rdfx.persistence_systems, "Graph", RecordingGraph)
+    comments, graph = s3_ps.read_parallel(
+        "big.nt", range_size=37, max_workers=2, processes=1
+    )
+    assert isomorphic(graph, expected)
+    assert len(requested) == -(-len(body) // 37)
+    # the first line is parsed long before all of the ranges are requested
+    assert parsed_after[0] < 10
+
+
+@mock_s3
+def test_read_etag_cache(tmp_path):
+    region = "ap-southeast-2"
+    client = boto3.client(
+        "s3",
+        aws_access_key_id="aws_key",
+        aws_secret_access_key="aws_secret",
+        region_name=region,
+    )
+    client.create_bucket(
+        Bucket="test_bucket", CreateBucketConfiguration={"LocationConstraint": region}
+    )
+    with open("tests/data/file_01.ttl", "rb") as f:
+        client.put_object(Bucket="test_bucket", Key="vocab.ttl", Body=f.read())
+
+    s3_ps = S3(
+        bucket="test_bucket",
+        aws_key="aws_key",
+        aws_secret="aws_secret",
+        cache=GraphCache(tmp_path),
+    )
+    statuses = []
+    s3_ps.client.meta.events.register(
+        "after-call.s3.GetObject",
+        lambda http_response, **kwargs: statuses.append(http_response.status_code),
+    )
+    comments, graph = s3_ps.read("vocab.ttl", rdf_format="ttl")
+    assert len(graph) == 6
+    # unchanged, only the conditional GET
+    cached_comments, cached_graph = s3_ps.read("vocab.ttl", rdf_format="ttl")
+    assert statuses == [200, 304]
+    assert cached_graph.isomorphic(graph)
+
+    client.put_object(
+        Bucket="test_bucket", Key="vocab.ttl", Body=g.serialize(format="turtle")
+    )
+    comments, graph = s3_ps.read("vocab.ttl", rdf_format="ttl")
+    assert statuses == [200, 304, 200]
+    assert graph.isomorphic(g)
+
+    # an evicted entry is read again
+    s3_ps.cache.max_size = 0
+    s3_ps.cache.evict()
+    comments, graph = s3_ps.read("vocab.ttl", rdf_format="ttl")
+    assert statuses == [200, 304, 200, 304, 200]
+    assert graph.isomorphic(g)
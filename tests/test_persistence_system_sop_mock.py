@@ -0,0 +1,534 @@
+import asyncio
+import re
+from email.parser import BytesParser
+from urllib.parse import parse_qs
+
+import httpx
+import pytest
+from rdflib import BNode, Dataset, Graph, Literal, URIRef
+from rdflib.compare import isomorphic
+
+import rdfx.persistence_systems
+import rdfx.sessions
+from rdfx.chunking import chunk_subjects
+from rdfx.persistence_systems import SOP
+from rdfx.sessions import SessionStore, close_shared_clients
+
+g = Graph().parse("tests/data/file_01.ttl")
+
+
+class MockSOP:
+    """
+    Answers the requests of the SOP persistence systems like a SOP instance holding one datagraph,
+    keeping count of the requests in flight.
+    Remote requests of the landing page without a logged in session get the login form.
+    """
+
+    LOGIN_FORM = '<form method="POST" action="j_security_check"></form>'
+
+    def __init__(self, delay: float = 0, failing_uploads: int = 0, rows: int = 0):
+        self.delay = delay
+        self.rows = rows
+        self.failing_uploads = failing_uploads
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.paths = []
+        self.uploads = []
+        self.updates = []
+        self.queries = []
+        self.sessions = set()
+        self.logins = 0
+
+    def respond(self, request: httpx.Request) -> httpx.Response:
+        path = request.url.path
+        self.paths.append(path)
+        if path == "/tbl/j_security_check":
+            if parse_qs(request.content.decode("utf-8"))["j_password"] != ["password"]:
+                return httpx.Response(200, text="Invalid username or password")
+            self.logins += 1
+            session = f"session-{self.logins}"
+            self.sessions.add(session)
+            return httpx.Response(
+                200, text="", headers={"Set-Cookie": f"JSESSIONID={session}; Path=/"}
+            )
+        session = re.search(r"JSESSIONID=([^;]+)", request.headers.get("Cookie", ""))
+        session = session and session.group(1)
+        if path == "/tbl":
+            if request.url.host != "localhost" and session not in self.sessions:
+                return httpx.Response(
+                    200, text=self.LOGIN_FORM, headers={"Content-Type": "text/html"}
+                )
+            return httpx.Response(200)
+        if path == "/tbl/purgeuser":
+            self.sessions.discard(session)
+            return httpx.Response(200)
+        if path == "/tbl/service/datagraph/tbs/exportRDFFile":
+            if request.url.params["format"] == "ntriples":
+                content = g.serialize(format="nt")
+            else:
+                content = "# a leading comment\n\n" + g.serialize(format="turtle")
+            return httpx.Response(200, content=content.encode("utf-8"))
+        if path.endswith("/tbs/exportRDFFile"):
+            return httpx.Response(404, text="Not found")
+        form = parse_qs(request.content.decode("utf-8"), keep_blank_values=True)
+        if path == "/tbl/sparql" and "update" in form:
+            self.updates.append(form["update"][0])
+            return httpx.Response(200)
+        if path == "/tbl/sparql":
+            self.queries.append(form)
+            query = form["query"][0]
+            if query.startswith("ASK"):
+                exists = "urn:x-evn-master:datagraph" in query
+                return httpx.Response(200, json={"head": {}, "boolean": exists})
+            if "GROUP BY ?g" in query:
+                counts = {
+                    "triples": len(g),
+                    "subjects": len(set(g.subjects())),
+                    "predicates": len(set(g.predicates())),
+                }
+                names = [name for name in counts if f"AS ?{name})" in query]
+                bindings = [
+                    {
+                        "g": {"type": "uri", "value": graph},
+                        **{
+                            name: {"type": "literal", "value": str(counts[name])}
+                            for name in names
+                        },
+                    }
+                    for graph in re.findall(r"<([^>]+)>", query)
+                    if graph == "urn:x-evn-master:datagraph"
+                ]
+                return httpx.Response(
+                    200,
+                    json={
+                        "head": {"vars": ["g"] + names},
+                        "results": {"bindings": bindings},
+                    },
+                )
+            if "VALUES ?g" in query:
+                graphs = re.findall(r"<([^>]+)>", query)
+                bindings = [
+                    {"g": {"type": "uri", "value": graph}}
+                    for graph in graphs
+                    if graph == "urn:x-evn-master:datagraph"
+                ]
+                return httpx.Response(
+                    200,
+                    json={"head": {"vars": ["g"]}, "results": {"bindings": bindings}},
+                )
+            if "?row" in query:
+                limit = int(re.search(r"LIMIT (\d+)", query).group(1))
+                offset = int(re.search(r"OFFSET (\d+)", query).group(1))
+                bindings = [
+                    {"row": {"type": "literal", "value": str(row)}}
+                    for row in range(offset, min(offset + limit, self.rows))
+                ]
+                return httpx.Response(
+                    200,
+                    json={"head": {"vars": ["row"]}, "results": {"bindings": bindings}},
+                )
+            return httpx.Response(
+                200,
+                json={
+                    "head": {"vars": ["count"]},
+                    "results": {
+                        "bindings": [
+                            {"count": {"type": "literal", "value": str(len(g))}}
+                        ]
+                    },
+                },
+            )
+        if path == "/tbl/importFileUpload":
+            if self.failing_uploads:
+                self.failing_uploads -= 1
+                return httpx.Response(503, text="Busy")
+            message = BytesParser().parsebytes(
+                b"Content-Type: "
+                + request.headers["Content-Type"].encode()
+                + b"\r\n\r\n"
+                + request.content
+            )
+            for part in message.get_payload():
+                if part.get_param("name", header="content-disposition") == "file":
+                    self.uploads.append(part.get_payload(decode=True).decode("utf-8"))
+            return httpx.Response(200, text="message=Imported+the+graph")
+        if path == "/tbl/swp":
+            return httpx.Response(
+                200,
+                json={"response": "Successfully created", "id": form["name"][0]},
+            )
+        return httpx.Response(404)
+
+    async def respond_async(self, request: httpx.Request) -> httpx.Response:
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            await asyncio.sleep(self.delay)
+            await request.aread()
+            return self.respond(request)
+        finally:
+            self.in_flight -= 1
+
+
+def test_sop_mock_transport():
+    server = MockSOP()
+    sop_ps = SOP(transport=httpx.MockTransport(server.respond))
+    comments, graph = sop_ps.read("urn:x-evn-master:datagraph")
+    assert comments == ["a leading comment"]
+    assert isomorphic(graph, g)
+    assert isomorphic(sop_ps.read_graph("urn:x-evn-master:datagraph"), g)
+    assert sop_ps.asset_exists("urn:x-evn-master:datagraph")
+    assert not sop_ps.asset_exists("urn:x-evn-master:other")
+    assert sop_ps.asset_collection_size("urn:x-evn-master:datagraph") == len(g)
+    assert sop_ps.write(g, "urn:x-evn-master:datagraph") == "Imported the graph"
+    assert sop_ps.create_datagraph("new_datagraph") == "urn:x-evn-master:new_datagraph"
+
+
+big_graph = Graph().parse(
+    data="""
+    @prefix ex: <https://example.com/> .
+    ex:a ex:p [ ex:q [ ex:r 1 ] ] ; ex:s 2 .
+    ex:b ex:p 3 .
+    ex:c ex:p _:x .
+    ex:d ex:p _:x .
+    _:x ex:q 4 .
+    ex:e ex:p 5 .
+    """,
+    format="turtle",
+)
+
+
+chunk_count = len(chunk_subjects(big_graph, 3))
+
+
+def test_sop_write_chunked():
+    server = MockSOP(failing_uploads=1)
+    sop_ps = SOP(transport=httpx.MockTransport(server.respond))
+    progress = []
+    messages = sop_ps.write_chunked(
+        big_graph,
+        "urn:x-evn-master:datagraph",
+        leading_comments=["a leading comment"],
+        max_triples=3,
+        backoff=0,
+        progress=lambda done, total: progress.append((done, total)),
+    )
+    assert messages == ["Imported the graph"] * chunk_count
+    assert progress == [(done, chunk_count) for done in range(1, chunk_count + 1)]
+    assert server.uploads[0].startswith("# a leading comment\n")
+    written = Graph()
+    for upload in server.uploads:
+        written.parse(data=upload, format="turtle")
+    assert isomorphic(written, big_graph)
+
+
+def test_sop_write_chunked_gives_up():
+    server = MockSOP(failing_uploads=3)
+    sop_ps = SOP(transport=httpx.MockTransport(server.respond))
+    with pytest.raises(Exception, match=f"chunk 1 of {chunk_count}"):
+        sop_ps.write_chunked(
+            big_graph, "urn:x-evn-master:datagraph", max_triples=3, retries=2, backoff=0
+        )
+
+
+def test_sop_read_streams(monkeypatch):
+    # small chunks, so the comments and the first line of turtle span several of them
+    monkeypatch.setattr(rdfx.persistence_systems, "STREAM_CHUNK_SIZE", 5)
+    server = MockSOP()
+    sop_ps = SOP(transport=httpx.MockTransport(server.respond))
+    comments, graph = sop_ps.read("urn:x-evn-master:datagraph")
+    assert comments == ["a leading comment"]
+    assert isomorphic(graph, g)
+
+
+rows_query = "SELECT ?row WHERE { ?s ?p ?row } ORDER BY ?row"
+
+
+@pytest.mark.parametrize("rows", [0, 25, 30])
+def test_sop_query_iter(rows):
+    server = MockSOP(rows=rows)
+    sop_ps = SOP(transport=httpx.MockTransport(server.respond))
+    batches = list(
+        sop_ps.query_iter(rows_query, "urn:x-evn-master:datagraph", page_size=10)
+    )
+    assert [len(batch) for batch in batches] == [10] * (rows // 10) + (
+        [rows % 10] if rows % 10 else []
+    )
+    values = [row["row"]["value"] for batch in batches for row in batch]
+    assert values == [str(row) for row in range(rows)]
+    # a last, empty page is only requested when the last batch is full
+    assert server.paths.count("/tbl/sparql") == rows // 10 + 1
+
+    with pytest.raises(ValueError):
+        next(sop_ps.query_iter(rows_query + " LIMIT 5", "urn:x-evn-master:datagraph"))
+
+
+def test_sop_assets_exist():
+    server = MockSOP()
+    sop_ps = SOP(transport=httpx.MockTransport(server.respond))
+    graph_names = [f"urn:x-evn-master:other_{i}" for i in range(2_000)] + [
+        "urn:x-evn-master:datagraph",
+        "urn:x-evn-tag:datagraph:workflow:Administrator",
+    ]
+    exists = sop_ps.assets_exist(graph_names)
+    assert list(exists) == graph_names
+    assert [name for name, e in exists.items() if e] == graph_names[-2:]
+    assert server.paths.count("/tbl/sparql") == 1
+    sop_ps.assets_exist(graph_names, batch_size=500)
+    assert server.paths.count("/tbl/sparql") == 6
+
+
+def test_sop_asset_exists_cache(monkeypatch):
+    server = MockSOP()
+    sop_ps = SOP(transport=httpx.MockTransport(server.respond), exists_ttl=60)
+    now = [1000.0]
+    monkeypatch.setattr(rdfx.persistence_systems.time, "monotonic", lambda: now[0])
+
+    assert sop_ps.asset_exists("urn:x-evn-master:datagraph")
+    assert sop_ps.asset_exists("urn:x-evn-tag:datagraph:workflow:Administrator")
+    assert sop_ps.assets_exist(["urn:x-evn-master:datagraph"]) == {
+        "urn:x-evn-master:datagraph": True
+    }
+    assert server.paths.count("/tbl/sparql") == 1
+    assert not sop_ps.asset_exists("urn:x-evn-master:other")
+    assert server.paths.count("/tbl/sparql") == 2
+
+    # a write invalidates the graph written to
+    sop_ps.write(g, "urn:x-evn-master:other")
+    assert not sop_ps.asset_exists("urn:x-evn-master:other")
+    assert sop_ps.asset_exists("urn:x-evn-master:datagraph")
+    assert server.paths.count("/tbl/sparql") == 3
+    # creating an asset invalidates all
+    sop_ps.create_datagraph("new_datagraph")
+    assert sop_ps.asset_exists("urn:x-evn-master:datagraph")
+    assert server.paths.count("/tbl/sparql") == 4
+    # and the answers expire
+    now[0] += 61
+    assert sop_ps.asset_exists("urn:x-evn-master:datagraph")
+    assert server.paths.count("/tbl/sparql") == 5
+
+
+def test_sop_asset_statistics(monkeypatch):
+    server = MockSOP()
+    sop_ps = SOP(transport=httpx.MockTransport(server.respond), statistics_ttl=60)
+    now = [1000.0]
+    monkeypatch.setattr(rdfx.persistence_systems.time, "monotonic", lambda: now[0])
+    asset_iris = ["urn:x-evn-master:other", "urn:x-evn-master:datagraph"]
+
+    statistics = sop_ps.asset_statistics(asset_iris)
+    assert list(statistics) == asset_iris
+    assert statistics["urn:x-evn-master:other"] == {"triples": 0}
+    assert statistics["urn:x-evn-master:datagraph"] == {"triples": len(g)}
+    statistics = sop_ps.asset_statistics(asset_iris, distinct=True)
+    assert statistics["urn:x-evn-master:datagraph"] == {
+        "triples": len(g),
+        "subjects": len(set(g.subjects())),
+        "predicates": len(set(g.predicates())),
+    }
+    assert server.paths.count("/tbl/sparql") == 2
+    # the counts are over all graphs, so no default graph is named
+    assert all("default-graph-uri" not in form for form in server.queries)
+
+    # cached, until a write to one of the graphs or expiry
+    sop_ps.asset_statistics(asset_iris)
+    assert server.paths.count("/tbl/sparql") == 2
+    sop_ps.write(g, "urn:x-evn-master:other")
+    sop_ps.asset_statistics(asset_iris)
+    assert server.paths.count("/tbl/sparql") == 3
+    now[0] += 61
+    sop_ps.asset_statistics(asset_iris, batch_size=1)
+    assert server.paths.count("/tbl/sparql") == 5
+
+
+def apply_updates(base: Graph, updates) -> Graph:
+    """
+    Returns the graph the updates turn base into, in the datagraph of a Dataset.
+    """
+    ds = Dataset()
+    graph = ds.graph(URIRef("urn:x-evn-master:datagraph"))
+    graph += base
+    for update in updates:
+        ds.update(update)
+    return graph
+
+
+def test_sop_write_delta():
+    server = MockSOP()
+    sop_ps = SOP(transport=httpx.MockTransport(server.respond), exists_ttl=60)
+    assert sop_ps.asset_exists("urn:x-evn-master:datagraph")
+    changed = Graph()
+    changed += g
+    changed.remove(next(iter(g)))
+    changed.add(
+        (
+            URIRef("https://example.com/new"),
+            URIRef("https://example.com/p"),
+            Literal("new\nline"),
+        )
+    )
+
+    # the base is read from SOP
+    delta = sop_ps.write_delta(changed, "urn:x-evn-master:datagraph")
+    assert (len(delta.added), len(delta.removed), delta.bnodes) == (1, 1, None)
+    assert len(server.updates) == 2
+    assert server.updates[0].startswith("DELETE DATA")
+    assert isomorphic(apply_updates(g, server.updates), changed)
+    # the write invalidated the cached answers
+    sop_ps.asset_exists("urn:x-evn-master:datagraph")
+    assert server.paths.count("/tbl/sparql") == 4
+
+    # no change, no update
+    server.updates.clear()
+    sop_ps.write_delta(changed, "urn:x-evn-master:datagraph", base=changed)
+    assert server.updates == []
+
+
+def test_sop_write_delta_bnodes():
+    server = MockSOP()
+    sop_ps = SOP(transport=httpx.MockTransport(server.respond))
+    ex = "https://example.com/"
+    # the same blank nodes with new labels are unchanged
+    relabelled = Graph().parse(data=big_graph.serialize(format="nt"), format="nt")
+    relabelled.add((URIRef(ex + "f"), URIRef(ex + "p"), Literal(6)))
+    delta = sop_ps.write_delta(relabelled, "urn:x-evn-master:datagraph", base=big_graph)
+    assert (len(delta.added), len(delta.removed), delta.bnodes) == (1, 0, None)
+    assert len(server.updates) == 1
+
+    # a changed blank node replaces all triples with blank nodes, keeping each together with its referrers
+    server.updates.clear()
+    changed = Graph()
+    changed += relabelled
+    x = next(changed.objects(URIRef(ex + "c"), URIRef(ex + "p")))
+    changed.set((x, URIRef(ex + "q"), Literal(5)))
+    delta = sop_ps.write_delta(
+        changed, "urn:x-evn-master:datagraph", base=big_graph, batch_size=3
+    )
+    assert len(delta.bnodes) == 6
+    assert sum(update.startswith("INSERT DATA") for update in server.updates) == 3
+    assert isomorphic(apply_updates(big_graph, server.updates), changed)
+    assert isinstance(x, BNode)
+
+
+REMOTE = "https://sop.example.com"
+
+
+def test_sop_login():
+    server = MockSOP()
+    sop_ps = SOP(
+        REMOTE, password="password", transport=httpx.MockTransport(server.respond)
+    )
+    assert sop_ps.location == REMOTE + "/tbl"
+    assert sop_ps.client.cookies["JSESSIONID"] == "session-1"
+    # reconnecting doesn't add /tbl again, and closes the client it replaces
+    first_client = sop_ps.client
+    assert sop_ps._create_client(test_connection=True) is True
+    assert sop_ps.location == REMOTE + "/tbl"
+    assert first_client.is_closed
+    assert not sop_ps.client.is_closed
+    assert server.paths == ["/tbl", "/tbl/j_security_check"] * 2
+
+    sop_ps.password = "wrong"
+    assert sop_ps._create_client(test_connection=True) == "Invalid username or password"
+    with pytest.raises(ValueError, match="Invalid username or password"):
+        SOP(REMOTE, password="wrong", transport=httpx.MockTransport(server.respond))
+
+
+def test_sop_session_store(tmp_path, monkeypatch):
+    server = MockSOP()
+    transport = httpx.MockTransport(server.respond)
+    store = SessionStore(tmp_path)
+    SOP(
+        REMOTE,
+        password="password",
+        transport=transport,
+        session_store=store,
+        session_ttl=60,
+    )
+    assert server.paths.count("/tbl/j_security_check") == 1
+
+    # a later instance reuses the stored session, without logging in
+    sop_ps = SOP(
+        REMOTE,
+        password="password",
+        transport=transport,
+        session_store=store,
+        session_ttl=60,
+    )
+    assert server.paths.count("/tbl/j_security_check") == 1
+    assert sop_ps.client.cookies["JSESSIONID"] == "session-1"
+    assert sop_ps.asset_exists("urn:x-evn-master:datagraph")
+    assert [path.stat().st_mode & 0o777 for path in tmp_path.iterdir()] == [0o600]
+
+    # until it expires
+    now = rdfx.sessions.time.time()
+    monkeypatch.setattr(rdfx.sessions.time, "time", lambda: now + 61)
+    SOP(REMOTE, password="password", transport=transport, session_store=store)
+    assert server.paths.count("/tbl/j_security_check") == 2
+
+    # or is logged out
+    sop_ps._close()
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_sop_logged_out_session(tmp_path):
+    server = MockSOP()
+    transport = httpx.MockTransport(server.respond)
+    store = SessionStore(tmp_path)
+    SOP(REMOTE, password="password", transport=transport, session_store=store)
+    # the stored session is checked, and once the server logged it out, the client logs in again
+    server.sessions.clear()
+    sop_ps = SOP(REMOTE, password="password", transport=transport, session_store=store)
+    assert server.paths.count("/tbl/j_security_check") == 2
+    assert sop_ps.client.cookies["JSESSIONID"] == "session-2"
+    assert store.get(sop_ps.location, sop_ps.username)["JSESSIONID"] == "session-2"
+
+    # testing the connection makes a request, even with a stored session
+    requests = len(server.paths)
+    assert sop_ps._create_client(test_connection=True) is True
+    assert len(server.paths) == requests + 1
+    server.sessions.clear()
+    sop_ps.password = "wrong"
+    assert sop_ps._create_client(test_connection=True) == "Invalid username or password"
+    assert store.get(sop_ps.location, sop_ps.username) is None
+
+
+def test_sop_shared_session():
+    server = MockSOP()
+    transport = httpx.MockTransport(server.respond)
+    try:
+        first = SOP(
+            REMOTE, password="password", transport=transport, shared_session=True
+        )
+        second = SOP(
+            REMOTE, password="password", transport=transport, shared_session=True
+        )
+        other_user = SOP(
+            REMOTE,
+            "other",
+            password="password",
+            transport=transport,
+            shared_session=True,
+        )
+        assert first.client is second.client
+        assert other_user.client is not first.client
+        assert server.paths.count("/tbl/j_security_check") == 2
+
+        # a shared client which was logged out is dropped, and the next instance logs in again
+        server.sessions.clear()
+        third = SOP(
+            REMOTE, password="password", transport=transport, shared_session=True
+        )
+        assert third.client is not first.client
+        # the dropped client is still held by the other instances, so recreating it does not close it
+        assert second._create_client() is True
+        assert second.client is third.client
+        assert not first.client.is_closed
+        assert server.paths.count("/tbl/j_security_check") == 3
+        assert (
+            SOP(
+                REMOTE, password="password", transport=transport, shared_session=True
+            ).client
+            is third.client
+        )
+    finally:
+        close_shared_clients()
@@ -0,0 +1,97 @@
+from rdflib import BNode, Dataset, Graph, URIRef
+
+from rdfx.persistence_systems import File
+from rdfx.rdfx_cli import convert, merge
+from rdfx.streaming import stream_convert, stream_merge
+
+nt_1 = """<http://example.com/a> <http://example.com/b> <http://example.com/c> .
+<http://example.com/a> <http://example.com/d> "d"@en .
+_:x <http://example.com/e> <http://example.com/a> .
+"""
+nt_2 = """<http://example.com/a> <http://example.com/b> <http://example.com/c> .
+_:x <http://example.com/e> "e"^^<http://www.w3.org/2001/XMLSchema#string> .
+"""
+
+
+def write_inputs(tmp_path):
+    file_1 = tmp_path / "file_1.nt"
+    file_1.write_text(nt_1)
+    file_2 = tmp_path / "file_2.nt"
+    file_2.write_text(nt_2)
+    return file_1, file_2
+
+
+def test_stream_convert_nt_to_nq(tmp_path):
+    file_1, _ = write_inputs(tmp_path)
+    output = stream_convert(
+        file_1, tmp_path / "out.nq", "nq", graph_iri="http://example.com/g"
+    )
+    ds = Dataset()
+    ds.parse(output, format="nquads")
+    g = ds.graph(URIRef("http://example.com/g"))
+    assert len(g) == 3
+    assert g.isomorphic(Graph().parse(data=nt_1, format="nt"))
+
+
+def test_stream_convert_nt_to_nq_default_graph(tmp_path):
+    file_1 = tmp_path / "file_1.nt"
+    file_1.write_text(
+        nt_1
+        + '<http://example.com/a> <http://example.com/f> "two\\nlines \\"quoted\\"" .\n'
+    )
+    output = stream_convert(file_1, tmp_path / "out.nq", "nq")
+    # every statement is on a line of its own, in the default graph
+    assert len(output.read_text().splitlines()) == 4
+    # without a graph name, the lines are also N-Triples
+    assert (
+        Graph()
+        .parse(output, format="nt")
+        .isomorphic(Graph().parse(file_1, format="nt"))
+    )
+
+
+def test_stream_merge_keeps_blank_nodes_apart(tmp_path):
+    output = stream_merge(write_inputs(tmp_path), tmp_path / "out.nt", "nt")
+    g = Graph().parse(output, format="nt")
+    # the duplicate triple collapses in the Graph, the two _:x do not
+    assert len(g) == 4
+    assert len(set(s for s in g.subjects() if isinstance(s, BNode))) == 2
+
+
+def test_stream_merge_blank_node_labels_stay_apart(tmp_path):
+    # the labels of file 1 and file 10 would be the same if joined to the file index without a separator
+    files = []
+    for index in range(11):
+        file = tmp_path / f"file_{index}.nt"
+        label = {1: "0x", 10: "x"}.get(index, "y")
+        file.write_text(f"_:{label} <http://example.com/p> <http://example.com/o> .\n")
+        files.append(file)
+    output = stream_merge(files, tmp_path / "out.nt", "nt")
+    assert len(set(Graph().parse(output, format="nt").subjects())) == 11
+
+
+def test_stream_convert_nq_default_graph(tmp_path):
+    input_file = tmp_path / "in.nq"
+    input_file.write_text(
+        "<http://example.com/a> <http://example.com/p> <http://example.com/b> .\n"
+        "<http://example.com/a> <http://example.com/p> <http://example.com/c> <http://example.com/g> .\n"
+    )
+    output = stream_convert(input_file, tmp_path / "out.nq", "nq")
+    assert output.read_text() == input_file.read_text()
+
+
+def test_stream_merge_deduplicate(tmp_path):
+    files = write_inputs(tmp_path)
+    output = stream_merge(files, tmp_path / "all.nt", "nt")
+    assert len(output.read_text().splitlines()) == 5
+    output = stream_merge(files, tmp_path / "deduplicated.nt", "nt", deduplicate=True)
+    assert len(output.read_text().splitlines()) == 4
+
+
+def test_convert_and_merge_use_streaming(tmp_path):
+    file_1, file_2 = write_inputs(tmp_path)
+    ps = File(tmp_path)
+    convert(file_1, ps, "converted", "nq")
+    assert len(Dataset().parse(tmp_path / "converted.nq", format="nquads")) == 3
+    merge([file_1, file_2], ps, "nt", "merged", deduplicate=True)
+    assert len((tmp_path / "merged.nt").read_text().splitlines()) == 4
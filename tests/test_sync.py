@@ -0,0 +1,151 @@
+import shutil
+import sys
+from pathlib import Path
+
+import boto3
+import moto.s3.models
+import pytest
+from moto import mock_s3
+from rdflib import Graph
+from rdflib.compare import isomorphic
+
+from rdfx.persistence_systems import S3, s3_etag
+from rdfx.rdfx_cli import main
+
+region = "ap-southeast-2"
+data_dir = Path(__file__).parent / "data"
+
+
+def make_bucket():
+    client = boto3.client(
+        "s3",
+        aws_access_key_id="aws_key",
+        aws_secret_access_key="aws_secret",
+        region_name=region,
+    )
+    client.create_bucket(
+        Bucket="test_bucket", CreateBucketConfiguration={"LocationConstraint": region}
+    )
+    return client
+
+
+def copy_data(directory: Path):
+    for name in ("file_01.ttl", "file_02.rdf", "file_03.json-ld"):
+        shutil.copy(data_dir / name, directory)
+    return sorted(directory.iterdir())
+
+
+@mock_s3
+def test_sync(tmp_path):
+    client = make_bucket()
+    files = copy_data(tmp_path)
+    client.put_object(Bucket="test_bucket", Key="vocabs/stale.ttl", Body=b"")
+    client.put_object(Bucket="test_bucket", Key="vocabs/nested/kept.ttl", Body=b"")
+    s3_ps = S3(bucket="test_bucket", aws_key="aws_key", aws_secret="aws_secret")
+
+    result = s3_ps.sync(files, "vocabs")
+    assert sorted(result.uploaded) == [f"vocabs/{f.name}" for f in files]
+    body = client.get_object(Bucket="test_bucket", Key="vocabs/file_01.ttl")[
+        "Body"
+    ].read()
+    assert body == (tmp_path / "file_01.ttl").read_bytes()
+
+    result = s3_ps.sync(files, "vocabs/")
+    assert result.uploaded == []
+    assert len(result.unchanged) == 3
+
+    (tmp_path / "file_01.ttl").write_text("<a:> <b:> <c:> .\n")
+    result = s3_ps.sync(files, "vocabs", delete=True)
+    assert result.uploaded == ["vocabs/file_01.ttl"]
+    assert result.deleted == ["vocabs/stale.ttl"]
+    keys = [k["Key"] for k in client.list_objects_v2(Bucket="test_bucket")["Contents"]]
+    assert "vocabs/stale.ttl" not in keys
+    assert "vocabs/nested/kept.ttl" in keys
+
+
+@mock_s3
+def test_sync_multipart_etag(tmp_path, monkeypatch):
+    # allow parts smaller than the 5 MiB S3 minimum
+    monkeypatch.setattr(moto.s3.models, "S3_UPLOAD_PART_MIN_SIZE", 1)
+    client = make_bucket()
+    files = copy_data(tmp_path)
+    s3_ps = S3(
+        bucket="test_bucket", aws_key="aws_key", aws_secret="aws_secret", part_size=256
+    )
+    assert len(s3_ps.sync(files).uploaded) == 3
+    etag = client.head_object(Bucket="test_bucket", Key="file_01.ttl")["ETag"].strip(
+        '"'
+    )
+    assert "-" in etag
+    assert etag == s3_etag(tmp_path / "file_01.ttl", 256)
+    assert len(s3_ps.sync(files).unchanged) == 3
+
+
+@mock_s3
+def test_sync_converted(tmp_path, monkeypatch, capsys):
+    monkeypatch.setenv("AWS_ACCESS_KEY_ID", "aws_key")
+    monkeypatch.setenv("AWS_SECRET_ACCESS_KEY", "aws_secret")
+    monkeypatch.setenv("AWS_DEFAULT_REGION", region)
+    client = make_bucket()
+    copy_data(tmp_path)
+    argv = ["rdfx", "sync", str(tmp_path), "-f", "nt", "-o", "s3://test_bucket/nt"]
+    monkeypatch.setattr(sys, "argv", argv)
+
+    assert main() == 0
+    assert "Uploaded 3, unchanged 0" in capsys.readouterr().out
+    body = client.get_object(Bucket="test_bucket", Key="nt/file_01.nt")["Body"].read()
+    assert isomorphic(
+        Graph().parse(data=body, format="nt"), Graph().parse(tmp_path / "file_01.ttl")
+    )
+
+    assert main() == 0
+    assert "Uploaded 0, unchanged 3" in capsys.readouterr().out
+
+    with open(tmp_path / "file_01.ttl", "a") as f:
+        f.write(
+            "\n<https://example.com/a> <https://example.com/b> <https://example.com/c> .\n"
+        )
+    assert main() == 0
+    assert "Uploaded 1, unchanged 2" in capsys.readouterr().out
+
+
+@mock_s3
+def test_sync_refuses_duplicate_names(tmp_path):
+    make_bucket()
+    for directory in ("a", "b"):
+        (tmp_path / directory).mkdir()
+        shutil.copy(data_dir / "file_01.ttl", tmp_path / directory)
+    s3_ps = S3(bucket="test_bucket", aws_key="aws_key", aws_secret="aws_secret")
+    files = [tmp_path / "a" / "file_01.ttl", tmp_path / "b" / "file_01.ttl"]
+    with pytest.raises(ValueError, match="vocabs/file_01.ttl"):
+        s3_ps.sync(files, "vocabs")
+
+
+@mock_s3
+def test_sync_etag_only_for_existing_keys(tmp_path, monkeypatch):
+    make_bucket()
+    files = copy_data(tmp_path)
+    s3_ps = S3(bucket="test_bucket", aws_key="aws_key", aws_secret="aws_secret")
+    hashed = []
+    monkeypatch.setattr(
+        "rdfx.persistence_systems.s3_etag",
+        lambda file_path, part_size: hashed.append(file_path),
+    )
+    assert len(s3_ps.sync(files).uploaded) == 3
+    assert hashed == []
+
+
+def test_sync_refuses_compress(tmp_path, monkeypatch, capsys):
+    copy_data(tmp_path)
+    argv = [
+        "rdfx",
+        "sync",
+        str(tmp_path),
+        "-o",
+        "s3://test_bucket/nt",
+        "--compress",
+        "gzip",
+    ]
+    monkeypatch.setattr(sys, "argv", argv)
+    assert main() == 1
+    assert "--compress is not available for sync" in capsys.readouterr().err